@@ -0,0 +1,56 @@
+"""Report ant throughput and solution cost of the NumPy ACO engine.
+
+usage: python benchmarks/bench_aco.py --tasks 50 200 --ants 200 --time 10 --processes 1 2 4 [--mmas]
+       [--candidates 20] [--local-search]
+"""
+import argparse
+import logging
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.aco_numpy import NumpyACOTaskOptimizer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--ants", type=int, default=200)
+    parser.add_argument("--time", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1])
+    parser.add_argument("--mmas", action="store_true")
+    parser.add_argument("--candidates", type=int, default=None,
+                        help="nearest neighbour candidates, all nodes if not set")
+    parser.add_argument("--local-search", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    for num_tasks in args.tasks:
+        G = graph_helper.example_graph_cartesian(num_tasks, size=100)
+        Gn = mamogenx.G_problem_from_dag(G)
+
+        for num_processes in args.processes:
+            optimizer = NumpyACOTaskOptimizer(num_ants=args.ants,
+                                              limit=args.limit, seed=0,
+                                              num_processes=num_processes,
+                                              mmas=args.mmas,
+                                              num_candidates=args.candidates,
+                                              local_search=args.local_search)
+            optimizer.set_graph(Gn)
+            optimizer.solve(time=args.time)
+            stats = optimizer.stats
+
+            print(f"tasks {num_tasks:5d} processes {num_processes:2d}: "
+                  f"cost {stats['cost']:10.1f} "
+                  f"iterations {stats['iterations']:5d} "
+                  f"{stats['ants_per_second']:10.0f} ants/s "
+                  f"(setup {stats['setup_time']:.2f}s)")
+            if args.local_search:
+                print(f"    local search: {stats['local_search_moves']} moves "
+                      f"in {stats['local_search_time']:.2f}s, "
+                      f"{stats['improvement_per_second']:.1f} improvement/s")
+
+
+if __name__ == "__main__":
+    main()
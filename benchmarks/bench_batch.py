@@ -0,0 +1,53 @@
+"""Solve missions on one road map in a loop and with solve_many.
+
+usage: python benchmarks/bench_batch.py --problems 16 --workers 4 --tasks 12 --grid 30
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.service import solve_many
+from mamoge.taskplanner.problem import ProblemSnapshot
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--problems", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=12)
+    parser.add_argument("--grid", type=int, default=30)
+    parser.add_argument("--time", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    G_base = graph_helper.example_road_graph(args.grid)
+    dimensions = {"time": dict(cost_callback=time_callback)}
+
+    def problems():
+        return [ProblemSnapshot(graph_helper.example_graph_road(
+            G_base, args.tasks, seed=seed), dimensions)
+            for seed in range(args.problems)]
+
+    t_start = time.perf_counter()
+    for problem in problems():
+        problem.solve(args.time, exact_threshold=0)
+    t_loop = time.perf_counter() - t_start
+    print(f"loop: {t_loop:.2f}s")
+
+    t_start = time.perf_counter()
+    results = list(solve_many(problems(), args.time, args.workers,
+                              exact_threshold=0))
+    t_many = time.perf_counter() - t_start
+    solve_time = sum(r.solve_time for r in results) / len(results)
+    print(f"solve_many: {t_many:.2f}s with {len({r.worker for r in results})} "
+          f"workers, mean solve time {solve_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Solve time and gap of OR-Tools with and without a gap limit.
+
+usage: python benchmarks/bench_bounds.py --tasks 16 40 --time 5 --gap 0.05
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[16, 40])
+    parser.add_argument("--precedence", type=float, default=0.3)
+    parser.add_argument("--time", type=int, default=5)
+    parser.add_argument("--gap", type=float, nargs="+", default=[0.1, 0.05])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    for num_tasks in args.tasks:
+        G = graph_helper.example_graph_cartesian(num_tasks, size=100,
+                                                 precedence=args.precedence)
+        Gn = mamogenx.G_problem_from_dag(G)
+
+        for gap_limit in [None] + args.gap:
+            optimizer = ORTaskOptimizer()
+            optimizer.graph = Gn
+            optimizer.add_dimension("time", time_callback)
+            optimizer.gap_limit = gap_limit
+
+            t_start = time.perf_counter()
+            optimizer.solve(args.time)
+            t_solve = time.perf_counter() - t_start
+
+            stats = optimizer.stats
+            gap = f"{stats['gap']:.3f}" if stats["gap"] is not None else "-"
+            print(f"tasks {num_tasks:3d} gap limit {str(gap_limit):5s} "
+                  f"objective {stats['objective']} bound "
+                  f"{stats['lower_bound']} gap {gap} in {t_solve:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare memory and build time of the networkx and the compact problem graph.
+
+usage: python benchmarks/bench_compact.py --tasks 300
+       python benchmarks/bench_compact.py --tasks 5000 --compact-only
+"""
+import argparse
+import time
+import tracemalloc
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.problem import CompactProblem
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    t_start = time.perf_counter()
+    result = build(*args)
+    t_build = time.perf_counter() - t_start
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, t_build, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--compact-only", action="store_true")
+    args = parser.parse_args()
+
+    G = graph_helper.example_graph_cartesian(args.tasks)
+
+    problem, t_build, size, peak = measure(CompactProblem, G)
+    print(f"compact: {t_build:.3f}s, {size / 2**20:.1f} MiB "
+          f"(peak {peak / 2**20:.1f} MiB), {problem.num_arcs()} arcs")
+
+    if not args.compact_only:
+        Gn, t_build, size, peak = measure(mamogenx.G_problem_from_dag, G)
+        print(f"networkx: {t_build:.3f}s, {size / 2**20:.1f} MiB "
+              f"(peak {peak / 2**20:.1f} MiB), {Gn.number_of_edges()} arcs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the throughput of the decomposition solver against the monolithic solve.
+
+usage: python benchmarks/bench_decompose.py --tasks 1000 --cluster-size 200 --time 30
+       python benchmarks/bench_decompose.py --tasks 160 --layers 20 --time 10
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.decompose import DecompositionTaskOptimizer
+from mamoge.taskplanner.optimize.route import route_cost
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--cluster-size", type=int, default=200)
+    parser.add_argument("--time", type=int, default=30)
+    parser.add_argument("--improve-time", type=int, default=0)
+    parser.add_argument("--layers", type=int, default=0,
+                        help="layered mission with tasks/layers tasks per "
+                             "layer, solved with layer windows")
+    parser.add_argument("--layer-window", type=int, default=1)
+    parser.add_argument("--look-ahead", type=int, default=1)
+    parser.add_argument("--parallel", action="store_true",
+                        help="solve the layer windows in parallel")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    if args.layers > 0:
+        G = graph_helper.example_graph_layered(
+            args.layers, args.tasks // args.layers, size=100)
+        args.tasks = len(G) - 2
+        mode = "layer"
+    else:
+        G = graph_helper.example_graph_cartesian(args.tasks, size=100)
+        mode = "spatial"
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = DecompositionTaskOptimizer(cluster_size=args.cluster_size,
+                                           improve_time=args.improve_time,
+                                           mode=mode,
+                                           layer_window=args.layer_window,
+                                           look_ahead=args.look_ahead,
+                                           chain=not args.parallel)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+
+    t_start = time.perf_counter()
+    result, _ = optimizer.create_optimizer(Gn).solve(args.time)
+    t_mono = time.perf_counter() - t_start
+    mono_cost = route_cost(Gn, result[0], time_callback) if result else None
+    mono_visited = len(result[0]) - 2 if result else 0
+
+    result, _ = optimizer.solve(args.time)
+    stats = optimizer.stats
+
+    print(f"tasks: {args.tasks}, clusters: {stats['num_clusters']}")
+    print(f"monolithic:    {t_mono:8.2f}s {args.tasks / t_mono:8.1f} tasks/s "
+          f"cost {mono_cost} visited {mono_visited}")
+    print(f"decomposition: {stats['total_time']:8.2f}s "
+          f"{stats['tasks_per_second']:8.1f} tasks/s cost {stats['cost']} "
+          f"visited {len(result[0]) - 2} (stitch cost {stats['stitch_cost']})")
+
+
+if __name__ == "__main__":
+    main()
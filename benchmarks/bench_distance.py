@@ -0,0 +1,48 @@
+"""Request a distance matrix from the local routing stub pair by pair and
+in batched tables.
+
+usage: python benchmarks/bench_distance.py --tasks 60 --batch 50 --connections 4 --delay 0.002
+"""
+import argparse
+import logging
+import time
+
+from mamoge_helpers import graph_helper
+from mamoge_helpers.routing_stub import RoutingStubServer
+from mamoge.taskplanner.optimize.distance import OSRMDistanceProvider
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=60)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    G = graph_helper.example_graph_cartesian(args.tasks, size=1000)
+
+    with RoutingStubServer(delay=args.delay) as server:
+        provider = OSRMDistanceProvider(server.url)
+        t_start = time.perf_counter()
+        for u in G.nodes:
+            for v in G.nodes:
+                provider.distance(G, u, v)
+        t_pairs = time.perf_counter() - t_start
+        pair_requests = server.num_requests
+
+        provider = OSRMDistanceProvider(server.url, batch_size=args.batch,
+                                        max_connections=args.connections)
+        t_start = time.perf_counter()
+        provider.matrix(G)
+        t_batched = time.perf_counter() - t_start
+        batched_requests = server.num_requests - pair_requests
+
+    print(f"pairs   {pair_requests:5d} requests {t_pairs:.3f}s")
+    print(f"batched {batched_requests:5d} requests {t_batched:.3f}s "
+          f"({provider.stats['connections']} connections)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare the exact DP solver against OR-Tools on small problems.
+
+usage: python benchmarks/bench_exact.py --tasks 8 12 16 --time 1
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.exact import DPTaskOptimizer
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.route import route_cost
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[8, 12, 16])
+    parser.add_argument("--precedence", type=float, default=0.3)
+    parser.add_argument("--time", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    for num_tasks in args.tasks:
+        G = graph_helper.example_graph_cartesian(num_tasks, size=100,
+                                                 precedence=args.precedence)
+        Gn = mamogenx.G_problem_from_dag(G)
+
+        for optimizer in [DPTaskOptimizer(), ORTaskOptimizer()]:
+            optimizer.graph = Gn
+            optimizer.add_dimension("time", time_callback)
+
+            t_start = time.perf_counter()
+            results, _ = optimizer.solve(args.time)
+            t_solve = time.perf_counter() - t_start
+
+            cost = route_cost(Gn, results[0], time_callback) if results else None
+            print(f"tasks {num_tasks:3d} {type(optimizer).__name__:16s} "
+                  f"cost {cost} tasks {len(results[0]) - 2 if results else 0} "
+                  f"in {t_solve:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
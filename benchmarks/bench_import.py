@@ -0,0 +1,35 @@
+"""Report the cold import time of the core modules.
+
+usage: python benchmarks/bench_import.py --repeat 5
+"""
+import argparse
+import subprocess
+import sys
+
+MODULES = ["mamoge.taskplanner.location",
+           "mamoge.taskplanner.nx",
+           "mamoge.taskplanner.dag",
+           "mamoge.taskplanner.optimize",
+           "mamoge.taskplanner.optimize.ortools"]
+
+
+def import_time(module):
+    code = ("import time; t = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - t)")
+    output = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True).stdout
+    return float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        times = [import_time(module) for _ in range(args.repeat)]
+        print(f"{module:40s} min {min(times):.3f}s mean {sum(times) / len(times):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
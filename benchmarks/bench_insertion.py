@@ -0,0 +1,60 @@
+"""Insert tasks one by one into a planned route and compare with solving again.
+
+usage: python benchmarks/bench_insertion.py --tasks 50 --inserts 10 --time 2
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.location import CartesianLocation
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.route import route_cost
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--inserts", type=int, default=10)
+    parser.add_argument("--time", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = np.random.default_rng(1)
+
+    G = graph_helper.example_graph_cartesian(args.tasks, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+    taskoptimizer = TaskOptimizer(exact_threshold=0)
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.add_dimension("time", time_callback)
+    plan, _ = taskoptimizer.solve(args.time)
+    route = plan[0]
+
+    t_insert = 0
+    for k in range(args.inserts):
+        x, y = rng.integers(0, 100, 2)
+        t_start = time.perf_counter()
+        plan, _ = taskoptimizer.insert_task(
+            route, 1000 + k, location=CartesianLocation(int(x), int(y)))
+        t_insert += time.perf_counter() - t_start
+        route = plan[0]
+    cost_insert = route_cost(Gn, route, time_callback)
+
+    t_start = time.perf_counter()
+    plan, _ = taskoptimizer.solve(args.time)
+    t_solve = time.perf_counter() - t_start
+    cost_solve = route_cost(Gn, plan[0], time_callback)
+
+    print(f"{args.inserts} insertions in {t_insert:.4f}s, cost {cost_insert}")
+    print(f"full solve in {t_solve:.3f}s, cost {cost_solve}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the native precedence encoding against the per pair solver constraints.
+
+usage: python benchmarks/bench_precedence.py --tasks 50 200 500 --time 5
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.route import route_cost
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def run(G, Gn, constraints, native, max_time):
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.native_precedence = native
+    optimizer.add_dimension("time", time_callback)
+
+    t_start = time.perf_counter()
+    result, _ = optimizer.solve(max_time, 1, constraints)
+    t_solve = time.perf_counter() - t_start
+
+    path = result[0] if result else []
+    position = {n: i for i, n in enumerate(path)}
+    violated = sum(1 for u, v in G.edges
+                   if u in position and v in position
+                   and position[u] > position[v])
+    cost = route_cost(Gn, path, time_callback) if path else None
+
+    return t_solve, len(path) - 2, violated, cost
+
+
+def build_time(Gn, constraints, native):
+    from ortools.constraint_solver import pywrapcp
+    from mamoge.taskplanner.optimize.ortools.precedence import PrecedenceModel
+
+    manager = pywrapcp.RoutingIndexManager(len(Gn), 1, [0], [len(Gn) - 1])
+    routing = pywrapcp.RoutingModel(manager)
+    callback = routing.RegisterTransitCallback(lambda i, j: 1)
+    routing.AddDimension(callback, 0, 300000000, True, "time")
+
+    t_start = time.perf_counter()
+    PrecedenceModel(constraints, native=native).apply(routing, manager)
+    return time.perf_counter() - t_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--time", type=int, default=5)
+    parser.add_argument("--precedence", type=float, default=0.9)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    for num_tasks in args.tasks:
+        G = graph_helper.example_graph_cartesian(
+            num_tasks, size=100, precedence=args.precedence)
+        Gn = mamogenx.G_problem_from_dag(G)
+        constraints = mamogenx.G_descendent_constrains(
+            G, lambda u, v: dict(dimension="time", min=0))
+
+        for native in (False, True):
+            t_build = build_time(Gn, constraints, native)
+            t_solve, visited, violated, cost = run(G, Gn, constraints,
+                                                   native, args.time)
+            name = "native" if native else "pairs"
+            print(f"tasks {num_tasks:5d} constraints {len(constraints):7d} "
+                  f"{name:6s} build {t_build:7.3f}s solve {t_solve:7.2f}s "
+                  f"visited {visited:5d} violated {violated:4d} cost {cost}")
+
+
+if __name__ == "__main__":
+    main()
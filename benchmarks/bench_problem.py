@@ -0,0 +1,59 @@
+"""Add tasks to a problem incrementally and compare with full rebuilds.
+
+usage: python benchmarks/bench_problem.py --tasks 200 --inserts 10
+"""
+import argparse
+import copy
+import logging
+import time
+
+import numpy as np
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.location import CartesianLocation
+from mamoge.taskplanner.problem import TaskProblem
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def create_problem(dag):
+    problem = TaskProblem(dag)
+    problem.add_dimension("time", time_callback)
+    return problem
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--inserts", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = np.random.default_rng(1)
+    G = graph_helper.example_graph_cartesian(args.tasks, size=100)
+    problem = create_problem(G)
+
+    t_incremental = 0
+    t_rebuild = 0
+    for k in range(args.inserts):
+        x, y = rng.integers(0, 100, 2)
+        u, v = sorted(rng.choice(np.arange(1, args.tasks + 1), 2, replace=False))
+        t_start = time.perf_counter()
+        problem.add_task(10000 + k, predecessors=[int(u)], successors=[int(v)],
+                         location=CartesianLocation(int(x), int(y)))
+        t_incremental += time.perf_counter() - t_start
+
+        dag = copy.deepcopy(problem.dag)
+        t_start = time.perf_counter()
+        create_problem(dag)
+        t_rebuild += time.perf_counter() - t_start
+
+    print(f"{args.inserts} incremental inserts in {t_incremental:.3f}s")
+    print(f"{args.inserts} rebuilds in {t_rebuild:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Solve a fleet with vehicle profiles sharing their time matrices.
+
+usage: python benchmarks/bench_profiles.py --tasks 60 --vehicles 8 --profiles 2 --time 2
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.profile import VehicleProfile
+
+
+def distance_callback(G, u, v):
+    return mamogenx.G_distance_location(G, u, v)
+
+
+def service_callback(G, u):
+    return 0 if u in (0, len(G) - 1) else 30
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=60)
+    parser.add_argument("--vehicles", type=int, default=8)
+    parser.add_argument("--profiles", type=int, default=2)
+    parser.add_argument("--time", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    G = graph_helper.example_graph_cartesian(args.tasks, size=1000,
+                                             precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    profiles = [VehicleProfile(f"profile_{k}", velocity=1 + k,
+                               service_factor=1 + k / 2)
+                for k in range(args.profiles)]
+
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_profile_dimension("time", distance_callback, service_callback)
+    optimizer.vehicle_profiles = [profiles[v % args.profiles]
+                                  for v in range(args.vehicles)]
+
+    t_start = time.perf_counter()
+    result, meta = optimizer.solve(args.time, num_routes=args.vehicles)
+    t_total = time.perf_counter() - t_start
+    num_tasks = sum(len(route) - 2 for route in result)
+    print(f"{args.vehicles} vehicles, {optimizer.stats['transit_callbacks']} "
+          f"transit callbacks, model {t_total - optimizer.stats['solve_time']:.3f}s, "
+          f"{num_tasks} tasks planned, objective {optimizer.stats['objective']}")
+
+
+if __name__ == "__main__":
+    main()
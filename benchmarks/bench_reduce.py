@@ -0,0 +1,54 @@
+"""Solve problems with co-located tasks with and without the reduction.
+
+usage: python benchmarks/bench_reduce.py --tasks 60 --sites 12 --time 5
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.reduce import ReductionTaskOptimizer
+from mamoge.taskplanner.optimize.route import route_cost
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=60)
+    parser.add_argument("--sites", type=int, default=12)
+    parser.add_argument("--time", type=int, default=5)
+    parser.add_argument("--loose", action="store_true",
+                        help="group tasks with different ancestors")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    G = graph_helper.example_graph_colocated(args.tasks, args.sites)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = ReductionTaskOptimizer(strict=not args.loose)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+    t_start = time.perf_counter()
+    plan, _ = optimizer.solve(args.time)
+    t_reduced = time.perf_counter() - t_start
+    print(f"reduced {optimizer.stats['num_tasks']} tasks to "
+          f"{optimizer.stats['num_groups']} groups: {t_reduced:.3f}s, "
+          f"cost {route_cost(Gn, plan[0], time_callback)}")
+
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+    t_start = time.perf_counter()
+    plan, _ = optimizer.solve(args.time)
+    t_full = time.perf_counter() - t_start
+    print(f"monolithic: {t_full:.3f}s, "
+          f"cost {route_cost(Gn, plan[0], time_callback)}")
+
+
+if __name__ == "__main__":
+    main()
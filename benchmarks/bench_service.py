@@ -0,0 +1,64 @@
+"""Report queue latency and throughput of the solver service.
+
+usage: python benchmarks/bench_service.py --problems 16 --workers 4 --tasks 20 --time 1
+"""
+import argparse
+import logging
+import time
+
+import mamoge.taskplanner.nx as mamogenx
+from mamoge_helpers import graph_helper
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.service import SolverService
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def create_optimizer():
+    optimizer = ORTaskOptimizer()
+    optimizer.add_dimension("time", time_callback)
+    return optimizer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--problems", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--time", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    problems = [mamogenx.G_problem_from_dag(
+        graph_helper.example_graph_cartesian(args.tasks, seed=seed, size=100))
+        for seed in range(args.problems)]
+
+    t_start = time.perf_counter()
+    for G in problems:
+        optimizer = create_optimizer()
+        optimizer.graph = G
+        optimizer.solve(args.time)
+    t_serial = time.perf_counter() - t_start
+
+    service = SolverService(create_optimizer, num_workers=args.workers)
+    t_start = time.perf_counter()
+    service.start()
+    t_warm = time.perf_counter() - t_start
+
+    [service.submit(G, time=args.time) for G in problems]
+    service.join()
+    stats = service.stats()
+    service.shutdown()
+
+    print(f"serial:  {t_serial:7.2f}s {args.problems / t_serial:7.2f} problems/s")
+    print(f"service: warm up {t_warm:.2f}s, "
+          f"{stats['throughput']:7.2f} problems/s, "
+          f"queue latency mean {stats['queue_latency_mean']:.3f}s "
+          f"max {stats['queue_latency_max']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,102 @@
+import os
+import uuid
+
 import numpy as np
 import networkx as nx
 
 from abc import abstractmethod
 from typing import Any, List
 
-from geopy import distance as gps_distance
 from mamoge.taskplanner import nx as mamogenx
 
 # %%
 
 
-def cached_result(func):
-    # print("check cache", func)
+class LocationContext():
+    """Cache of location results shared by the locations of one problem.
 
-    cache = {}
+    Locations use the module default context unless they are bound to one
+    of their own, e.g. by :class:`problem.ProblemSnapshot`.
+    """
 
-    def inner(*args, **kw_args):
-        # breakpoint()
-        key = str((args, kw_args))
-        # print("cahce check", key)
+    def __init__(self):
+        self.cache = {}
+
+    def __reduce__(self):
+        # the cache stays in the process, copies start empty
+        return (LocationContext, ())
+
+
+default_context = LocationContext()
+
+
+class GraphRegistry():
+    """Graphs by id for pickling graph locations as small handles.
+
+    Locations referencing a registered graph pickle a :class:`GraphHandle`
+    instead of the graph, unpickling re-attaches it to the graph registered
+    under the same id in the receiving process, e.g. inherited by fork or
+    registered by a pool initializer. The id is kept in G.graph, so a graph
+    pickled once keeps its id.
+    """
+
+    def __init__(self):
+        self.graphs = {}
+
+    def register(self, G: nx.Graph, graph_id=None):
+        """Register a graph and return its id"""
+        graph_id = graph_id or G.graph.get("registry_id") or uuid.uuid4().hex
+        G.graph["registry_id"] = graph_id
+        self.graphs[graph_id] = G
+        return graph_id
+
+    def unregister(self, graph_id):
+        self.graphs.pop(graph_id, None)
+
+    def graph_id(self, G):
+        """Return the id of a registered graph, else None"""
+        attributes = getattr(G, "graph", None)
+        if not isinstance(attributes, dict):
+            return None
+        graph_id = attributes.get("registry_id")
+        return graph_id if self.graphs.get(graph_id) is G else None
+
+    def get(self, graph_id) -> nx.Graph:
+        if graph_id not in self.graphs:
+            raise KeyError(f"Graph {graph_id} is not registered in process "
+                           f"{os.getpid()}")
+        return self.graphs[graph_id]
+
+
+graph_registry = GraphRegistry()
+
+
+def register_graph(G: nx.Graph, graph_id=None):
+    """Register a graph in the default :class:`GraphRegistry`"""
+    return graph_registry.register(G, graph_id)
+
+
+class GraphHandle():
+    """Pickled reference to a graph of the :data:`graph_registry`"""
+
+    def __init__(self, graph_id):
+        self.graph_id = graph_id
+
+    def __repr__(self):
+        return f"GraphHandle({self.graph_id})"
+
+
+def cached_result(func):
+    """Cache the results of a location method in the location context"""
+    name = func.__qualname__
+
+    def inner(self, *args, **kw_args):
+        cache = self.context.cache
+        key = str((name, self, args, kw_args))
         if key in cache:
-            # print("cache hit")
             return cache[key]
-            # return func(*args, **kw_args)
 
-        result = func(*args, **kw_args)
+        result = func(self, *args, **kw_args)
         cache[key] = result
         return result
     return inner
@@ -33,6 +105,8 @@ def cached_result(func):
 class Location:
     """Represent an abstract location."""
 
+    context = default_context
+
     def __init__(self, type: str):
         self.type = type
 
@@ -172,6 +246,7 @@ class GPSLocation(Location):
     @cached_result
     def distance_to(self, other: "GPSLocation") -> float:
         """Return the distance between two gps position, using geopy library and WGS84 ellipsoid"""
+        from geopy import distance as gps_distance
         return gps_distance.distance(self.latlon(), other.latlon()).meters
 
     def __repr__(self):
@@ -289,6 +364,34 @@ class NXLocation(GraphLocation):
 
         return f"NXLocation({self.G_base},Base Ref: {self.nx_args}, {bn})"
 
+    def __getstate__(self):
+        """Return the state with registered graphs as :class:`GraphHandle`"""
+        state = dict(self.__dict__)
+        state.update(state.pop("_graph_handles", {}))
+        for name in ("G_base", "G"):
+            graph_id = graph_registry.graph_id(state.get(name))
+            if graph_id is not None:
+                state[name] = GraphHandle(graph_id)
+        return state
+
+    def __setstate__(self, state):
+        handles = {name: value for name, value in state.items()
+                   if isinstance(value, GraphHandle)}
+        self.__dict__.update({name: value for name, value in state.items()
+                              if name not in handles})
+        self.__dict__["_graph_handles"] = handles
+
+    def __getattr__(self, name):
+        # graphs of handles are attached on first use, so they may be
+        # registered after unpickling
+        handles = self.__dict__.get("_graph_handles", {})
+        if name not in handles:
+            raise AttributeError(name)
+        G = graph_registry.get(handles[name].graph_id)
+        del handles[name]
+        setattr(self, name, G)
+        return G
+
 
 class NXLayerLocation(NXLocation):
 
@@ -351,6 +454,8 @@ def cartesian_offset_to_latlon(x: float, y: float, lat: float, lon: float, beari
         lon: longitude of origin
         bearing: the bearing for x,y offset (in degraa, not radians)
     """
+    from geopy import distance as gps_distance
+
     start = lat, lon
     dx = gps_distance.geodesic(kilometers=x/1000)
     dy = gps_distance.geodesic(kilometers=y/1000)
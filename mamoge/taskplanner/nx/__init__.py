@@ -2,14 +2,13 @@ from typing import Any, List
 import networkx as nx
 from networkx.algorithms import dag
 import numpy as np
-import matplotlib
-import matplotlib.pylab as plt
 import functools
 import numpy as np
 import itertools
 
 from multiprocessing import Pool
-from mamoge.taskplanner.location import ZeroDistanceLocation
+# module import, location imports this module as well
+from mamoge.taskplanner import location as mamogeloc
 
 
 def G_draw_taskgraph_w_pos_layer(G: nx.Graph):
@@ -25,6 +24,8 @@ def G_draw_taskgraph_w_pos_location(G: nx.Graph):
 
 def G_draw_taskgraph(G: nx.Graph, pos=None) -> None:
     """Plot a task graph using location and distance attributes"""
+    import matplotlib.pyplot
+
     fig = matplotlib.pyplot.gcf()
     fig.set_size_inches(18.5, 8.5)
 #    if pos is None:
@@ -58,6 +59,7 @@ def G_draw_taskgraph(G: nx.Graph, pos=None) -> None:
 
 def G_draw_locationgraph(G: nx.Graph, path: List[Any] = None):
     """Plot a task graph using location and distance attributes"""
+    import matplotlib.pylab as plt
 
     fig, ax = plt.subplots(1, 1, figsize=(10, 5))
     pos = {n: G.nodes[n]["location"].as_tuple() for n in G.nodes}
@@ -105,8 +107,6 @@ def G_distance_location(G: nx.Graph, i: Any, j: Any, fallback=None):
         # print("zero distance for node", i, j)
         return 0
 
-    print(n_i, n_j)
-
     location_i = G.nodes[i]["location"]
 
     location_j = G.nodes[j]["location"]
@@ -124,7 +124,7 @@ def G_distance_location(G: nx.Graph, i: Any, j: Any, fallback=None):
             # print("zero distance for node 4", i,j)
             return fallback
 
-    if isinstance(location_j, ZeroDistanceLocation):
+    if isinstance(location_j, mamogeloc.ZeroDistanceLocation):
         if G.has_edge(i, j):
             return 0
         return fallback
@@ -204,6 +204,90 @@ def G_problem_from_dag(G: nx.Graph) -> nx.Graph:
     return Gn
 
 
+def G_dag_from_problem(G: nx.Graph) -> nx.DiGraph:
+    """Return the task dag of a problem graph build by :func:`G_problem_from_dag`.
+
+    Unordered task pairs are connected in both directions within the problem
+    graph, the remaining one-directional arcs are the edges of the task dag.
+    """
+    dag_graph = nx.DiGraph()
+    dag_graph.add_nodes_from(G.nodes(data=True))
+    dag_graph.add_edges_from((u, v) for u, v in G.edges
+                             if not G.has_edge(v, u))
+    return dag_graph
+
+
+def G_arc_matrix(G: nx.Graph, nodelist: List[Any] = None) -> np.ndarray:
+    """Return the boolean matrix of the arcs of G, rows and columns in the
+    order of nodelist (all nodes if None).
+
+    Only the edge view is used, so it also works on a
+    :class:`mamoge.taskplanner.problem.CompactProblem`.
+    """
+    if nodelist is None:
+        nodelist = list(G.nodes)
+    index = {n: i for i, n in enumerate(nodelist)}
+    arcs = np.array([(index[u], index[v]) for u, v in G.edges
+                     if u in index and v in index],
+                    dtype=np.int64).reshape(-1, 2)
+    matrix = np.zeros((len(nodelist), len(nodelist)), dtype=bool)
+    matrix[arcs[:, 0], arcs[:, 1]] = True
+    return matrix
+
+
+def G_add_task(G: nx.Graph, node: Any, predecessors=(), successors=(),
+               **node_args) -> None:
+    """Add a task to a problem graph build by :func:`G_problem_from_dag`.
+
+    The task gets arcs from its predecessors and to its successors (start
+    and end if empty) and arcs in both directions to all unordered tasks.
+    The end node is moved behind the new task to stay the last node.
+    """
+    nodes = list(G.nodes)
+    start, end = nodes[0], nodes[-1]
+    predecessors = list(predecessors) or [start]
+    successors = list(successors) or [end]
+
+    def ordered(seeds, neighbours):
+        # follow the one-directional arcs of the task dag
+        found = set(seeds)
+        stack = list(seeds)
+        while stack:
+            u = stack.pop()
+            for w in neighbours(u):
+                if w not in found and not (G.has_edge(u, w)
+                                           and G.has_edge(w, u)):
+                    found.add(w)
+                    stack.append(w)
+        return found
+
+    ancestors = ordered(predecessors, G.predecessors)
+    descendants = ordered(successors, G.successors)
+
+    end_args = G.nodes[end]
+    end_in = [(u, G.edges[u, end]) for u in G.predecessors(end)]
+    G.remove_node(end)
+
+    if "location" in node_args:
+        node_args["location"].G = G
+    G.add_node(node, **node_args)
+    for u in predecessors:
+        G.add_edge(u, node)
+    for v in successors:
+        if v != end:
+            G.add_edge(node, v)
+    for n in nodes[1:-1]:
+        if n not in ancestors and n not in descendants:
+            G.add_edge(node, n)
+            G.add_edge(n, node)
+
+    G.add_node(end, **end_args)
+    for u, edge_args in end_in:
+        G.add_edge(u, end, **edge_args)
+    if end in successors:
+        G.add_edge(node, end)
+
+
 class TaskConstraint():
     '''structure to save the constraint date for edge(u,v) and dimension with given kwargs'''
 
@@ -221,13 +305,19 @@ class TaskConstraint():
 def G_descendent_constrains(G, kw_args_callback=None):
     first, last = G_first(G), G_last(G)
 
+    if callable(getattr(G, "descendants", None)):
+        # dag precedences of a :class:`problem.CompactProblem`
+        descendants = G.descendants
+    else:
+        def descendants(u): return nx.algorithms.dag.descendants(G, u)
+
     constrains = []
     for u in G.nodes:
 
         if u in (first, last):
             continue
 
-        desc = nx.algorithms.dag.descendants(G, u)
+        desc = descendants(u)
 
         for v in desc:
             if v in (first, last):
@@ -298,6 +388,103 @@ def G_locations_limits(G):
     return xy.min(axis=0), xy.max(axis=0)
 
 
+def G_spatial_clusters(G: nx.DiGraph, nodes: List[Any], num_clusters: int,
+                       iterations=20) -> List[List[Any]]:
+    '''split nodes into spatial clusters (k-means on the location x,y values)
+    which can be visited one after another without violating the task dag G.
+
+    The clusters are ordered by the mean dag depth of their nodes, afterwards
+    every node is moved to the cluster of its latest predecessor if needed.
+    Each returned cluster is in topological order.
+    '''
+    nodes = list(nodes)
+    num_clusters = max(1, min(num_clusters, len(nodes)))
+
+    xy = np.array([(G.nodes[n]["location"].x, G.nodes[n]["location"].y)
+                   for n in nodes], dtype=float)
+
+    # deterministic initialisation along the main axis of the locations
+    order = np.argsort(xy[:, 0] + xy[:, 1], kind="stable")
+    centers = xy[order[np.linspace(0, len(nodes) - 1, num_clusters).astype(int)]]
+
+    labels = np.zeros(len(nodes), dtype=int)
+    for _ in range(iterations):
+        distances = ((xy[:, None, :] - centers[None, :, :])**2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if _ > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(num_clusters):
+            members = labels == c
+            if members.any():
+                centers[c] = xy[members].mean(axis=0)
+
+    topological = list(nx.topological_sort(G))
+    depth = {}
+    for n in topological:
+        depth[n] = max((depth[p] + 1 for p in G.predecessors(n)), default=0)
+
+    node_depth = np.array([depth[n] for n in nodes], dtype=float)
+    cluster_depth = np.array([node_depth[labels == c].mean()
+                              if (labels == c).any() else np.inf
+                              for c in range(num_clusters)])
+    rank = np.argsort(np.argsort(cluster_depth, kind="stable"))
+
+    node_rank = {n: int(rank[labels[i]]) for i, n in enumerate(nodes)}
+    # latest cluster rank of any ancestor (passing through non cluster nodes)
+    ancestor_rank = {}
+    for n in topological:
+        pred_rank = max((ancestor_rank[p] for p in G.predecessors(n)),
+                        default=0)
+        if n in node_rank:
+            node_rank[n] = max(node_rank[n], pred_rank)
+            pred_rank = node_rank[n]
+        ancestor_rank[n] = pred_rank
+
+    clusters = [[] for _ in range(num_clusters)]
+    for n in topological:
+        if n in node_rank:
+            clusters[node_rank[n]].append(n)
+
+    return [c for c in clusters if len(c) > 0]
+
+
+def G_layer_windows(G: nx.DiGraph, nodes: List[Any], window: int,
+                    look_ahead=0) -> List[tuple]:
+    '''split nodes into windows of `window` consecutive layers of the task
+    dag G, which can be visited one after another.
+
+    The layer is the `layer` node attribute (dag depth if missing), raised to
+    the layer of the latest predecessor if needed. Returns a list of
+    (window nodes, look-ahead nodes) with the nodes of the next `look_ahead`
+    layers, both in topological order.
+    '''
+    topological = list(nx.topological_sort(G))
+    layer = {}
+    for n in topological:
+        pred_layer = max((layer[p] for p in G.predecessors(n)), default=0)
+        own_layer = G.nodes[n].get("layer")
+        if own_layer is None:
+            own_layer = max((layer[p] + 1 for p in G.predecessors(n)),
+                            default=0)
+        layer[n] = max(own_layer, pred_layer)
+
+    node_set = set(nodes)
+    layers = sorted({layer[n] for n in node_set})
+    rank = {l: i for i, l in enumerate(layers)}
+    window = max(1, window)
+
+    windows = []
+    for first in range(0, len(layers), window):
+        last = first + window
+        window_nodes = [n for n in topological if n in node_set
+                        and first <= rank[layer[n]] < last]
+        look_ahead_nodes = [n for n in topological if n in node_set
+                            and last <= rank[layer[n]] < last + look_ahead]
+        windows.append((window_nodes, look_ahead_nodes))
+    return windows
+
+
 def G_enhance_length(G: nx.Graph):
     '''add length attribute to each edge base on underlying location distance'''
     for ed in G.edges:
@@ -394,14 +581,18 @@ def G_cost_vector(G, cost_callback, cost_fallback=np.inf):
     return cost_vector
 
 
-def G_distance_matrix(G, distance_fallback=np.inf):
-    l = len(G)
+def G_distance_matrix(G, distance_fallback=np.inf, nodelist=None):
+    '''symmetric distance matrix of the node locations, rows and columns in
+    the order of nodelist (all nodes if None)'''
+    if nodelist is None:
+        nodelist = list(G.nodes)
+    l = len(nodelist)
     distance_matrix = np.zeros((l, l))
     # distance_matrix
 
     for i, j in itertools.combinations(range(l), r=2):
-        l1 = G.nodes[i]["location"]
-        l2 = G.nodes[j]["location"]
+        l1 = G.nodes[nodelist[i]]["location"]
+        l2 = G.nodes[nodelist[j]]["location"]
 
         d1 = l1.distance_to(l2)
 
@@ -415,7 +606,10 @@ def G_distance_matrix(G, distance_fallback=np.inf):
     return distance_matrix
 
 
-def G_cost_matrix(G, cost_callback, cost_fallback=np.inf):
+def G_cost_matrix(G, cost_callback, cost_fallback=np.inf, processes=None):
+    '''symmetric cost matrix of the node pairs, evaluated in a pool of
+    processes if given (locations of registered graphs are sent as handles,
+    see :class:`location.GraphRegistry`)'''
     l = len(G)
     cost_matrix = np.zeros((l, l))
     # cost_matrix
@@ -423,9 +617,8 @@ def G_cost_matrix(G, cost_callback, cost_fallback=np.inf):
     ij_args = list(itertools.combinations(range(l), r=2))
     # print(list(ij_args))
 
-    run_mp = False
-    if run_mp:
-        with Pool(5) as mp:
+    if processes:
+        with Pool(processes) as mp:
             # results = mp.map(functools.partial(cost_callback, G), ij_args)
             results = mp.map(functools.partial(
                 multiprocessing_partial, cost_callback, G), ij_args)
@@ -1,26 +1,149 @@
 from abc import abstractmethod
+import logging
+import time as timer
 
 import networkx as nx
 
-from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.optimize.cache import PlanCache, problem_hash
+from mamoge.taskplanner.optimize.insertion import cheapest_insertion
+from mamoge.taskplanner.optimize.matrix import TransitCache
+from mamoge.taskplanner.optimize.route import route_array_to_meta
+
+
+def __getattr__(name):
+    # OR-Tools is loaded on first use of the optimizer, not on package import
+    if name == "ORTaskOptimizer":
+        from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+        return ORTaskOptimizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class TaskOptimizer:
 
-    def __init__(self) -> None:
+    def __init__(self, impl=None, cache: PlanCache = None,
+                 exact_threshold=16) -> None:
         self.graph = None
-        self.impl = ORTaskOptimizer()
+        if impl is None:
+            from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+            impl = ORTaskOptimizer()
+        self.impl = impl
+        self.cache = cache
+        self.cache_entry = None
+        # problems with up to this many tasks are solved exactly
+        self.exact_threshold = exact_threshold
+        self.transits = None
+        self.logger = logging.getLogger(__name__)
         pass
 
     def set_graph(self, G: nx.Graph) -> None:
         """Set the problem graph to be optimized."""
         # self.graph = G
         self.impl.graph = G
+        self.transits = None
+
+    def add_dimension(self, *args, **kw_args):
+        self.impl.add_dimension(*args, **kw_args)
+
+    def add_capacity(self, *args, **kw_args):
+        self.impl.add_capacity(*args, **kw_args)
+
+    def exact_impl(self):
+        """Return a DPTaskOptimizer for small OR-Tools problems, else None"""
+        from mamoge.taskplanner.optimize.exact import DPTaskOptimizer
+        from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+
+        if (not self.exact_threshold or not isinstance(self.impl, ORTaskOptimizer)
+                or len(self.impl.graph) - 2 > self.exact_threshold):
+            return None
+
+        exact = DPTaskOptimizer()
+        exact.graph = self.impl.graph
+        exact.dimensions = self.impl.dimensions
+        exact.capacities = self.impl.capacities
+        exact.penalty_dimension = self.impl.penalty_dimension
+        return exact
+
+    def settings(self) -> dict:
+        """Return the settings of the optimizer that change the plan"""
+        settings = dict(exact_threshold=self.exact_threshold)
+        if hasattr(self.impl, "settings"):
+            settings.update(self.impl.settings())
+        return settings
+
+    def solve_impl(self, time, constraints):
+        exact = self.exact_impl()
+        if exact is not None:
+            plan, meta = exact.solve(time, constraints=constraints)
+            if len(plan) > 0:
+                return plan, meta
+        return self.impl.solve(time, constraints=constraints)
 
     @abstractmethod
-    def solve(self, time=30, constraints=None):
-        """Solve the optimization problem."""
+    def solve(self, time=30, constraints=None, max_age=None):
+        """Solve the optimization problem.
+
+        With a plan cache, a stored plan for the same problem is returned
+        unless it is older than max_age seconds. The cache entry (key,
+        creation and solve time) is available as :attr:`cache_entry`.
+        Problems without canonical form (see :func:`cache.canonical_value`)
+        are solved without the cache.
+
+        OR-Tools problems with up to exact_threshold tasks are solved with
+        the exact :class:`DPTaskOptimizer`, falling back to OR-Tools if the
+        optimal route violates capacities or constraints.
+        """
         if constraints is None:
             constraints = []
         # raise "solve not implemented"
-        return self.impl.solve(time, constraints=constraints)
+        if self.cache is None:
+            return self.solve_impl(time, constraints)
+
+        try:
+            key = problem_hash(self.impl.graph, self.impl.dimensions,
+                               self.impl.capacities, constraints, time,
+                               settings=self.settings())
+        except TypeError as e:
+            self.logger.warning(f"Problem is not cached, {e}")
+            self.cache_entry = None
+            return self.solve_impl(time, constraints)
+        self.cache_entry = self.cache.get(key, max_age=max_age)
+        if self.cache_entry is not None:
+            return self.cache_entry.plan, self.cache_entry.meta
+
+        t_start = timer.perf_counter()
+        plan, meta = self.solve_impl(time, constraints)
+        solve_time = timer.perf_counter() - t_start
+
+        if len(plan) > 0:
+            self.cache_entry = self.cache.put(key, plan, meta,
+                                              solve_time=solve_time)
+        return plan, meta
+
+    def insert_task(self, route, node, predecessors=(), successors=(),
+                    time=30, constraints=None, **node_args):
+        """Insert a new task into a planned route.
+
+        The task is added to the problem graph (see
+        :func:`mamogenx.G_add_task`) and inserted at the cheapest feasible
+        position of the route (see :func:`insertion.cheapest_insertion`),
+        the transits are cached between calls. Only if there is no feasible
+        position the whole problem is solved again. Returns (plan, meta)
+        like :meth:`solve`.
+        """
+        if constraints is None:
+            constraints = []
+        G = self.impl.graph
+        mamogenx.G_add_task(G, node, predecessors, successors, **node_args)
+
+        if self.transits is None or self.transits.G is not G:
+            self.transits = TransitCache(G, self.impl.dimensions,
+                                         self.impl.capacities)
+        new_route, array = cheapest_insertion(route, node, self.transits,
+                                              predecessors, successors,
+                                              constraints)
+        if new_route is not None:
+            return [new_route], [route_array_to_meta(array)]
+
+        self.logger.info(f"No feasible insertion of {node}, solving again")
+        return self.solve(time, constraints)
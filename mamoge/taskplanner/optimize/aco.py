@@ -1,13 +1,11 @@
-import functools
-from itertools import chain
 from itertools import permutations
-from multiprocessing import Pool
 
 import acopy
 import networkx as nx
 import numpy as np
 
 from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.optimize.aco_numpy import ACOWorkerPool, pheromone_update
 
 
 class VebasAnt(acopy.ant.Ant):
@@ -35,8 +33,7 @@ class VebasAnt(acopy.ant.Ant):
         solution = self.initialize_solution(graph)
         unvisited = self.get_unvisited_nodes(graph, solution)
 
-        max_nodes = 25
-        while unvisited and len(solution.path) < max_nodes:
+        while unvisited:
             node = self.choose_destination(graph, solution.current, unvisited)
             solution.add_node(node)
             unvisited.remove(node)
@@ -77,70 +74,96 @@ class VebasColony(acopy.ant.Colony):
         return [VebasAnt(**vars(self)) for __ in range(count)]
 
 
-def _call(func, *args):
-    return func(*args)
-
-
-def _call_ant_tour(ant, graph):
-    return ant.tour(graph)
-
-
-def _call_mp(self, *args):
-    ants = args[0][0]
-    graph = args[0][1]
-
-    return list(chain([ant.tour(graph) for ant in ants]))
-
-
 class VebasMPSolver(acopy.Solver):
+    """Solver building the ant tours in worker processes.
+
+    The pheromone and weights of the graph are converted to matrices in the
+    shared memory of an :class:`ACOWorkerPool`, the workers only return the
+    node sequences which are turned into acopy solutions again. With a task
+    dag the ants only pick tasks whose predecessors are done.
+    """
 
-    def __init__(self, rho, q, top=None, plugins=None, num_processes=None):
+    def __init__(self, rho, q, top=None, plugins=None, num_processes=None,
+                 tau_min=None, tau_max=None, dag: nx.DiGraph = None):
         super().__init__(rho=rho, q=q, top=top, plugins=plugins)
+        self.dag = dag
         self.num_processes = num_processes if num_processes else 5
-        self.mp = Pool(self.num_processes)
+        self.tau_min = tau_min
+        self.tau_max = tau_max
+        self.pool = None
+        self.rng = np.random.default_rng()
 
     def find_solutions(self, graph, ants):
-
-        ant_chunks = [
-            ants[i::self.num_processes] for i in range(self.num_processes)
-        ]
-
-        _ant_call_w_graph = functools.partial(_call_ant_tour, graph=graph)
-
-        # results = self.mp.map(_ant_call_w_graph, [ant for ant in ants])
-
-        results = [_ant_call_w_graph(ant) for ant in ants]
-
-        # result_list = self.mp.map(_call_mp, [(ant_chunk, graph)
-        #                                      for ant_chunk in ant_chunks])
-        # result_list = self.mp.map(_call,
-        #                           [(ant, graph) for ant_chunk in ant_chunks])
-
-        # results = []
-        # for r in result_list:
-        #     results.extend(r)
-
-        # ipdb.set_trace()
-
-        return results
+        nodes = list(graph.nodes)
+        alpha, beta = ants[0].alpha, ants[0].beta
+
+        weight = nx.to_numpy_array(graph, nodelist=nodes, weight="weight",
+                                   nonedge=np.inf)
+        pheromone = nx.to_numpy_array(graph, nodelist=nodes, weight="pheromone")
+        # same score as VebasAnt.score_edge, zero weight edges score 0
+        with np.errstate(divide="ignore"):
+            heuristic = np.where(weight > 0, 1 / weight, 0)
+        weights = pheromone**alpha * heuristic**beta
+
+        if self.pool is None or self.pool.shape[0] != len(nodes):
+            self.close()
+            self.pool = ACOWorkerPool(len(nodes), self.num_processes)
+        self.pool.set_matrix("cost_matrix", np.where(np.isfinite(weight), weight, 0))
+        self.pool.set_matrix("allowed", np.isfinite(weight))
+        self.pool.set_matrix("weights", weights)
+        if self.dag is not None:
+            self.pool.set_matrix("successors", nx.to_numpy_array(
+                self.dag, nodelist=nodes, weight=None) > 0)
+
+        start = nodes.index(ants[0].get_starting_node(graph))
+        tours, _ = self.pool.construct(len(ants), start, None, self.rng,
+                                       precedence=self.dag is not None)
+
+        solutions = []
+        for ant, tour in zip(ants, tours):
+            solution = ant.initialize_solution(graph)
+            for i in tour[1:]:
+                solution.add_node(nodes[i])
+            solution.close()
+            solutions.append(solution)
+        return solutions
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
 
     def global_update(self, state):
         """Perform a global pheromone update.
+
+        The pheromone of the graph is updated as a matrix with
+        :func:`pheromone_update`, the edges of the top solutions are deposited
+        in one pass. tau_min and tau_max bound the pheromone (MMAS).
+
         :param state: solver state
         :type state: :class:`~State`
         """
-        # ipdb.set_trace()
-        for edge in state.graph.edges:
-            amount = 0
-            if self.top:
-                solutions = state.solutions[:self.top]
-            else:
-                solutions = state.solutions
-            for solution in solutions:
-                if edge in solution.path:
-                    amount += self.q / solution.cost
-            p = state.graph.edges[edge]["pheromone"]
-            state.graph.edges[edge]["pheromone"] = (1 - self.rho) * p + amount
+        graph = state.graph
+        nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+
+        if self.top:
+            solutions = state.solutions[:self.top]
+        else:
+            solutions = state.solutions
+        tours = [[index[u] for u, _ in solution.path] +
+                 [index[solution.path[-1][1]]]
+                 for solution in solutions if len(solution.path) > 0]
+        costs = [solution.cost for solution in solutions
+                 if len(solution.path) > 0]
+
+        pheromone = nx.to_numpy_array(graph, nodelist=nodes, weight="pheromone")
+        if len(tours) > 0:
+            pheromone_update(pheromone, tours, costs, self.rho, self.q,
+                             tau_min=self.tau_min, tau_max=self.tau_max,
+                             symmetric=not graph.is_directed())
+        for u, v, data in graph.edges(data=True):
+            data["pheromone"] = pheromone[index[u], index[v]]
 
 
 class ACOTaskOptimizer:
@@ -190,6 +213,7 @@ class ACOTaskOptimizer:
             rho=0.3,
             q=1,
             top=5,
+            dag=mamogenx.G_dag_from_problem(self.graph),
             plugins=[
                 acopy.plugins.Printout(),
                 acopy.plugins.EliteTracer(),
@@ -202,7 +226,10 @@ class ACOTaskOptimizer:
         print("solving...")
         # %%
 
-        tour = solver.solve(G, colony, limit=100, gen_size=500)
+        try:
+            tour = solver.solve(G, colony, limit=100, gen_size=500)
+        finally:
+            solver.close()
 
         best_path = tour.nodes
 
@@ -0,0 +1,546 @@
+import logging
+import multiprocessing
+import os
+import time as timer
+from multiprocessing import shared_memory
+
+import networkx as nx
+import numpy as np
+
+from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.optimize.local_search import LocalSearch
+from mamoge.taskplanner.optimize.route import route_array, route_array_to_meta
+
+
+def aco_heuristic(cost_matrix: np.ndarray) -> np.ndarray:
+    """Return the heuristic matrix eta = 1 / cost.
+
+    Zero costs (co-located nodes) get the best heuristic of the matrix
+    instead of an infinite value, forbidden (inf, nan) arcs get 0.
+    """
+    cost = np.where(np.isfinite(cost_matrix), cost_matrix, np.inf)
+    positive = cost[(cost > 0) & np.isfinite(cost)]
+    floor = positive.min() / 10 if len(positive) > 0 else 1.0
+    return 1 / np.maximum(cost, floor)
+
+
+def tour_costs(cost_matrix: np.ndarray, tours: np.ndarray) -> np.ndarray:
+    """Return the cost of each tour (one tour per row)"""
+    return cost_matrix[tours[:, :-1], tours[:, 1:]].sum(axis=1)
+
+
+def candidate_lists(cost_matrix: np.ndarray, num_candidates: int) -> np.ndarray:
+    """Return the num_candidates nearest neighbours of every node (n x k)"""
+    cost = np.where(np.isnan(cost_matrix), np.inf, cost_matrix).astype(float)
+    np.fill_diagonal(cost, np.inf)
+    k = min(num_candidates, len(cost) - 1)
+    nearest = np.argpartition(cost, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(cost, nearest, axis=1), axis=1,
+                       kind="stable")
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def _roulette(scores: np.ndarray, total: np.ndarray,
+              rng: np.random.Generator) -> np.ndarray:
+    """Return one column per row, sampled proportional to the scores"""
+    threshold = rng.random(len(scores)) * total
+    return np.argmax(np.cumsum(scores, axis=1) > threshold[:, None], axis=1)
+
+
+def construct_tours(weights: np.ndarray, cost_matrix: np.ndarray,
+                    allowed: np.ndarray, start: int, end: int, num_ants: int,
+                    rng: np.random.Generator, successors: np.ndarray = None,
+                    candidates: np.ndarray = None):
+    """Build the tours of num_ants ants in lockstep, return tours and costs.
+
+    weights is the attractiveness matrix, every step samples the next node of
+    all ants with one roulette wheel selection over its rows. Tours are open
+    paths from start to end, without a fixed last node when end is None.
+
+    With candidate lists (see :func:`candidate_lists`) an ant only scores the
+    candidates of its current node, the full row is used only when all
+    candidates are visited or blocked. This makes a step O(k) per ant.
+
+    With the task dag as boolean successors matrix, every ant counts the
+    unvisited predecessors of each node and only samples nodes whose count is
+    zero, so all tours respect the precedences. An ant without any allowed
+    arc left continues with a random ready node, its tour is infeasible and
+    gets an infinite cost.
+    """
+    n = len(weights)
+    ants = np.arange(num_ants)
+    if successors is not None:
+        remaining = np.tile(successors.sum(axis=0, dtype=np.int32), (num_ants, 1))
+        remaining -= successors[start]
+        # successor lists in compressed rows, only those counts change per step
+        succ_nodes, succ_index = np.nonzero(successors)
+        succ_ptr = np.searchsorted(succ_nodes, np.arange(n + 1))
+
+    tours = np.empty((num_ants, n), dtype=int)
+    tours[:, 0] = start
+    visited = np.zeros((num_ants, n), dtype=bool)
+    visited[:, start] = True
+    feasible = np.ones(num_ants, dtype=bool)
+    num_steps = n
+    if end is not None:
+        tours[:, -1] = end
+        visited[:, end] = True
+        num_steps = n - 1
+
+    for step in range(1, num_steps):
+        current = tours[:, step - 1]
+
+        if candidates is None:
+            full = ants
+        else:
+            cand = candidates[current]
+            scores = weights[current[:, None], cand]
+            blocked = visited[ants[:, None], cand]
+            if successors is not None:
+                blocked |= remaining[ants[:, None], cand] > 0
+            scores[blocked] = 0
+            total = scores.sum(axis=1)
+
+            nodes = cand[ants, _roulette(scores, total, rng)]
+            full = ants[total <= 0]
+
+        if len(full) > 0:
+            blocked = visited[full]
+            if successors is not None:
+                blocked |= remaining[full] > 0
+            scores = weights[current[full]]
+            scores[blocked] = 0
+            total = scores.sum(axis=1)
+
+            stuck = total <= 0
+            if stuck.any():
+                feasible[full[stuck]] = False
+                scores[stuck] = ~blocked[stuck]
+                total[stuck] = scores[stuck].sum(axis=1)
+
+            if candidates is None:
+                nodes = _roulette(scores, total, rng)
+            else:
+                nodes[full] = _roulette(scores, total, rng)
+
+        tours[:, step] = nodes
+        visited[ants, nodes] = True
+        if successors is not None:
+            counts = succ_ptr[nodes + 1] - succ_ptr[nodes]
+            offsets = np.repeat(succ_ptr[nodes] - np.cumsum(counts) + counts,
+                                counts) + np.arange(counts.sum())
+            remaining[np.repeat(ants, counts), succ_index[offsets]] -= 1
+
+    if end is not None and n > 1:
+        feasible &= allowed[tours[:, -2], end]
+
+    costs = tour_costs(cost_matrix, tours)
+    costs[~feasible] = np.inf
+    return tours, costs
+
+
+# shared matrices of a pool worker process, see ACOWorkerPool
+_worker_matrices = {}
+
+
+def _attach_shared(names, shapes, dtypes):
+    for key, name in names.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_matrices[key] = (shm, np.ndarray(shapes[key], dtype=dtypes[key],
+                                                 buffer=shm.buf))
+
+
+def _construct_chunk(num_ants, start, end, seed, precedence, use_candidates):
+    weights, cost_matrix, allowed, successors, candidates = (
+        _worker_matrices[key][1] for key in
+        ("weights", "cost_matrix", "allowed", "successors", "candidates"))
+    return construct_tours(weights, cost_matrix, allowed, start, end, num_ants,
+                           np.random.default_rng(seed),
+                           successors=successors if precedence else None,
+                           candidates=candidates if use_candidates else None)
+
+
+def pheromone_update(pheromone: np.ndarray, tours, costs, rho, q,
+                     tau_min=None, tau_max=None, symmetric=False) -> np.ndarray:
+    """Evaporate the pheromone matrix in place and deposit q / cost per tour.
+
+    tours is a 2d array or a list of node index sequences, the arcs of all
+    tours are scattered into one deposit matrix. With symmetric the deposit
+    is applied in both directions (undirected graphs). The result is clipped
+    to [tau_min, tau_max] if given (MAX-MIN ant system).
+    """
+    amounts = q / np.maximum(np.asarray(costs, dtype=float), 1e-9)
+    if isinstance(tours, np.ndarray):
+        us, vs = tours[:, :-1].ravel(), tours[:, 1:].ravel()
+        deposits = np.repeat(amounts, tours.shape[1] - 1)
+    else:
+        tours = [np.asarray(tour, dtype=int) for tour in tours]
+        us = np.concatenate([tour[:-1] for tour in tours])
+        vs = np.concatenate([tour[1:] for tour in tours])
+        deposits = np.repeat(amounts, [len(tour) - 1 for tour in tours])
+
+    deposit = np.zeros_like(pheromone)
+    np.add.at(deposit, (us, vs), deposits)
+    if symmetric:
+        deposit += deposit.T
+
+    pheromone *= 1 - rho
+    pheromone += deposit
+    if tau_min is not None or tau_max is not None:
+        np.clip(pheromone, tau_min, tau_max, out=pheromone)
+    return pheromone
+
+
+class ACOWorkerPool():
+    """Worker processes building ant tours on shared memory matrices.
+
+    The attractiveness, cost and allowed matrices live in shared memory, the
+    workers attach to them once and only the node sequences and costs of the
+    tours are sent back, no graph or matrix is pickled per iteration.
+
+    usage:
+        with ACOWorkerPool(num_nodes, num_processes=4) as pool:
+            pool.set_matrix("cost_matrix", cost_matrix)
+            ...
+            tours, costs = pool.construct(num_ants, start, end, rng)
+    """
+
+    DTYPES = dict(weights=np.float64, cost_matrix=np.float64, allowed=bool,
+                  successors=bool, candidates=np.int64)
+
+    def __init__(self, num_nodes: int, num_processes=None, context=None,
+                 num_candidates=0):
+        self.num_processes = num_processes if num_processes else os.cpu_count()
+        self.shape = (num_nodes, num_nodes)
+        shapes = {key: self.shape for key in self.DTYPES}
+        shapes["candidates"] = (num_nodes, num_candidates)
+        self.shared = {}
+        self.matrices = {}
+        for key, dtype in self.DTYPES.items():
+            size = max(int(np.prod(shapes[key])) * np.dtype(dtype).itemsize, 1)
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shared[key] = shm
+            self.matrices[key] = np.ndarray(shapes[key], dtype=dtype,
+                                            buffer=shm.buf)
+
+        self.pool = multiprocessing.get_context(context).Pool(
+            self.num_processes, initializer=_attach_shared,
+            initargs=({key: shm.name for key, shm in self.shared.items()},
+                      shapes, self.DTYPES))
+
+    def set_matrix(self, key: str, matrix: np.ndarray) -> None:
+        self.matrices[key][:] = matrix
+
+    def construct(self, num_ants: int, start: int, end: int,
+                  rng: np.random.Generator, precedence=False,
+                  use_candidates=False):
+        """Split the ants into one chunk per process and build their tours.
+
+        With precedence the tours respect the shared successors matrix, with
+        use_candidates the moves are restricted to the shared candidates.
+        """
+        chunks = [len(c) for c in np.array_split(np.arange(num_ants),
+                                                 self.num_processes)]
+        seeds = rng.integers(2**63, size=len(chunks))
+        results = self.pool.starmap(
+            _construct_chunk,
+            [(chunk, start, end, seed, precedence, use_candidates)
+             for chunk, seed in zip(chunks, seeds) if chunk > 0])
+        return (np.concatenate([tours for tours, _ in results]),
+                np.concatenate([costs for _, costs in results]))
+
+    def close(self) -> None:
+        self.pool.close()
+        self.pool.join()
+        self.matrices = {}
+        for shm in self.shared.values():
+            shm.close()
+            shm.unlink()
+        self.shared = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ACOEngine():
+    """Ant colony on dense pheromone and heuristic matrices.
+
+    The tours of all ants are built step by step in parallel, each step
+    samples the next node of every ant with one vectorized roulette wheel
+    selection over the rows of the attractiveness matrix
+    pheromone**alpha * heuristic**beta. Tours are open paths from start to
+    end, only arcs marked in allowed are used as long as possible. With the
+    successors matrix of the task dag the tours respect its precedences.
+
+    With num_candidates the ants move to the nearest allowed neighbours of
+    their node first (see :func:`candidate_lists`). With num_processes > 1
+    the tours are built by an :class:`ACOWorkerPool` during :meth:`run`.
+
+    With local_search the top tours of every iteration are improved by
+    :class:`LocalSearch` before the pheromone update, at most
+    local_search_moves moves per tour.
+    """
+
+    def __init__(self, cost_matrix: np.ndarray, start=0, end=None,
+                 allowed: np.ndarray = None, alpha=1, beta=3, rho=0.3, q=1,
+                 top=5, seed=None, num_processes=None, mmas=False,
+                 successors: np.ndarray = None, num_candidates=None,
+                 local_search=False, local_search_moves=None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.cost_matrix = np.asarray(cost_matrix, dtype=float)
+        self.num_nodes = len(self.cost_matrix)
+        self.start = start
+        self.end = end if end is not None else self.num_nodes - 1
+        self.alpha = alpha
+        self.beta = beta
+        self.rho = rho
+        self.q = q
+        self.top = top
+        self.mmas = mmas
+        self.rng = np.random.default_rng(seed)
+        self.num_processes = num_processes
+        self.pool = None
+
+        if allowed is None:
+            allowed = np.isfinite(self.cost_matrix)
+        self.allowed = allowed & ~np.eye(self.num_nodes, dtype=bool)
+        self.successors = successors
+        self.candidates = None
+        if num_candidates is not None and num_candidates < self.num_nodes - 1:
+            self.candidates = candidate_lists(
+                np.where(self.allowed, self.cost_matrix, np.inf), num_candidates)
+        self.heuristic = aco_heuristic(self.cost_matrix) ** self.beta
+        self.local_search = self.create_local_search() if local_search else None
+        self.local_search_moves = local_search_moves
+        # set from the first solutions, see update()
+        self.pheromone = None
+
+        self.best_tour = None
+        self.best_cost = np.inf
+        self.iterations = 0
+        self.num_ants = 0
+
+    def create_local_search(self) -> LocalSearch:
+        return LocalSearch(self.cost_matrix, allowed=self.allowed,
+                           successors=self.successors,
+                           candidates=self.candidates)
+
+    def improve(self, tours: np.ndarray, costs: np.ndarray, time=None) -> None:
+        """Improve the top feasible tours in place with the local search"""
+        t_end = timer.perf_counter() + time if time is not None else None
+        order = np.argsort(costs, kind="stable")[:self.top or 1]
+        for index in order[np.isfinite(costs[order])]:
+            remaining = t_end - timer.perf_counter() if t_end is not None else None
+            tours[index], costs[index] = self.local_search.improve(
+                tours[index], max_moves=self.local_search_moves, time=remaining)
+
+    def attractiveness(self) -> np.ndarray:
+        pheromone = self.pheromone if self.pheromone is not None else 1.0
+        return np.where(self.allowed, pheromone**self.alpha * self.heuristic, 0)
+
+    def construct(self, num_ants: int):
+        """Build tours for num_ants ants, return tours and costs.
+
+        With a worker pool the ants are split into one chunk per process.
+        """
+        weights = self.attractiveness()
+        if self.pool is None:
+            tours, costs = construct_tours(weights, self.cost_matrix,
+                                           self.allowed, self.start, self.end,
+                                           num_ants, self.rng,
+                                           successors=self.successors,
+                                           candidates=self.candidates)
+        else:
+            self.pool.set_matrix("weights", weights)
+            tours, costs = self.pool.construct(
+                num_ants, self.start, self.end, self.rng,
+                precedence=self.successors is not None,
+                use_candidates=self.candidates is not None)
+        self.num_ants += num_ants
+        return tours, costs
+
+    def pheromone_bounds(self):
+        """Return the MMAS bounds (tau_min, tau_max) for the best cost so far"""
+        tau_max = self.q / (self.rho * max(self.best_cost, 1e-9))
+        return tau_max / (2 * self.num_nodes), tau_max
+
+    def update(self, tours: np.ndarray, costs: np.ndarray) -> None:
+        """Evaporate and deposit q / cost on the arcs of the top tours.
+
+        The pheromone starts at q / (rho * best cost) of the first feasible
+        solutions, so the deposits and the evaporation are on the same scale.
+        With mmas the pheromone is kept within :meth:`pheromone_bounds`.
+        """
+        order = np.argsort(costs, kind="stable")
+        if self.top:
+            order = order[:self.top]
+        order = order[np.isfinite(costs[order])]
+        if len(order) == 0:
+            return
+
+        if costs[order[0]] < self.best_cost:
+            self.best_cost = costs[order[0]]
+            self.best_tour = tours[order[0]].copy()
+
+        tau_min, tau_max = self.pheromone_bounds()
+        if self.pheromone is None:
+            self.pheromone = np.full(self.cost_matrix.shape, tau_max)
+        if not self.mmas:
+            tau_min, tau_max = None, None
+
+        pheromone_update(self.pheromone, tours[order], costs[order], self.rho,
+                         self.q, tau_min=tau_min, tau_max=tau_max)
+
+    def run(self, time=30, num_ants=100, limit=None):
+        """Iterate until the time budget or the iteration limit is used up"""
+        if limit is not None and limit < 1:
+            raise ValueError(f"Iteration limit {limit} must be at least 1")
+        t_end = timer.perf_counter() + time
+        if self.num_processes is not None and self.num_processes > 1:
+            num_candidates = (self.candidates.shape[1]
+                              if self.candidates is not None else 0)
+            self.pool = ACOWorkerPool(self.num_nodes, self.num_processes,
+                                      num_candidates=num_candidates)
+            self.pool.set_matrix("cost_matrix", self.cost_matrix)
+            self.pool.set_matrix("allowed", self.allowed)
+            if self.successors is not None:
+                self.pool.set_matrix("successors", self.successors)
+            if self.candidates is not None:
+                self.pool.set_matrix("candidates", self.candidates)
+        try:
+            while limit is None or self.iterations < limit:
+                tours, costs = self.construct(num_ants)
+                if self.local_search is not None:
+                    self.improve(tours, costs, time=t_end - timer.perf_counter())
+                self.update(tours, costs)
+                self.iterations += 1
+                if timer.perf_counter() >= t_end:
+                    break
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
+
+        if self.best_tour is None:
+            # no feasible tour found, return the last one anyway
+            self.best_tour = tours[np.argmin(tour_costs(self.cost_matrix, tours))]
+        return self.best_tour, self.best_cost
+
+
+class NumpyACOTaskOptimizer():
+    """ACO optimizer on NumPy matrices, a replacement for ACOTaskOptimizer.
+
+    Costs are the location distances, the ants only move along the arcs of
+    the problem graph (see :func:`mamoge.taskplanner.nx.G_problem_from_dag`)
+    from its first to its last node. With precedence the ants follow the
+    task dag recovered from the problem graph, num_candidates nearest
+    neighbours restrict the moves (None for the full set).
+    """
+
+    def __init__(self, alpha=1, beta=3, rho=0.3, q=1, top=5, num_ants=500,
+                 limit=100, seed=None, num_processes=None, mmas=False,
+                 precedence=True, num_candidates=20, local_search=False,
+                 local_search_moves=None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.graph: nx.Graph = None
+        self.G_idx2node = None
+        self.G_node2idx = None
+        self.alpha = alpha
+        self.beta = beta
+        self.rho = rho
+        self.q = q
+        self.top = top
+        self.num_ants = num_ants
+        self.limit = limit
+        self.seed = seed
+        self.num_processes = num_processes
+        self.mmas = mmas
+        self.precedence = precedence
+        self.num_candidates = num_candidates
+        self.local_search = local_search
+        self.local_search_moves = local_search_moves
+        self.stats = {}
+
+    def set_graph(self, G: nx.Graph) -> None:
+        """set the problem graph to be optimized"""
+        self.graph = G
+
+    def create_engine(self) -> ACOEngine:
+        # the engine works on the indices of the nodes in G_idx2node
+        self.G_idx2node = list(self.graph.nodes)
+        self.G_node2idx = {n: i for i, n in enumerate(self.G_idx2node)}
+        distance_matrix = mamogenx.G_distance_matrix(self.graph,
+                                                     nodelist=self.G_idx2node)
+        allowed = mamogenx.G_arc_matrix(self.graph, self.G_idx2node)
+        successors = None
+        if self.precedence:
+            dag = mamogenx.G_dag_from_problem(self.graph)
+            successors = mamogenx.G_arc_matrix(dag, self.G_idx2node)
+
+        return ACOEngine(distance_matrix,
+                         start=self.G_node2idx[mamogenx.G_first(self.graph)],
+                         end=self.G_node2idx[mamogenx.G_last(self.graph)],
+                         allowed=allowed,
+                         alpha=self.alpha, beta=self.beta, rho=self.rho,
+                         q=self.q, top=self.top, seed=self.seed,
+                         num_processes=self.num_processes, mmas=self.mmas,
+                         successors=successors,
+                         num_candidates=self.num_candidates,
+                         local_search=self.local_search,
+                         local_search_moves=self.local_search_moves)
+
+    def solve(self, time=30, constrains=[]):
+        """Solve the optimization problem."""
+        t_start = timer.perf_counter()
+        engine = self.create_engine()
+        t_setup = timer.perf_counter()
+        best_tour, best_cost = engine.run(time - (t_setup - t_start),
+                                          num_ants=self.num_ants,
+                                          limit=self.limit)
+        t_end = timer.perf_counter()
+
+        self.stats = dict(cost=float(best_cost),
+                          iterations=engine.iterations,
+                          setup_time=t_setup - t_start,
+                          solve_time=t_end - t_setup,
+                          ants_per_second=engine.num_ants / (t_end - t_setup))
+        if engine.local_search is not None:
+            self.stats.update(self.local_search_stats(engine.local_search))
+        self.logger.info(f"ACO stats {self.stats}")
+
+        return self.tour_result(engine, best_tour)
+
+    def improve(self, path, time=None, max_moves=None):
+        """Improve a path of the problem graph with the local search only"""
+        engine = self.create_engine()
+        local_search = engine.create_local_search()
+        tour, cost = local_search.improve([self.G_node2idx[n] for n in path],
+                                          max_moves=max_moves, time=time)
+
+        self.stats = dict(cost=float(cost),
+                          **self.local_search_stats(local_search))
+        self.logger.info(f"Local search stats {self.stats}")
+        return self.tour_result(engine, tour)
+
+    def tour_result(self, engine: ACOEngine, tour: np.ndarray):
+        """Return the routes and route meta data of an engine tour.
+
+        The routes are node ids as with the other optimizers, the meta data
+        has the rounded location distances as "distance" dimension.
+        """
+        tour = np.asarray(tour)
+        route = [self.G_idx2node[i] for i in tour]
+        transit = np.rint(engine.cost_matrix[tour[:-1], tour[1:]]).astype(np.int64)
+        cumul = np.concatenate(([0], np.cumsum(transit)))
+        array = route_array(route, dict(distance=cumul), dict(distance=transit))
+        return [route], [route_array_to_meta(array)]
+
+    @staticmethod
+    def local_search_stats(local_search: LocalSearch) -> dict:
+        return dict(local_search_moves=local_search.num_moves,
+                    local_search_time=local_search.time,
+                    improvement=float(local_search.improvement),
+                    improvement_per_second=local_search.improvement_per_second)
@@ -0,0 +1,168 @@
+import logging
+
+import numpy as np
+
+
+def min_arc_bound(cost_matrix: np.ndarray, start=0, end=None, penalty=None) -> float:
+    """Return a lower bound of the open path cost from the cheapest arcs.
+
+    Every node but start is entered and every node but end is left once, so
+    the sum of the cheapest incoming (or outgoing) arcs bounds the path. If
+    nodes may be dropped for penalty, a node costs at most the penalty.
+    Forbidden arcs are inf.
+    """
+    n = len(cost_matrix)
+    end = n - 1 if end is None else end
+    cost = np.array(cost_matrix, dtype=float)
+    np.fill_diagonal(cost, np.inf)
+
+    inner = np.ones(n, dtype=bool)
+    inner[[start, end]] = False
+    min_in = cost.min(axis=0)
+    min_out = cost.min(axis=1)
+    if penalty is not None:
+        min_in[inner] = np.minimum(min_in[inner], penalty)
+        min_out[inner] = np.minimum(min_out[inner], penalty)
+
+    bound_in = np.delete(min_in, start).sum()
+    bound_out = np.delete(min_out, end).sum()
+    return float(max(bound_in, bound_out))
+
+
+def assignment_bound(cost_matrix: np.ndarray, start=0, end=None, penalty=None):
+    """Return the assignment relaxation bound of the open path cost.
+
+    The path is closed with a zero cost arc end -> start, every node gets
+    one successor, subtours and precedences are relaxed. Dropped nodes are
+    self loops with the penalty cost. Costs are rounded down to integers for
+    the OR-Tools linear assignment solver, None is returned if it is not
+    available or there is no assignment.
+    """
+    try:
+        from ortools.graph.python import linear_sum_assignment
+    except ImportError:
+        return None
+
+    n = len(cost_matrix)
+    end = n - 1 if end is None else end
+    cost = np.floor(np.array(cost_matrix, dtype=float))
+    np.fill_diagonal(cost, np.inf)
+    cost[end, :] = np.inf
+    cost[:, start] = np.inf
+    cost[end, start] = 0
+    if penalty is not None:
+        inner = np.setdiff1d(np.arange(n), [start, end])
+        cost[inner, inner] = np.floor(penalty)
+
+    tails, heads = np.nonzero(np.isfinite(cost))
+    assignment = linear_sum_assignment.SimpleLinearSumAssignment()
+    assignment.add_arcs_with_cost(tails, heads,
+                                  cost[tails, heads].astype(np.int64))
+    if assignment.solve() != assignment.OPTIMAL:
+        return None
+    return float(assignment.optimal_cost())
+
+
+def minimum_spanning_tree(weights: np.ndarray):
+    """Return the cost and the node degrees of a minimum spanning tree.
+
+    Prim's algorithm on a dense symmetric weight matrix, inf for missing
+    edges. The cost is inf if the graph is not connected.
+    """
+    n = len(weights)
+    degree = np.zeros(n, dtype=int)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    distance = weights[0].copy()
+    parent = np.zeros(n, dtype=int)
+    total = 0.0
+    for _ in range(n - 1):
+        candidates = np.where(in_tree, np.inf, distance)
+        node = int(np.argmin(candidates))
+        if not np.isfinite(candidates[node]):
+            return np.inf, degree
+        total += candidates[node]
+        in_tree[node] = True
+        degree[node] += 1
+        degree[parent[node]] += 1
+        closer = weights[node] < distance
+        distance[closer] = weights[node][closer]
+        parent[closer] = node
+    return total, degree
+
+
+def one_tree_bound(cost_matrix: np.ndarray, start=0, end=None,
+                   iterations=300, initial=0.2, decay=0.98) -> float:
+    """Return the Held-Karp 1-tree bound of the open path visiting all nodes.
+
+    The path is closed to a tour with the zero cost edge end - start, arc
+    directions and precedences are relaxed (edge cost is the cheaper arc).
+    The tree spans all nodes but end, end is attached with the closing edge
+    and its cheapest other edge. Node penalties are improved by subgradient
+    steps towards degree two, the best Lagrangian value is returned.
+    """
+    n = len(cost_matrix)
+    end = n - 1 if end is None else end
+    if n < 3:
+        return 0.0 if n < 2 else float(cost_matrix[start, end])
+
+    cost = np.array(cost_matrix, dtype=float)
+    cost = np.minimum(cost, cost.T)
+    np.fill_diagonal(cost, np.inf)
+    others = np.setdiff1d(np.arange(n), [end])
+    tree_cost = cost[np.ix_(others, others)]
+    end_cost = cost[end, others]
+    end_cost[others == start] = np.inf
+
+    pi = np.zeros(n)
+    best = -np.inf
+    step = None
+    for _ in range(iterations):
+        pi_others = pi[others]
+        total, degree = minimum_spanning_tree(
+            tree_cost + pi_others[:, None] + pi_others[None, :])
+        attach = end_cost + pi_others + pi[end]
+        k = int(np.argmin(attach))
+        if not np.isfinite(total) or not np.isfinite(attach[k]):
+            return np.inf
+        # the closing edge end - start has cost 0 + pi[end] + pi[start]
+        value = (total + attach[k] + pi[end] + pi[start] - 2 * pi.sum())
+        best = max(best, value)
+
+        subgradient = np.zeros(n)
+        subgradient[others] = degree
+        subgradient[others[k]] += 1
+        subgradient[start] += 1
+        subgradient[end] = 2
+        subgradient -= 2
+        norm = (subgradient ** 2).sum()
+        if norm == 0:
+            break
+        if step is None:
+            step = initial * abs(value) / n if value != 0 else 1.0
+        pi += step * subgradient
+        step *= decay
+    return float(best)
+
+
+def lower_bound(cost_matrix: np.ndarray, start=0, end=None, penalty=None) -> float:
+    """Return the best of the available lower bounds of the open path cost.
+
+    The 1-tree bound assumes all nodes are visited, a path dropping a node
+    costs at least the penalty, so the minimum of both is a bound.
+    """
+    tree = one_tree_bound(cost_matrix, start, end)
+    if penalty is not None:
+        tree = min(tree, penalty)
+    bounds = [min_arc_bound(cost_matrix, start, end, penalty),
+              assignment_bound(cost_matrix, start, end, penalty), tree]
+    bound = max(b for b in bounds if b is not None)
+    logging.getLogger(__name__).info(f"Lower bounds {bounds}")
+    return bound
+
+
+def relative_gap(objective: float, bound: float) -> float:
+    """Return the relative gap (objective - bound) / objective"""
+    if objective <= 0:
+        return 0.0
+    return float(max(objective - bound, 0) / objective)
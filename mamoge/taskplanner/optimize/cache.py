@@ -0,0 +1,269 @@
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import time
+import types
+from collections import OrderedDict
+from typing import Any, List
+
+import networkx as nx
+import numpy as np
+
+from mamoge.taskplanner.location import Location
+
+
+def canonical_value(value: Any) -> Any:
+    """Return a hashable, order independent representation of value.
+
+    Locations are represented by their type and coordinates (graph locations
+    by their layer and base node ids), callbacks by their qualified name and
+    bound values, other objects by their own repr. Raises TypeError for
+    objects with the default repr, which only contains their address.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return ("ndarray", value.shape, str(value.dtype), hashlib.sha256(
+            np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.shape, canonical_value(value.tolist()))
+    if isinstance(value, dict):
+        return tuple(sorted((repr(canonical_value(k)), canonical_value(v))
+                            for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(canonical_value(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(canonical_value(v)) for v in value))
+    if isinstance(value, Location):
+        return canonical_location(value)
+    if isinstance(value, (types.FunctionType, types.MethodType,
+                          types.BuiltinFunctionType, functools.partial, type)):
+        return canonical_callback(value)
+    if type(value).__repr__ is object.__repr__:
+        raise TypeError(f"No canonical form of {type(value).__qualname__}")
+    return repr(value)
+
+
+def canonical_location(location: Location) -> tuple:
+    """Return the canonical form of a location"""
+    if hasattr(location, "layer_id"):
+        return (type(location).__name__, location.type,
+                canonical_value(location.layer_id),
+                canonical_value(location.base_id),
+                canonical_value(location.nx_args))
+    if hasattr(location, "nx_args"):
+        return (type(location).__name__, location.type,
+                canonical_value(location.nx_args))
+    try:
+        return (type(location).__name__, location.type,
+                canonical_value(location.as_tuple()))
+    except Exception:
+        return (type(location).__name__, location.type)
+
+
+def canonical_callback(callback) -> tuple:
+    """Return the canonical form of a callback.
+
+    Functions are identified by module and qualified name, closure and default
+    values are included so that lambdas with different bound values differ.
+    """
+    if isinstance(callback, functools.partial):
+        return ("partial", canonical_callback(callback.func),
+                canonical_value(callback.args),
+                canonical_value(callback.keywords))
+
+    name = (getattr(callback, "__module__", None),
+            getattr(callback, "__qualname__", type(callback).__qualname__))
+    if isinstance(callback, types.MethodType):
+        return ("method", name, canonical_value(callback.__self__),
+                canonical_callback(callback.__func__))
+
+    closure = getattr(callback, "__closure__", None) or ()
+    cells = []
+    for cell in closure:
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            cells.append(None)
+            continue
+        if isinstance(contents, types.FunctionType):
+            # only the name, closures may reference themselves
+            contents = (getattr(contents, "__module__", None),
+                        getattr(contents, "__qualname__", None))
+        cells.append(canonical_value(contents))
+
+    defaults = getattr(callback, "__defaults__", None)
+    code = getattr(callback, "__code__", None)
+    code_hash = (hashlib.sha256(repr(canonical_code(
+        code, getattr(callback, "__globals__", {}))).encode()).hexdigest()
+        if code is not None else None)
+
+    return ("callback", name, code_hash, tuple(cells),
+            canonical_value(defaults))
+
+
+def canonical_code(code, globals_=None) -> tuple:
+    """Return the canonical form of a code object.
+
+    Contains the bytecode, the constants (nested code objects recursively),
+    the referenced names and the values of referenced module globals that are
+    plain values, so an edited constant changes the key.
+    """
+    consts = tuple(canonical_code(c, globals_) if hasattr(c, "co_code")
+                   else repr(c) for c in code.co_consts)
+    plain = (type(None), bool, int, float, str, bytes)
+    globals_ = globals_ or {}
+    values = tuple((name, repr(globals_[name])) for name in code.co_names
+                   if name in globals_ and isinstance(globals_[name], plain))
+    return (code.co_code, consts, code.co_names, values)
+
+
+def G_canonical(G: nx.Graph) -> tuple:
+    """Return the canonical form of a problem graph.
+
+    The node order is kept, since start and end are taken from the first and
+    last node. Edges are sorted.
+    """
+    nodes = tuple((repr(n), canonical_value(d)) for n, d in G.nodes(data=True))
+    edges = tuple(sorted((repr(u), repr(v), canonical_value(d))
+                         for u, v, d in G.edges(data=True)))
+    return (type(G).__name__, nodes, edges)
+
+
+def problem_hash(G: nx.Graph, dimensions: dict, capacities: dict,
+                 constraints: List[Any], max_time, num_routes=1,
+                 settings=None) -> str:
+    """Return a hash of the canonical form of the whole problem.
+
+    settings are the solver settings that change the result, see
+    :meth:`ORTaskOptimizer.settings`.
+    """
+    canonical_constraints = sorted(repr((canonical_value(c.u),
+                                         canonical_value(c.v),
+                                         c.dimension,
+                                         canonical_value(c.kw_args)))
+                                   for c in constraints)
+
+    canonical = (G_canonical(G),
+                 canonical_value(dimensions),
+                 canonical_value(capacities),
+                 tuple(canonical_constraints),
+                 max_time, num_routes,
+                 canonical_value(settings))
+
+    return hashlib.sha256(repr(canonical).encode()).hexdigest()
+
+
+class CachedPlan():
+    '''structure to save a solved plan with its meta data'''
+
+    def __init__(self, key: str, plan, meta, created=None, solve_time=None):
+        self.key = key
+        self.plan = plan
+        self.meta = meta
+        self.created = created if created is not None else time.time()
+        self.solve_time = solve_time
+
+    @property
+    def age(self) -> float:
+        """Return the age of the plan in seconds"""
+        return time.time() - self.created
+
+    def __repr__(self):
+        return f"CachedPlan({self.key[:12]}, age:{self.age:.1f}s, solve_time:{self.solve_time})"
+
+
+class DiskPlanCache():
+    """Store cached plans as pickle files in a directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key: str) -> CachedPlan:
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, entry: CachedPlan) -> None:
+        tmp_path = self.path(entry.key) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, self.path(entry.key))
+
+    def remove(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class PlanCache():
+    """In memory LRU cache for solved plans with an optional disk backend.
+
+    Entries older than max_age (in seconds) are treated as missing, so the
+    problem is solved again and the entry replaced.
+    """
+
+    def __init__(self, maxsize=128, backend: DiskPlanCache = None,
+                 max_age=None):
+        self.logger = logging.getLogger(__name__)
+        self.maxsize = maxsize
+        self.backend = backend
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, max_age=None) -> CachedPlan:
+        """Return the cached plan for key or None if missing or too old"""
+        max_age = max_age if max_age is not None else self.max_age
+
+        entry = self.entries.get(key)
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self._store(entry)
+
+        if entry is not None and max_age is not None and entry.age > max_age:
+            self.logger.info(f"Cached plan {key[:12]} is outdated")
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, plan, meta, solve_time=None) -> CachedPlan:
+        entry = CachedPlan(key, plan, meta, solve_time=solve_time)
+        self._store(entry)
+        if self.backend is not None:
+            self.backend.put(entry)
+        return entry
+
+    def _store(self, entry: CachedPlan) -> None:
+        self.entries[entry.key] = entry
+        self.entries.move_to_end(entry.key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
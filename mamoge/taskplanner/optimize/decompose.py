@@ -0,0 +1,338 @@
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import networkx as nx
+
+from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.location import ZeroDistanceLocation
+from mamoge.taskplanner.optimize.dimensions import DimensionMixin
+from mamoge.taskplanner.optimize.route import (route_array_to_meta, route_cost,
+                                               route_dimension_array,
+                                               route_feasible)
+
+
+class DecompositionTaskOptimizer(DimensionMixin):
+    """Solve large problems by splitting the tasks into spatial clusters.
+
+    The clusters are ordered along the task dag, solved in parallel as open
+    paths with :class:`ORTaskOptimizer` and stitched together at the cluster
+    boundaries. An optional global improvement pass starts the monolithic
+    optimizer from the stitched route.
+
+    Capacities are enforced per cluster and constraints only within a
+    cluster. The stitched route is checked against the capacities and all
+    constraints, if it violates them the monolithic optimizer is started
+    from it with the remaining time.
+
+    With mode "layer" the clusters are windows of layer_window consecutive
+    dag layers (see :func:`mamogenx.G_layer_windows`). Each window is solved
+    together with the tasks of the next look_ahead layers, which are
+    removed from its route again, so the window ends close to where the next
+    one starts. With chain the windows are solved one after another starting
+    at the last task of the previous window, otherwise in parallel as open
+    paths like the spatial clusters.
+    """
+
+    def __init__(self, cluster_size=200, max_workers=None, improve_time=0,
+                 executor=None, mode="spatial", layer_window=1,
+                 look_ahead=1, chain=True, exact_threshold=16) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.graph = None
+        self.cluster_size = cluster_size
+        self.max_workers = max_workers
+        self.improve_time = improve_time
+        self.executor = executor
+        if mode not in ("spatial", "layer"):
+            raise ValueError(f"Unknown decomposition mode {mode}")
+        self.mode = mode
+        self.layer_window = layer_window
+        self.look_ahead = look_ahead
+        self.chain = chain
+        # subproblems with up to this many tasks are solved exactly
+        self.exact_threshold = exact_threshold
+        # shortest time limit of a subproblem in seconds
+        self.min_time = 0.05
+        #
+        self.dimensions = {}
+        self.capacities = {}
+        self.penalty_dimension = "time"
+        self.stats = {}
+
+    def create_optimizer(self, G: nx.Graph) -> "ORTaskOptimizer":
+        """Return a monolithic optimizer for G with the same dimensions"""
+        from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+
+        optimizer = ORTaskOptimizer()
+        optimizer.graph = G
+        optimizer.penalty_dimension = self.penalty_dimension
+        for dim_name, dim_args in self.dimensions.items():
+            optimizer.add_dimension(dim_name, **dim_args)
+        for cap_name, cap_args in self.capacities.items():
+            optimizer.add_capacity(cap_name, **cap_args)
+        return optimizer
+
+    def solve(self, max_time=30, num_routes=1, constraints=[]):
+        """Solve the optimization problem"""
+        G_idx2node = list(self.graph.nodes)
+        node_start, node_end = G_idx2node[0], G_idx2node[-1]
+        tasks = G_idx2node[1:-1]
+
+        t_start = time.perf_counter()
+        clusters, look_aheads = None, None
+        if num_routes == 1 and self.mode == "layer":
+            dag = mamogenx.G_dag_from_problem(self.graph)
+            windows = mamogenx.G_layer_windows(dag, tasks, self.layer_window,
+                                               self.look_ahead)
+            clusters = [window for window, _ in windows]
+            look_aheads = [look_ahead for _, look_ahead in windows]
+        elif num_routes == 1 and len(tasks) > self.cluster_size:
+            dag = mamogenx.G_dag_from_problem(self.graph)
+            num_clusters = math.ceil(len(tasks) / self.cluster_size)
+            clusters = mamogenx.G_spatial_clusters(dag, tasks, num_clusters)
+            look_aheads = [[] for _ in clusters]
+
+        if clusters is None or len(clusters) <= 1:
+            self.logger.info("Solving monolithic problem")
+            optimizer = self.create_optimizer(self.graph)
+            return optimizer.solve(max_time, num_routes, constraints)
+        t_clustered = time.perf_counter()
+
+        self.logger.info(f"Solving {len(clusters)} clusters of sizes "
+                         f"{[len(c) for c in clusters]}")
+
+        cluster_of = {n: i for i, c in enumerate(clusters) for n in c}
+        num_between = sum(1 for c in constraints
+                          if cluster_of.get(c.u) != cluster_of.get(c.v))
+        if num_between > 0:
+            self.logger.info(f"{num_between} constraints between clusters are "
+                             f"only checked on the stitched route")
+
+        sub_time = max_time - self.improve_time
+        if self.mode == "layer" and self.chain:
+            sub_routes = self.solve_chained(dag, clusters, look_aheads,
+                                            constraints, sub_time)
+        else:
+            # clusters beyond the number of workers wait for a free one
+            rounds = math.ceil(len(clusters) / self.num_workers())
+            sub_routes = self.solve_parallel(dag, clusters, look_aheads,
+                                             constraints, sub_time / rounds)
+        t_solved = time.perf_counter()
+
+        route = [node_start]
+        for sub_route in sub_routes:
+            route.extend(sub_route)
+        route.append(node_end)
+
+        boundaries = [len(sub_route) for sub_route in sub_routes]
+        self.stats = dict(num_clusters=len(clusters),
+                          cluster_sizes=[len(c) for c in clusters],
+                          stitch_cost=self.stitch_cost(route, boundaries),
+                          cluster_time=t_clustered - t_start,
+                          solve_time=t_solved - t_clustered)
+
+        result = [route]
+        meta = None
+        if self.improve_time > 0:
+            optimizer = self.create_optimizer(self.graph)
+            improved, improved_meta = optimizer.solve(
+                self.improve_time, 1, constraints, initial_routes=[route])
+            if len(improved) > 0 and self.route_complete(dag, improved[0]):
+                result, meta = improved, improved_meta
+            else:
+                self.logger.warning("Improved route drops tasks or breaks "
+                                    "the dag order, keeping stitched route")
+        if meta is None:
+            array = route_dimension_array(self.graph, route, self.dimensions,
+                                          self.capacities)
+            feasible = route_feasible(array, {**self.dimensions,
+                                              **self.capacities}, constraints)
+            self.stats["stitched_feasible"] = feasible
+            if not feasible:
+                self.logger.warning("Stitched route violates capacities or "
+                                    "constraints, solving monolithic problem")
+                optimizer = self.create_optimizer(self.graph)
+                remaining = max(1, max_time - (time.perf_counter() - t_start))
+                repaired, repaired_meta = optimizer.solve(
+                    remaining, 1, constraints, initial_routes=[route])
+                if len(repaired) > 0:
+                    result, meta = repaired, repaired_meta
+                else:
+                    self.logger.error("No solution of the monolithic problem, "
+                                      "returning the infeasible stitched route")
+            if meta is None:
+                meta = [route_array_to_meta(array)]
+
+        t_end = time.perf_counter()
+        self.stats["cost"] = route_cost(self.graph, result[0],
+                                        self.arc_cost_callback())
+        self.stats["improve_time"] = t_end - t_solved
+        self.stats["total_time"] = t_end - t_start
+        self.stats["tasks_per_second"] = len(tasks) / (t_end - t_start)
+        self.logger.info(f"Decomposition stats {self.stats}")
+
+        return result, meta
+
+    def route_complete(self, dag: nx.DiGraph, route: List[Any]) -> bool:
+        """Return if the route visits all nodes of the graph in dag order"""
+        if len(route) != len(self.graph) or set(route) != set(self.graph.nodes):
+            return False
+        position = {n: i for i, n in enumerate(route)}
+        return all(position[u] < position[v] for u, v in dag.edges)
+
+    def num_workers(self) -> int:
+        """Return the number of clusters solved at the same time"""
+        num_cpus = os.cpu_count() or 1
+        max_workers = self.max_workers
+        if self.executor is not None:
+            max_workers = getattr(self.executor, "_max_workers", None)
+        return max(1, min(max_workers or num_cpus, num_cpus))
+
+    def solve_parallel(self, dag: nx.DiGraph, clusters, look_aheads,
+                       constraints, max_time):
+        """Solve the clusters as independent open paths in the executor"""
+        subproblems = [self.subproblem(dag, cluster + look_ahead, constraints)
+                       for cluster, look_ahead in zip(clusters, look_aheads)]
+
+        executor = self.executor
+        if executor is None:
+            executor = ThreadPoolExecutor(self.max_workers)
+        try:
+            sub_routes = list(executor.map(
+                lambda args: self.solve_subproblem(*args, max_time=max_time),
+                subproblems))
+        finally:
+            if self.executor is None:
+                executor.shutdown()
+        return [[n for n in sub_route if n not in look_ahead]
+                for sub_route, look_ahead in zip(sub_routes,
+                                                 map(set, look_aheads))]
+
+    def solve_chained(self, dag: nx.DiGraph, clusters, look_aheads,
+                      constraints, max_time):
+        """Solve the clusters one after another sharing max_time.
+
+        Each cluster starts at the last task of the previous one. Look-ahead
+        tasks visited before the last task of the cluster are kept in its
+        route and removed from the next cluster. Each solve gets an equal
+        share of the time left for the remaining clusters.
+        """
+        deadline = time.perf_counter() + max_time
+        start = list(self.graph.nodes)[0]
+        visited = set()
+        sub_routes = []
+        for k, (cluster, look_ahead) in enumerate(zip(clusters, look_aheads)):
+            cluster = [n for n in cluster if n not in visited]
+            if len(cluster) == 0:
+                continue
+            sub_time = (deadline - time.perf_counter()) / (len(clusters) - k)
+            sub_route = self.solve_subproblem(
+                *self.subproblem(dag, cluster + look_ahead, constraints,
+                                 start=start), max_time=sub_time)
+            own = set(cluster)
+            if not own.issubset(sub_route):
+                # the routing search may get stuck with the fixed start
+                self.logger.warning("Tasks dropped, solving with free start")
+                sub_time = (deadline - time.perf_counter()) / (len(clusters) - k)
+                sub_route = self.solve_subproblem(
+                    *self.subproblem(dag, cluster + look_ahead, constraints),
+                    max_time=sub_time)
+            if not own.issubset(sub_route):
+                self.logger.error(f"Tasks {sorted(own - set(sub_route))} "
+                                  f"dropped, using dag order for the cluster")
+                sub_route = list(cluster)
+            last = max((i for i, n in enumerate(sub_route) if n in own),
+                       default=-1)
+            sub_route = sub_route[:last + 1]
+            if len(sub_route) > 0:
+                start = sub_route[-1]
+            visited.update(sub_route)
+            sub_routes.append(sub_route)
+        return sub_routes
+
+    def subproblem(self, dag: nx.DiGraph, cluster: List[Any], constraints,
+                   start=None):
+        """Return the open path problem graph and constraints for one cluster.
+
+        The problem graph gets a start and end node with a
+        :class:`ZeroDistanceLocation` connected to the sources and sinks of
+        the cluster, nodes are relabeled to 0..n+1. If start is given, the
+        start node is at the location of that node instead.
+        """
+        G_idx2node = list(self.graph.nodes)
+        node_start, node_end = G_idx2node[0], G_idx2node[-1]
+
+        G_node2sub = {n: i for i, n in enumerate(cluster, 1)}
+        sub_end = len(cluster) + 1
+
+        G_sub = nx.DiGraph()
+        if start is None:
+            G_sub.add_node(0, **{**self.graph.nodes[node_start],
+                                 "location": ZeroDistanceLocation()})
+        else:
+            G_sub.add_node(0, **self.graph.nodes[start])
+        for n, i in G_node2sub.items():
+            G_sub.add_node(i, **self.graph.nodes[n])
+        G_sub.add_node(sub_end, **{**self.graph.nodes[node_end],
+                                   "location": ZeroDistanceLocation()})
+
+        # the adjacency of one node at a time, also on a CompactProblem
+        for u in cluster:
+            for v, d in self.graph[u].items():
+                if v in G_node2sub:
+                    G_sub.add_edge(G_node2sub[u], G_node2sub[v], **d)
+
+        dag_cluster = dag.subgraph(cluster)
+        for n, i in G_node2sub.items():
+            if dag_cluster.in_degree(n) == 0:
+                G_sub.add_edge(0, i)
+            if dag_cluster.out_degree(n) == 0:
+                G_sub.add_edge(i, sub_end)
+        if start is not None:
+            # an unused route costs nothing, as with a zero distance start
+            G_sub.add_edge(0, sub_end)
+
+        sub_constraints = [mamogenx.TaskConstraint(G_node2sub[c.u],
+                                                   G_node2sub[c.v],
+                                                   c.dimension, **c.kw_args)
+                           for c in constraints
+                           if c.u in G_node2sub and c.v in G_node2sub]
+
+        return G_sub, cluster, sub_constraints
+
+    def solve_subproblem(self, G_sub, cluster, sub_constraints, max_time=30):
+        """Return the ordered cluster nodes of the solved subproblem"""
+        from mamoge.taskplanner.optimize import TaskOptimizer
+
+        # a spent budget still gets a short search for a first solution
+        max_time = max(max_time, self.min_time)
+        optimizer = TaskOptimizer(self.create_optimizer(G_sub),
+                                  exact_threshold=self.exact_threshold)
+        result, _ = optimizer.solve_impl(max_time, sub_constraints)
+
+        if len(result) == 0:
+            self.logger.warning("No solution for cluster, using dag order")
+            return list(cluster)
+
+        return [cluster[i - 1] for i in result[0][1:-1]]
+
+    def arc_cost_callback(self):
+        """Return the cost callback of the arc cost dimension"""
+        if len(self.dimensions) == 0:
+            return lambda G, u, v: 0
+        return next(iter(self.dimensions.values()))["cost_callback"]
+
+    def stitch_cost(self, route: List[Any], boundaries: List[int]) -> float:
+        """Return the arc cost of the transitions into each cluster and the end node"""
+        cost_callback = self.arc_cost_callback()
+
+        cost = 0
+        position = 0
+        for length in boundaries + [0]:
+            cost += cost_callback(self.graph, route[position],
+                                  route[position + 1])
+            position += length
+        return cost
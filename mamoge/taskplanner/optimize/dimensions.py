@@ -0,0 +1,28 @@
+from typing import Callable
+
+import networkx as nx
+
+
+class DimensionMixin():
+    """Dimensions and capacities of a task optimizer.
+
+    They are kept as argument dicts by name in :attr:`dimensions` and
+    :attr:`capacities`, which the class initializes.
+    """
+
+    def add_dimension(self, name: str,
+                      cost_callback: Callable[[nx.Graph, int, int], int],
+                      capacity=None,
+                      slack=0,
+                      demand_callback=None):
+        self.dimensions[name] = dict(cost_callback=cost_callback,
+                                     capacity=capacity, slack=slack,
+                                     demand_callback=demand_callback)
+
+    def add_capacity(self, name: str,
+                     capacity_callback: Callable[[nx.Graph, int], int],
+                     capacity=None,
+                     slack=0):
+        self.capacities[name] = dict(capacity_callback=capacity_callback,
+                                     capacity=capacity,
+                                     slack=slack)
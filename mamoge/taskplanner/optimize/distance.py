@@ -0,0 +1,259 @@
+import asyncio
+from abc import abstractmethod
+import json
+import logging
+import time
+from typing import Any, List, Tuple
+from urllib.parse import urlsplit
+
+import networkx as nx
+import numpy as np
+
+
+def node_coordinates(G: nx.Graph, node: Any) -> Tuple[float, float]:
+    """Return the (x, y) or (longitude, latitude) of a node, None if it has
+    no location"""
+    location = G.nodes[node].get("location")
+    if location is None:
+        return None
+    coordinates = location.as_tuple()
+    return float(coordinates[0]), float(coordinates[1])
+
+
+class DistanceProvider():
+    """Distances between coordinates from an external source.
+
+    Distances are requested as tables of sources x destinations and cached
+    per coordinate pair, so a matrix only requests the pairs not seen
+    before. Unreachable pairs are nan.
+    """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.cache = {}
+        self.stats = dict(requested=0, cached=0)
+
+    @abstractmethod
+    def table(self, sources: List[tuple], destinations: List[tuple]) -> np.ndarray:
+        """Return the distances from each source to each destination"""
+        pass
+
+    def distances(self, sources: List[tuple], destinations: List[tuple]) -> np.ndarray:
+        """Return the table of the distances, missing pairs are requested"""
+        missing_sources = list(dict.fromkeys(
+            s for s in sources for d in destinations if (s, d) not in self.cache))
+        missing_destinations = list(dict.fromkeys(
+            d for d in destinations for s in sources if (s, d) not in self.cache))
+        if missing_sources:
+            table = self.table(missing_sources, missing_destinations)
+            for i, s in enumerate(missing_sources):
+                for j, d in enumerate(missing_destinations):
+                    self.cache[(s, d)] = float(table[i, j])
+            self.stats["requested"] += table.size
+        self.stats["cached"] = len(self.cache)
+        return np.array([[self.cache[(s, d)] for d in destinations]
+                         for s in sources], dtype=float).reshape(
+                             len(sources), len(destinations))
+
+    def distance(self, G: nx.Graph, u: Any, v: Any) -> float:
+        """Return the distance between two nodes, 0 without locations"""
+        source, destination = node_coordinates(G, u), node_coordinates(G, v)
+        if source is None or destination is None:
+            return 0
+        return self.distances([source], [destination])[0, 0]
+
+    def matrix(self, G: nx.Graph) -> np.ndarray:
+        """Return the distance matrix over the nodes of G.
+
+        Each distinct coordinate is requested once, nodes without location
+        have distance 0 to all nodes (see :func:`G_distance_location`).
+        """
+        coordinates = [node_coordinates(G, n) for n in G.nodes]
+        distinct = list(dict.fromkeys(c for c in coordinates if c is not None))
+        index = {c: i for i, c in enumerate(distinct)}
+        table = self.distances(distinct, distinct)
+
+        located = np.array([c is not None for c in coordinates])
+        rows = np.array([index.get(c, 0) for c in coordinates], dtype=int)
+        matrix = np.zeros((len(coordinates), len(coordinates)))
+        if len(distinct):
+            matrix = table[np.ix_(rows, rows)]
+        matrix[~located, :] = 0
+        matrix[:, ~located] = 0
+        return matrix
+
+
+def add_distance_dimension(optimizer, name: str, provider: DistanceProvider,
+                           velocity=1, capacity=None, slack=0) -> np.ndarray:
+    """Add a time dimension with the distances of a provider.
+
+    The whole matrix is requested in batches and stored in the matrix store
+    of the optimizer (see :attr:`ORTaskOptimizer.matrices`), the cost
+    callback of the dimension uses the cached distances of the provider.
+    Unreachable pairs have the transit -1. Returns the time matrix.
+    """
+    def time_from_distance(distance):
+        return np.where(np.isnan(distance), -1,
+                        np.rint(np.nan_to_num(distance) / velocity)).astype(np.int64)
+
+    def cost_callback(G, u, v):
+        return int(time_from_distance(provider.distance(G, u, v)))
+
+    optimizer.add_dimension(name, cost_callback, capacity, slack)
+    optimizer.matrices[name] = time_from_distance(provider.matrix(optimizer.graph))
+    return optimizer.matrices[name]
+
+
+class ConnectionPool():
+    """Keep-alive HTTP/1.1 connections to one server.
+
+    At most size connections are open and in use at once, further requests
+    wait for a free connection.
+    """
+
+    def __init__(self, host: str, port: int, size=4, timeout=30) -> None:
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(size)
+        self.num_connections = 0
+
+    async def get(self, path: str) -> Tuple[int, bytes]:
+        """Return the status and body of a GET request"""
+        async with self.semaphore:
+            if self.idle:
+                reader, writer = self.idle.pop()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+                self.num_connections += 1
+            try:
+                status, body, keep_alive = await asyncio.wait_for(
+                    self.request(reader, writer, path), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, body
+
+    async def request(self, reader, writer, path: str):
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                     f"Connection: keep-alive\r\n\r\n".encode())
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return status, body, keep_alive
+
+    async def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class OSRMDistanceProvider(DistanceProvider):
+    """Distances from the table service of an OSRM style routing server.
+
+    Large tables are split into requests of at most batch_size sources and
+    destinations, which are sent concurrently over a pool of max_connections
+    keep-alive connections. Coordinates are (longitude, latitude).
+    """
+
+    def __init__(self, url="http://localhost:5000", profile="driving",
+                 batch_size=100, max_connections=4, timeout=30,
+                 annotation="distance") -> None:
+        DistanceProvider.__init__(self)
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.profile = profile
+        self.batch_size = batch_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # "distance" in meters or "duration" in seconds
+        self.annotation = annotation
+        self.stats.update(requests=0, connections=0, request_time=0)
+
+    def table_path(self, sources: List[tuple], destinations: List[tuple]) -> str:
+        """Return the request path of one table"""
+        coordinates = list(dict.fromkeys(sources + destinations))
+        index = {c: i for i, c in enumerate(coordinates)}
+        points = ";".join(f"{x:.6f},{y:.6f}" for x, y in coordinates)
+        return (f"{self.prefix}/table/v1/{self.profile}/{points}"
+                f"?sources={';'.join(str(index[c]) for c in sources)}"
+                f"&destinations={';'.join(str(index[c]) for c in destinations)}"
+                f"&annotations={self.annotation}")
+
+    async def request_table(self, pool: ConnectionPool, sources, destinations):
+        status, body = await pool.get(self.table_path(sources, destinations))
+        try:
+            response = json.loads(body)
+        except ValueError:
+            response = {}
+        if status != 200 or response.get("code") != "Ok":
+            raise RuntimeError(f"Table request failed with status {status}: "
+                               f"{response.get('code')} {response.get('message', '')}")
+        table = response[f"{self.annotation}s"]
+        return np.array([[np.nan if d is None else d for d in row]
+                         for row in table], dtype=float)
+
+    async def table_async(self, sources: List[tuple],
+                          destinations: List[tuple]) -> np.ndarray:
+        """Request the table in batches over one connection pool"""
+        pool = ConnectionPool(self.host, self.port, self.max_connections,
+                              self.timeout)
+        batches = [(i, j) for i in range(0, len(sources), self.batch_size)
+                   for j in range(0, len(destinations), self.batch_size)]
+        t_start = time.perf_counter()
+        try:
+            tables = await asyncio.gather(*[
+                self.request_table(pool, sources[i:i + self.batch_size],
+                                   destinations[j:j + self.batch_size])
+                for i, j in batches])
+        finally:
+            await pool.close()
+
+        result = np.zeros((len(sources), len(destinations)))
+        for (i, j), table in zip(batches, tables):
+            result[i:i + table.shape[0], j:j + table.shape[1]] = table
+        self.stats["requests"] += len(batches)
+        self.stats["connections"] += pool.num_connections
+        self.stats["request_time"] += time.perf_counter() - t_start
+        self.logger.info(f"Requested {len(sources)}x{len(destinations)} table "
+                         f"in {len(batches)} batches over "
+                         f"{pool.num_connections} connections")
+        return result
+
+    def table(self, sources: List[tuple], destinations: List[tuple]) -> np.ndarray:
+        """Return the table, use :meth:`table_async` within an event loop"""
+        return asyncio.run(self.table_async(list(sources), list(destinations)))
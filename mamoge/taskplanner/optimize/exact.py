@@ -0,0 +1,172 @@
+import logging
+import time
+
+import numpy as np
+
+from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.optimize.dimensions import DimensionMixin
+from mamoge.taskplanner.optimize.route import (route_array_to_meta,
+                                               route_dimension_array,
+                                               route_feasible)
+
+
+def held_karp(cost_matrix: np.ndarray, predecessors: np.ndarray = None,
+              start=0, end=None):
+    """Return the optimal open path from start to end over all nodes and its cost.
+
+    Held-Karp dynamic programming over the subsets of the inner nodes, one
+    layer of subsets per path length. predecessors[i] is the bitmask of the
+    inner nodes (bit k for the k-th inner node) that have to be visited
+    before inner node i. Only subsets closed under the predecessors are
+    created, all other states are pruned. Forbidden arcs have an infinite
+    cost. Returns (None, inf) if there is no feasible path.
+    """
+    n = len(cost_matrix)
+    end = n - 1 if end is None else end
+    inner = np.array([i for i in range(n) if i not in (start, end)], dtype=int)
+    t = len(inner)
+    if predecessors is None:
+        predecessors = np.zeros(t, dtype=np.int64)
+    if t == 0:
+        return [start, end], cost_matrix[start, end]
+
+    cost = cost_matrix[np.ix_(inner, inner)]
+    bits = np.int64(1) << np.arange(t, dtype=np.int64)
+
+    # layer 1: paths start -> j
+    masks = bits[predecessors == 0]
+    dp = np.full((len(masks), t), np.inf)
+    first = np.nonzero(predecessors == 0)[0]
+    dp[np.arange(len(first)), first] = cost_matrix[start, inner[first]]
+    layers = [(masks, dp, None)]
+
+    for _ in range(1, t):
+        masks, dp, _ = layers[-1]
+        # subsets of the next layer, node j appended to a feasible subset
+        candidates = [masks[((masks & bits[j]) == 0) &
+                            ((masks & predecessors[j]) == predecessors[j])]
+                      | bits[j] for j in range(t)]
+        next_masks = np.unique(np.concatenate(candidates))
+        next_dp = np.full((len(next_masks), t), np.inf)
+        next_parent = np.full((len(next_masks), t), -1, dtype=np.int16)
+
+        for j, appended in enumerate(candidates):
+            if len(appended) == 0:
+                continue
+            rows = np.searchsorted(next_masks, appended)
+            previous = np.searchsorted(masks, appended ^ bits[j])
+            values = dp[previous] + cost[:, j]
+            best = np.argmin(values, axis=1)
+            next_dp[rows, j] = values[np.arange(len(rows)), best]
+            next_parent[rows, j] = best
+        layers.append((next_masks, next_dp, next_parent))
+
+    masks, dp, _ = layers[-1]
+    if len(masks) == 0 or masks[-1] != bits.sum():
+        return None, np.inf
+    values = dp[-1] + cost_matrix[inner, end]
+    last = int(np.argmin(values))
+    total = values[last]
+    if not np.isfinite(total):
+        return None, np.inf
+
+    # walk the parents back through the layers
+    path = [last]
+    mask = masks[-1]
+    for masks, dp, parent in reversed(layers[1:]):
+        row = np.searchsorted(masks, mask)
+        previous = int(parent[row, path[-1]])
+        mask = mask ^ bits[path[-1]]
+        path.append(previous)
+    path.reverse()
+
+    return [start] + inner[path].tolist() + [end], total
+
+
+class DPTaskOptimizer(DimensionMixin):
+    """Exact solver for small single route problems.
+
+    The arc costs are the summed transit of all dimensions plus the first
+    dimension again, the objective of :class:`ORTaskOptimizer` (arc cost and
+    global span cost) for a route visiting all tasks. Arcs are restricted to
+    the problem graph, the task dag and the min constraints become
+    precedences of :func:`held_karp`, all constraints are checked on the
+    optimal route. Unlike ORTaskOptimizer no task is dropped.
+    """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.graph = None
+        #
+        self.dimensions = {}
+        self.capacities = {}
+        self.penalty_dimension = "time"
+        self.stats = {}
+
+    def cost_matrix(self) -> np.ndarray:
+        """Return the arc cost matrix, inf for arcs not in the problem graph"""
+        nodes = list(self.graph.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        matrix = np.full((len(nodes), len(nodes)), np.inf)
+
+        for u, v in self.graph.edges:
+            cost = 0
+            for k, dim_args in enumerate(self.dimensions.values()):
+                transit = dim_args["cost_callback"](self.graph, u, v)
+                cost += 2 * transit if k == 0 else transit
+            matrix[index[u], index[v]] = cost
+        return matrix
+
+    def predecessor_masks(self, constraints) -> np.ndarray:
+        """Return the bitmask of required inner predecessors per inner node"""
+        nodes = list(self.graph.nodes)
+        inner = {node: k for k, node in enumerate(nodes[1:-1])}
+
+        dag = mamogenx.G_dag_from_problem(self.graph)
+        edges = [(u, v) for u, v in dag.edges if u in inner and v in inner]
+        edges += [(c.u, c.v) for c in constraints
+                  if c.u in inner and c.v in inner
+                  and c.kw_args.get("min", -1) >= 0]
+
+        masks = np.zeros(len(inner), dtype=np.int64)
+        for u, v in edges:
+            masks[inner[v]] |= np.int64(1) << inner[u]
+        return masks
+
+    def check(self, array: np.ndarray, constraints) -> bool:
+        """Return if the route values respect capacities and constraints"""
+        return route_feasible(array, {**self.dimensions, **self.capacities},
+                              constraints)
+
+    def solve(self, max_time=30, num_routes=1, constraints=[], columnar=False):
+        """Solve the problem exactly, return ([], []) if it is infeasible.
+
+        max_time is not used, the run time only depends on the number of
+        precedence feasible task subsets.
+        """
+        if num_routes != 1:
+            raise ValueError("DPTaskOptimizer only solves single routes")
+
+        t_start = time.perf_counter()
+        nodes = list(self.graph.nodes)
+        cost_matrix = self.cost_matrix()
+        path, cost = held_karp(cost_matrix,
+                               self.predecessor_masks(constraints))
+        t_end = time.perf_counter()
+
+        self.stats = dict(cost=float(cost), solve_time=t_end - t_start)
+        self.logger.info(f"Exact solver stats {self.stats}")
+        if path is None:
+            self.logger.warning("Could not find any solution")
+            return [], []
+
+        route = [nodes[i] for i in path]
+        array = route_dimension_array(self.graph, route, self.dimensions,
+                                      self.capacities)
+        if not self.check(array, constraints):
+            self.logger.warning("Optimal route violates constraints")
+            return [], []
+
+        if columnar:
+            return [route], [array]
+        return [route], [route_array_to_meta(array)]
@@ -0,0 +1,80 @@
+import logging
+from typing import Any, List
+
+import numpy as np
+
+from mamoge.taskplanner.optimize.matrix import TransitCache
+from mamoge.taskplanner.optimize.route import route_feasible
+
+
+def insertion_window(route: List[Any], predecessors=(), successors=()):
+    """Return the first and last route position the new task may follow.
+
+    The task goes behind its last predecessor and before its first successor
+    on the route, tasks not on the route are ignored. The window is empty
+    (first > last) if a successor comes before a predecessor.
+    """
+    position = {node: i for i, node in enumerate(route)}
+    first = max([position[u] for u in predecessors if u in position],
+                default=0)
+    last = min([position[v] for v in successors if v in position],
+               default=len(route) - 1) - 1
+    return max(first, 0), min(last, len(route) - 2)
+
+
+def cheapest_insertion(route: List[Any], node: Any, transits: TransitCache,
+                       predecessors=(), successors=(), constraints=()):
+    """Insert node into route at the cheapest feasible position.
+
+    The insertion cost is the change of the :class:`ORTaskOptimizer`
+    objective, arc cost and span of the first dimension plus the span of
+    the others. Capacities are checked for all positions at once with the
+    suffix maxima of the cumuls, constraints only on the cheapest positions
+    until one holds. Needs O(N) transits of the new task, the transits of
+    the route are cached. Returns the new route and its structured array
+    (see :func:`route.route_array`) or (None, None).
+    """
+    first, last = insertion_window(route, predecessors, successors)
+    if first > last:
+        return None, None
+
+    array = transits.route_array(route)
+    positions = np.arange(first, last + 1)
+    tails = [route[i] for i in positions]
+    heads = [route[i + 1] for i in positions]
+
+    cost = np.zeros(len(positions))
+    feasible = np.ones(len(positions), dtype=bool)
+    limits = {**transits.dimensions, **transits.capacities}
+    for k, name in enumerate(transits.dimensions):
+        transit_in = transits.arcs(name, tails, [node] * len(tails))
+        transit_out = transits.arcs(name, [node] * len(heads), heads)
+        delta = transit_in + transit_out - array[name]["transit"][positions + 1]
+        cost += 2 * delta if k == 0 else delta
+
+        capacity = limits[name]["capacity"]
+        if capacity is not None:
+            cumul = array[name]["cumul"]
+            # largest cumul behind the insertion, shifted by delta
+            suffix = np.maximum.accumulate(cumul[::-1])[::-1]
+            feasible &= cumul[positions] + transit_in <= capacity
+            feasible &= suffix[positions + 1] + delta <= capacity
+
+    for name in transits.capacities:
+        capacity = limits[name]["capacity"]
+        if capacity is not None:
+            # the task adds its transit to all later cumuls
+            feasible &= (array[name]["cumul"][-1] + transits.node(name, node)
+                         <= capacity)
+
+    for k in np.argsort(cost, kind="stable"):
+        if not feasible[k]:
+            continue
+        i = positions[k]
+        new_route = list(route[:i + 1]) + [node] + list(route[i + 1:])
+        new_array = transits.route_array(new_route)
+        if route_feasible(new_array, limits, constraints):
+            logging.getLogger(__name__).info(
+                f"Inserted {node} behind {route[i]} at cost {cost[k]}")
+            return new_route, new_array
+    return None, None
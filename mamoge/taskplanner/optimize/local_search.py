@@ -0,0 +1,223 @@
+import logging
+import time as timer
+
+import numpy as np
+
+
+class RangeQuery():
+    """Sparse table for O(1) range max or min queries on a fixed array"""
+
+    def __init__(self, values: np.ndarray, func=np.maximum) -> None:
+        self.func = func
+        self.table = [np.asarray(values)]
+        width = 1
+        while 2 * width <= len(values):
+            previous = self.table[-1]
+            self.table.append(func(previous[:-width], previous[width:]))
+            width *= 2
+
+    def query(self, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        """Return func over values[first..last] (inclusive) for index arrays"""
+        level = np.floor(np.log2(last - first + 1)).astype(int)
+        result = np.empty(len(first), dtype=self.table[0].dtype)
+        for k in np.unique(level):
+            mask = level == k
+            result[mask] = self.func(self.table[k][first[mask]],
+                                     self.table[k][last[mask] - 2**k + 1])
+        return result
+
+
+class LocalSearch():
+    """Precedence respecting 2-opt and Or-opt improvement of open paths.
+
+    The first and last node of a path stay fixed. The deltas of all moves of
+    a path are evaluated at once with prefix sums over the arc costs, only
+    moves creating arcs to the candidate neighbours of a node are considered
+    if candidate lists are given (see :func:`aco_numpy.candidate_lists`).
+
+    Precedences of the successors matrix (task dag) are checked on the
+    positions of the last predecessor and first successor of every node, a
+    reversed or moved segment must not pass a related node.
+    """
+
+    def __init__(self, cost_matrix: np.ndarray, allowed: np.ndarray = None,
+                 successors: np.ndarray = None, candidates: np.ndarray = None,
+                 or_lengths=(1, 2, 3)) -> None:
+        self.logger = logging.getLogger(__name__)
+        cost_matrix = np.asarray(cost_matrix, dtype=float)
+        if allowed is None:
+            allowed = np.isfinite(cost_matrix)
+        self.allowed = allowed
+        self.cost_matrix = np.where(allowed, cost_matrix, 0)
+        self.candidates = candidates
+        self.or_lengths = or_lengths
+        if successors is not None:
+            self.edges = np.nonzero(successors)
+        else:
+            self.edges = (np.empty(0, dtype=int), np.empty(0, dtype=int))
+
+        self.num_moves = 0
+        self.improvement = 0.0
+        self.time = 0.0
+
+    @property
+    def improvement_per_second(self) -> float:
+        return self.improvement / self.time if self.time > 0 else 0.0
+
+    def cost(self, tour: np.ndarray) -> float:
+        return self.cost_matrix[tour[:-1], tour[1:]].sum()
+
+    def precedence_positions(self, tour: np.ndarray, position: np.ndarray):
+        """Return the positions of the last predecessor and first successor.
+
+        Row k of last_pred only counts predecessors before position q - k,
+        row k of first_succ only successors after q + k, so related nodes
+        within a moved segment of length k + 1 are ignored.
+        """
+        m = len(tour)
+        us, vs = self.edges
+        pu, pv = position[us], position[vs]
+        num_rows = max(self.or_lengths, default=1)
+        last_pred = np.full((num_rows, m), -1)
+        first_succ = np.full((num_rows, m), m)
+        for k in range(num_rows):
+            mask = pu < pv - k
+            np.maximum.at(last_pred[k], pv[mask], pu[mask])
+            np.minimum.at(first_succ[k], pu[mask], pv[mask])
+        return last_pred, first_succ
+
+    def neighbours(self, tour: np.ndarray, position: np.ndarray, nodes: np.ndarray):
+        """Return (index into nodes, candidate position) pairs"""
+        if self.candidates is None:
+            m = len(tour)
+            return (np.repeat(np.arange(len(nodes)), m),
+                    np.tile(np.arange(m), len(nodes)))
+        cand = position[self.candidates[nodes]]
+        return (np.repeat(np.arange(len(nodes)), cand.shape[1]), cand.ravel())
+
+    def two_opt_moves(self, tour: np.ndarray, position: np.ndarray,
+                      last_pred: RangeQuery):
+        """Return delta, i, j of the valid reversals of tour[i..j].
+
+        A reversal is valid if no node of the segment has a predecessor
+        within it, i.e. the range max of the last predecessors is before i.
+        """
+        m = len(tour)
+        c = self.cost_matrix
+        inner = np.arange(1, m - 1)
+
+        # new arc tour[i - 1] -> tour[j] or tour[i] -> tour[j + 1]
+        k, j = self.neighbours(tour, position, tour[inner - 1])
+        i, j = inner[k], j
+        if self.candidates is not None:
+            k, j2 = self.neighbours(tour, position, tour[inner])
+            i = np.concatenate([i, inner[k]])
+            j = np.concatenate([j, j2 - 1])
+        valid = (j > i) & (j <= m - 2)
+        i, j = i[valid], j[valid]
+
+        forward = np.concatenate([[0], np.cumsum(c[tour[:-1], tour[1:]])])
+        backward = np.concatenate([[0], np.cumsum(c[tour[1:], tour[:-1]])])
+        forbidden = np.concatenate(
+            [[0], np.cumsum(~self.allowed[tour[1:], tour[:-1]])])
+
+        a, b, x, y = tour[i - 1], tour[i], tour[j], tour[j + 1]
+        delta = (c[a, x] + c[b, y] - c[a, b] - c[x, y]
+                 + backward[j] - backward[i] - forward[j] + forward[i])
+        valid = (self.allowed[a, x] & self.allowed[b, y]
+                 & (forbidden[j] == forbidden[i])
+                 & (last_pred.query(i, j) < i))
+        return delta[valid], i[valid], j[valid]
+
+    def or_opt_moves(self, tour: np.ndarray, position: np.ndarray,
+                     last_pred: np.ndarray, first_succ: np.ndarray):
+        """Return delta, i, e, p of valid moves of tour[i..e] behind tour[p].
+
+        Moving the segment back is valid if its nodes have no predecessor
+        after p, moving it forward if they have no successor up to p.
+        """
+        m = len(tour)
+        c = self.cost_matrix
+        moves = []
+        for length in self.or_lengths:
+            first = np.arange(1, m - length)
+            if len(first) == 0:
+                continue
+            # new arc tour[p] -> tour[i] or tour[e] -> tour[p + 1]
+            k, p = self.neighbours(tour, position, tour[first])
+            i = first[k]
+            if self.candidates is not None:
+                k, p2 = self.neighbours(tour, position,
+                                        tour[first + length - 1])
+                i = np.concatenate([i, first[k]])
+                p = np.concatenate([p, p2 - 1])
+            e = i + length - 1
+            valid = (p >= 0) & (p <= m - 2) & ((p < i - 1) | (p > e))
+            i, e, p = i[valid], e[valid], p[valid]
+
+            a, s, t, z = tour[i - 1], tour[i], tour[e], tour[e + 1]
+            u, w = tour[p], tour[p + 1]
+            delta = (c[a, z] - c[a, s] - c[t, z]
+                     + c[u, s] + c[t, w] - c[u, w])
+            segment_pred = np.max([last_pred[d, i + d] for d in range(length)],
+                                  axis=0)
+            segment_succ = np.min([first_succ[length - 1 - d, i + d]
+                                   for d in range(length)], axis=0)
+            valid = (self.allowed[a, z] & self.allowed[u, s]
+                     & self.allowed[t, w]
+                     & np.where(p > e, segment_succ > p, segment_pred <= p))
+            moves.append((delta[valid], i[valid], e[valid], p[valid]))
+
+        if len(moves) == 0:
+            return (np.empty(0),) + (np.empty(0, dtype=int),) * 3
+        return tuple(np.concatenate(parts) for parts in zip(*moves))
+
+    def improve(self, tour, max_moves=None, time=None):
+        """Apply the best improving move until none is left, return tour and cost.
+
+        Stops after max_moves moves or time seconds if given.
+        """
+        t_start = timer.perf_counter()
+        tour = np.array(tour)
+        cost_start = cost = self.cost(tour)
+        position = np.empty(len(self.cost_matrix), dtype=int)
+        num_moves = 0
+
+        while max_moves is None or num_moves < max_moves:
+            if time is not None and timer.perf_counter() - t_start >= time:
+                break
+            if len(tour) < 4:
+                break
+            position[tour] = np.arange(len(tour))
+            last_pred, first_succ = self.precedence_positions(tour, position)
+
+            delta_2, i_2, j_2 = self.two_opt_moves(tour, position,
+                                                   RangeQuery(last_pred[0]))
+            delta_o, i_o, e_o, p_o = self.or_opt_moves(tour, position,
+                                                       last_pred, first_succ)
+
+            best_2 = np.argmin(delta_2) if len(delta_2) else None
+            best_o = np.argmin(delta_o) if len(delta_o) else None
+            value_2 = delta_2[best_2] if best_2 is not None else 0
+            value_o = delta_o[best_o] if best_o is not None else 0
+            if min(value_2, value_o) >= -1e-9:
+                break
+
+            if value_2 <= value_o:
+                i, j = i_2[best_2], j_2[best_2]
+                tour[i:j + 1] = tour[i:j + 1][::-1].copy()
+            else:
+                i, e, p = i_o[best_o], e_o[best_o], p_o[best_o]
+                if p > e:
+                    tour = np.concatenate([tour[:i], tour[e + 1:p + 1],
+                                           tour[i:e + 1], tour[p + 1:]])
+                else:
+                    tour = np.concatenate([tour[:p + 1], tour[i:e + 1],
+                                           tour[p + 1:i], tour[e + 1:]])
+            num_moves += 1
+
+        cost = self.cost(tour)
+        self.num_moves += num_moves
+        self.improvement += cost_start - cost
+        self.time += timer.perf_counter() - t_start
+        return tour, cost
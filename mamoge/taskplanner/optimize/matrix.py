@@ -0,0 +1,71 @@
+from typing import Any, List
+
+import networkx as nx
+import numpy as np
+
+from mamoge.taskplanner.optimize.route import route_array
+
+
+class TransitCache():
+    """Lazily evaluated transits of the dimension and capacity callbacks.
+
+    Arc transits are stored in one row per tail node and dimension, a
+    callback is evaluated once per arc. Inserting a new task into a route of
+    N nodes then evaluates O(N) arcs, the arcs of the route are cached.
+    """
+
+    def __init__(self, G: nx.Graph, dimensions: dict, capacities: dict) -> None:
+        self.G = G
+        self.dimensions = dimensions
+        self.capacities = capacities
+        self.rows = {}
+        self.values = {}
+        self.num_evaluations = 0
+
+    def arc(self, name: str, u: Any, v: Any) -> int:
+        """Return the transit of dimension name on the arc u -> v"""
+        row = self.rows.setdefault(name, {}).setdefault(u, {})
+        if v not in row:
+            cost_callback = self.dimensions[name]["cost_callback"]
+            row[v] = int(cost_callback(self.G, u, v))
+            self.num_evaluations += 1
+        return row[v]
+
+    def arcs(self, name: str, us: List[Any], vs: List[Any]) -> np.ndarray:
+        """Return the transits of dimension name on the arcs us[k] -> vs[k]"""
+        return np.array([self.arc(name, u, v) for u, v in zip(us, vs)],
+                        dtype=np.int64)
+
+    def node(self, name: str, u: Any) -> int:
+        """Return the transit of capacity name leaving node u"""
+        values = self.values.setdefault(name, {})
+        if u not in values:
+            capacity_callback = self.capacities[name]["capacity_callback"]
+            values[u] = int(capacity_callback(self.G, u))
+            self.num_evaluations += 1
+        return values[u]
+
+    def remove(self, node: Any) -> None:
+        """Drop the cached transits from and to node"""
+        for rows in self.rows.values():
+            rows.pop(node, None)
+            for row in rows.values():
+                row.pop(node, None)
+        for values in self.values.values():
+            values.pop(node, None)
+
+    def route_array(self, route: List[Any]) -> np.ndarray:
+        """Return the structured array of the dimension values along a route.
+
+        Same values as :func:`route.route_dimension_array` from the cache.
+        """
+        cumuls = {}
+        transits = {}
+        for name in self.dimensions:
+            transits[name] = self.arcs(name, route[:-1], route[1:])
+        for name in self.capacities:
+            transits[name] = np.array([self.node(name, u) for u in route[:-1]],
+                                      dtype=np.int64)
+        for name, transit in transits.items():
+            cumuls[name] = np.concatenate(([0], np.cumsum(transit)))
+        return route_array(route, cumuls, transits)
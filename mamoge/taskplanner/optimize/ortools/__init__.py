@@ -9,6 +9,14 @@ import networkx as nx
 import numpy as np
 
 from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.optimize.bounds import lower_bound, relative_gap
+from mamoge.taskplanner.optimize.dimensions import DimensionMixin
+from mamoge.taskplanner.optimize.ortools.precedence import PrecedenceModel
+from mamoge.taskplanner.optimize.profile import (VehicleProfile,
+                                                 profile_cost_callback,
+                                                 profile_time_matrices,
+                                                 unique_profiles)
+from mamoge.taskplanner.optimize.route import route_array, route_array_to_meta
 
 # logging.getLogger().removeHandler()
 # [logging.getLogger().removeHandler(h) for h in logging.getLogger().handlers]
@@ -16,7 +24,7 @@ from mamoge.taskplanner import nx as mamogenx
 logging.getLogger().setLevel(logging.DEBUG)
 
 
-class ORTaskOptimizer():
+class ORTaskOptimizer(DimensionMixin):
 
     def __init__(self) -> None:
         self.logger = logging.getLogger(__name__)
@@ -29,31 +37,88 @@ class ORTaskOptimizer():
         self.dimensions = {}
         self.capacities = {}
         self.penalty_dimension = "time"
+        # only allow successors along the arcs of the problem graph
+        self.sparse_arcs = True
+        # reduced constraints as native dimension precedences
+        self.native_precedence = True
+        # stop the search once the relative gap between the objective and
+        # the lower bound (see :mod:`bounds`) is reached, single route only.
+        # The gap is reported in stats
+        self.gap_limit = None
+        # precomputed transit matrices (dimensions) and vectors (capacities)
+        # by name over the nodes of the graph, e.g. from :class:`TaskProblem`
+        self.matrices = {}
+        self._vehicle_profiles = None
+        self.stats = {}
         # add default dimension for each step
         # self.add_dimension("step", cost_callback=lambda G,u,v: 1)
         pass
 
-    def add_dimension(self, name: str,
-                      cost_callback: Callable[[nx.Graph, int, int], int],
-                      capacity=None,
-                      slack=0,
-                      demand_callback=None):
-        self.logger.debug("adding dimension %s", name)
-        self.dimensions[name] = dict(cost_callback=cost_callback,
-                                     capacity=capacity, slack=slack,
-                                     demand_callback=demand_callback)
-
-    def add_capacity(self, name: str,
-                     capacity_callback: Callable[[nx.Graph, int], int],
-                     capacity=None,
-                     slack=0):
-        self.capacities[name] = dict(capacity_callback=capacity_callback,
-                                     capacity=capacity,
-                                     slack=slack)
+    def add_profile_dimension(self, name: str,
+                              distance_callback: Callable[[nx.Graph, int, int], float],
+                              service_callback: Callable[[nx.Graph, int], float] = None,
+                              capacity=None,
+                              slack=0):
+        """Add a time dimension depending on the vehicle profiles.
+
+        The distance matrix and service time vector are evaluated once, the
+        time matrix of each profile is derived from them (see
+        :func:`profile_time_matrices`). The cost_callback of the dimension
+        is the time of the first vehicle profile.
+        """
+        profile = (self.vehicle_profiles or [VehicleProfile()])[0]
+        self.add_dimension(name, profile_cost_callback(
+            profile, distance_callback, service_callback), capacity, slack)
+        self.dimensions[name].update(distance_callback=distance_callback,
+                                     service_callback=service_callback)
+
+    @property
+    def vehicle_profiles(self):
+        """One :class:`VehicleProfile` per route for the profile dimensions,
+        vehicles with the same profile share its transit matrix"""
+        return self._vehicle_profiles
+
+    @vehicle_profiles.setter
+    def vehicle_profiles(self, profiles):
+        self._vehicle_profiles = profiles
+        profile = (profiles or [VehicleProfile()])[0]
+        for dim_args in self.dimensions.values():
+            if "distance_callback" in dim_args:
+                dim_args["cost_callback"] = profile_cost_callback(
+                    profile, dim_args["distance_callback"],
+                    dim_args["service_callback"])
+
+    def settings(self) -> dict:
+        """Return the solver settings that change the result, e.g. for the
+        plan cache key"""
+        return dict(penalty_dimension=self.penalty_dimension,
+                    sparse_arcs=self.sparse_arcs,
+                    native_precedence=self.native_precedence,
+                    gap_limit=self.gap_limit,
+                    matrices=self.matrices,
+                    vehicle_profiles=[p.key for p in
+                                      self.vehicle_profiles or []])
+
+    def profile_matrices(self, dim_args, profiles) -> np.ndarray:
+        """Return the time matrices of the profiles for a profile dimension"""
+        distance = self.transit_matrix(dim_args["distance_callback"], float)
+        service = np.zeros(len(distance))
+        if dim_args["service_callback"] is not None:
+            service = np.array([dim_args["service_callback"](self.graph, node)
+                                for node in self.graph.nodes], dtype=float)
+        return profile_time_matrices(distance, service, profiles)
 
     @abstractmethod
-    def solve(self, max_time=30, num_routes=1, constraints=[]):
-        """Solve the optimization problem"""
+    def solve(self, max_time=30, num_routes=1, constraints=[],
+              initial_routes=None, columnar=False):
+        """Solve the optimization problem
+
+        initial_routes: optional list of node lists (one per route) used as
+        first solution for the local search, e.g. a stitched decomposition
+        result. Start and end nodes may be included.
+        columnar: return the route values as structured arrays (see
+        :meth:`extract_columns`) instead of meta data dicts.
+        """
         # breakpoint()
         # self.graph = mamogenx.G_problem_from_dag(self.graph)
         num_nodes = len(self.graph.nodes)
@@ -78,65 +143,55 @@ class ORTaskOptimizer():
         self.routing = pywrapcp.RoutingModel(self.manager, routing_parameters)
 
         has_arc_def = False
+        transit_matrices = {}
+        capacity_vectors = {}
+        vehicle_profiles = self.vehicle_profiles or [VehicleProfile()] * num_routes
+        if len(vehicle_profiles) != num_routes:
+            raise ValueError(f"{len(vehicle_profiles)} vehicle profiles for "
+                             f"{num_routes} routes")
+        profiles = unique_profiles(vehicle_profiles)
+        profile_index = {p.key: k for k, p in enumerate(profiles)}
+        num_transit_callbacks = 0
         for dim_name, dim_args in self.dimensions.items():
             self.logger.info(
                 f"Adding dimension {dim_name} with args {dim_args}")
             dim_cost_callback = dim_args["cost_callback"]
-            dim_demand_callback = dim_args["demand_callback"]
             slack = dim_args["slack"] if dim_args["slack"] is not None else 0
             capacity = (dim_args["capacity"]
                         if dim_args["capacity"] is not None
                         else 300000000)
             fix_start_cumul_to_zero = True
 
-            # cost_matrix = mamogenx.G_cost_matrix(self.graph, lambda u,v: dim_cost_callback(self.graph, u,v))
-
-            dim_matrix = np.zeros(
-                (len(self.graph), len(self.graph)), dtype=int)
-
-            def cost_callback(from_index, to_index):
-                # TODO transform callback to matrix for better performance
-                #
-                try:
-                    if dim_matrix[from_index, to_index] > 0:
-                        # print("cache hit", from_index, to_index)
-                        return dim_matrix[from_index, to_index]
-                    #
-                    # print("query", from_index, to_index)
-                    from_node = G_idx2node[self.manager.IndexToNode(
-                        from_index)]
-                    to_node = G_idx2node[self.manager.IndexToNode(to_index)]
-                    # print('dim_cost_callback', from_node, to_node)
-                    val = dim_cost_callback(self.graph, from_node, to_node)
-                    # print("cost_callback", from_index, to_index, cost_callback, val)
-
-                    node_time_demand = dim_demand_callback(
-                        self.graph, from_node)
-
-                    # dim_matrix[from_index, to_index] = val + node_time_demand
-
-                    return val
-                except Exception as e:
-                    self.logger.error((f"cost_callback error ({from_index}, "
-                                       f"{to_index}), "
-                                       f"{cost_callback}"))
-                    self.logger.error(e)
-                    return -1
-
-            callback_index = self.routing.RegisterTransitCallback(
-                cost_callback)
+            if "distance_callback" in dim_args:
+                dim_matrices = self.profile_matrices(dim_args, profiles)
+            else:
+                dim_matrix = self.matrices.get(dim_name)
+                if dim_matrix is None:
+                    dim_matrix = self.transit_matrix(dim_cost_callback)
+                dim_matrices = [dim_matrix]
+            # one callback per matrix, shared by the vehicles using it
+            callbacks = [self.routing.RegisterTransitMatrix(matrix.tolist())
+                         for matrix in dim_matrices]
+            num_transit_callbacks += len(callbacks)
+            matrix_index = [profile_index[p.key] if len(callbacks) > 1 else 0
+                            for p in vehicle_profiles]
+            vehicle_callbacks = [callbacks[k] for k in matrix_index]
+            # the first vehicle's matrix for the lower bound
+            transit_matrices[dim_name] = dim_matrices[matrix_index[0]]
 
             if has_arc_def == False:
                 self.logger.info(f"Setting ArcCost to dimension {dim_name}")
                 # Define cost of each arc.
-                self.routing.SetArcCostEvaluatorOfAllVehicles(callback_index)
+                for vehicle, callback_index in enumerate(vehicle_callbacks):
+                    self.routing.SetArcCostEvaluatorOfVehicle(callback_index,
+                                                              vehicle)
 
                 has_arc_def = True
             self.logger.info((f"Adding dimension {dim_name}: {slack}, "
                               f"{capacity}, "
                               f"{fix_start_cumul_to_zero}"))
-            self.routing.AddDimension(
-                callback_index,
+            self.routing.AddDimensionWithVehicleTransits(
+                vehicle_callbacks,
                 slack,
                 capacity,
                 fix_start_cumul_to_zero,
@@ -145,12 +200,6 @@ class ORTaskOptimizer():
             dimension = self.routing.GetDimensionOrDie(dim_name)
             dimension.SetGlobalSpanCostCoefficient(1)
 
-            def demand_callback(from_index):
-                from_node = G_idx2node[self.manager.IndexToNode(from_index)]
-                return dim_demand_callback(self.graph, from_node)
-
-            # demand_callback_index = self.routing.RegisterUnaryTransitCallback(demand_callback)
-
         if len(self.capacities) == 0:
             self.logger.info("No capacaties has been defined")
         for cap_name, cap_args in self.capacities.items():
@@ -164,14 +213,14 @@ class ORTaskOptimizer():
                         else 100000000)
             fix_start_cumul_to_zero = True
 
-            # capacity_vector = mamogenx.G_cost_vector(self.graph, lambda u: cap_cost_callback(self.graph, u))
-            def capacity_callback(index):
-                # print("capacity callback", index)
-                node = self.manager.IndexToNode(index)
-                return int(cap_cost_callback(self.graph, node))
-
-            capacity_callback_idx = self.routing.RegisterUnaryTransitCallback(
-                capacity_callback)
+            capacity_vector = self.matrices.get(cap_name)
+            if capacity_vector is None:
+                capacity_vector = np.array(
+                    [int(cap_cost_callback(self.graph, node))
+                     for node in G_idx2node], dtype=np.int64)
+            capacity_vectors[cap_name] = capacity_vector
+            capacity_callback_idx = self.routing.RegisterUnaryTransitVector(
+                capacity_vector.tolist())
 
             self.routing.AddDimensionWithVehicleCapacity(
                 capacity_callback_idx,
@@ -184,40 +233,24 @@ class ORTaskOptimizer():
             dimension = self.routing.GetDimensionOrDie(cap_name)
             dimension.SetGlobalSpanCostCoefficient(1)
 
+        if self.sparse_arcs:
+            self.restrict_arcs(num_routes)
+
         if len(constraints) == 0:
             self.logger.info("No constraints has been defined")
 
-        for constraint in constraints:
-            u = constraint.u
-            v = constraint.v
-            self.logger.info(f"Adding constraint {constraint}")
-            first_index = self.manager.NodeToIndex(u)
-            second_index = self.manager.NodeToIndex(v)
-            # same vehicle for every node in the sequence
-            self.routing.solver().Add(self.routing.VehicleVar(first_index) == self.routing.VehicleVar(second_index))
-
-            kw_args = constraint.kw_args
-
-            dimension = self.routing.GetDimensionOrDie(constraint.dimension)
-
-            if "min" in kw_args:
-                # TODO dynamic select dimension
-                min_value = kw_args["min"]
-                dim_str = constraint.dimension
-                constrain_arg = (dimension.CumulVar(first_index) +
-                                 min_value) <= dimension.CumulVar(second_index)
-                self.routing.solver().Add(constrain_arg)
-                #print("Adding min constraint", u,v,dim_str, min_value)
-
-            if "max" in kw_args:
-                # TODO dynamic select dimension
-                max_value = kw_args["max"]
-                dim_str = constraint.dimension
-                constrain_arg = (dimension.CumulVar(first_index) +
-                                 max_value) > dimension.CumulVar(second_index)
-                self.routing.solver().Add(constrain_arg)
-                #print("Adding max constraint", u,v,dim_str, min_value)
-                # raise "Not implemented"
+        t_constraints = time.perf_counter()
+        # constraints refer to node ids, the routing model to indices
+        G_node2idx = {n: i for i, n in enumerate(G_idx2node)}
+        index_constraints = [mamogenx.TaskConstraint(
+            G_node2idx[c.u], G_node2idx[c.v], c.dimension, **c.kw_args)
+            for c in constraints]
+        precedence = PrecedenceModel(index_constraints,
+                                     native=self.native_precedence)
+        num_constraints = precedence.apply(self.routing, self.manager,
+                                           num_routes)
+        self.logger.info((f"Added {num_constraints} constraints in "
+                          f"{time.perf_counter() - t_constraints:.3f}s"))
 
         # Allow to drop nodes, penalty of 60min.
         penalty = 60*60
@@ -250,7 +283,7 @@ class ORTaskOptimizer():
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
         # search_parameters.local_search_metaheuristic = (routing_enums_pb2.LocalSearchMetaheuristic.TABU_SEARCH)
-        search_parameters.time_limit.FromSeconds(max_time)
+        search_parameters.time_limit.FromMilliseconds(int(max_time * 1000))
 
         # search_parameters.first_solution_strategy = (
         # routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
@@ -283,10 +316,26 @@ class ORTaskOptimizer():
         # return [],[]
         # pass
         # print("start here 1")
+        bound = None
+        if self.gap_limit is not None and num_routes == 1:
+            bound = self.lower_bound(transit_matrices, capacity_vectors,
+                                     penalty)
+        stopped_early = []
+        if bound is not None:
+            def solution_callback():
+                objective = self.routing.CostVar().Value()
+                if relative_gap(objective, bound) <= self.gap_limit:
+                    stopped_early.append(objective)
+                    self.routing.solver().FinishCurrentSearch()
+
+            self.routing.AddAtSolutionCallback(solution_callback)
+
         self.logger.info("Solving task ...")
-        time.sleep(1)
+        t_solve = time.perf_counter()
 
         initial_solution = None
+        if initial_routes is not None:
+            initial_solution = self.read_initial_routes(initial_routes)
         if initial_solution:
             solution = self.routing.SolveFromAssignmentWithParameters(
                 initial_solution, search_parameters)
@@ -295,6 +344,17 @@ class ORTaskOptimizer():
 
         self.logger.info("Done")
 
+        self.stats = dict(lower_bound=bound, objective=None, gap=None,
+                          solve_time=time.perf_counter() - t_solve,
+                          stopped_early=len(stopped_early) > 0,
+                          transit_callbacks=num_transit_callbacks)
+        if solution is not None:
+            self.stats["objective"] = solution.ObjectiveValue()
+            if bound is not None:
+                self.stats["gap"] = relative_gap(self.stats["objective"],
+                                                 bound)
+        self.logger.info(f"Solver stats {self.stats}")
+
         if solution is None:
             self.logger.warn("Could not find any solution")
             return [], []
@@ -303,17 +363,131 @@ class ORTaskOptimizer():
         self.logger.info(f"{solution}")
         self.logger.info(f"num_route {num_routes}")
 
-        result, meta = self.extract_solution(
-            num_routes, self.manager, self.routing, solution)
+        if columnar:
+            meta = self.extract_columns(
+                num_routes, self.manager, self.routing, solution)
+            result = [array["node"].tolist() for array in meta]
+        else:
+            result, meta = self.extract_solution(
+                num_routes, self.manager, self.routing, solution)
 
         self.logger.debug(f"Results {result}")
 
         # [print(n) for n in [route for route in result]]
 
-        return [[G_idx2node[n] for n in path] for path in result], meta
+        return result, meta
         # return [G_idx2node[n] for n in [route for route in result]], meta
         # return result
 
+    def transit_matrix(self, cost_callback, dtype=np.int64) -> np.ndarray:
+        """Return the transit matrix of a dimension cost callback.
+
+        Only the arcs of the problem graph, start -> end and the self loops
+        are evaluated if the arcs are restricted (see :meth:`restrict_arcs`),
+        the other transits are never used. Failing callbacks give -1.
+        """
+        G_idx2node = list(self.graph.nodes)
+        num_nodes = len(G_idx2node)
+        matrix = np.zeros((num_nodes, num_nodes), dtype=dtype)
+        convert = int if np.issubdtype(dtype, np.integer) else float
+
+        if self.sparse_arcs:
+            G_node2idx = {n: i for i, n in enumerate(G_idx2node)}
+            arcs = [(G_node2idx[u], G_node2idx[v]) for u, v in self.graph.edges]
+            arcs += [(0, num_nodes - 1)] + [(i, i) for i in range(num_nodes)]
+        else:
+            arcs = [(i, j) for i in range(num_nodes) for j in range(num_nodes)]
+
+        for i, j in arcs:
+            try:
+                matrix[i, j] = convert(cost_callback(self.graph, G_idx2node[i],
+                                                     G_idx2node[j]))
+            except Exception as e:
+                self.logger.error(f"cost_callback error ({i}, {j}), "
+                                  f"{cost_callback}")
+                self.logger.error(e)
+                matrix[i, j] = -1
+        return matrix
+
+    def lower_bound(self, transit_matrices, capacity_vectors, penalty):
+        """Return a lower bound of the objective of a single route.
+
+        The arc costs are the first dimension twice (arc cost and span) plus
+        the other dimensions and the capacity transits of the tail node,
+        arcs outside the problem graph are forbidden if restricted.
+        """
+        matrices = list(transit_matrices.values())
+        if len(matrices) == 0:
+            return None
+        cost_matrix = (matrices[0] + sum(matrices)).astype(float)
+        for vector in capacity_vectors.values():
+            cost_matrix += vector[:, None]
+
+        if self.sparse_arcs:
+            G_node2idx = {n: i for i, n in enumerate(self.graph.nodes)}
+            allowed = np.zeros(cost_matrix.shape, dtype=bool)
+            for u, v in self.graph.edges:
+                allowed[G_node2idx[u], G_node2idx[v]] = True
+            allowed[0, -1] = True
+            cost_matrix[~allowed] = np.inf
+
+        t_bound = time.perf_counter()
+        bound = lower_bound(cost_matrix, 0, len(cost_matrix) - 1, penalty)
+        self.logger.info(f"Lower bound {bound} in "
+                         f"{time.perf_counter() - t_bound:.3f}s")
+        return float(bound)
+
+    def restrict_arcs(self, num_routes):
+        """Restrict the NextVar domains to the arcs of the problem graph.
+
+        Every node keeps itself as successor (unperformed node), every start
+        keeps the route ends (unused vehicle).
+        """
+        G_node2idx = {n: i for i, n in enumerate(self.graph.nodes)}
+        node_start, node_end = 0, len(self.graph) - 1
+
+        start_indices = [self.routing.Start(v) for v in range(num_routes)]
+        end_indices = [self.routing.End(v) for v in range(num_routes)]
+
+        num_arcs = 0
+        for node, node_idx in G_node2idx.items():
+            if node_idx == node_end:
+                continue
+
+            successors = [G_node2idx[s] for s in self.graph.successors(node)]
+            next_indices = [self.manager.NodeToIndex(s) for s in successors
+                            if s not in (node_start, node_end)]
+            if node_end in successors:
+                next_indices.extend(end_indices)
+
+            if node_idx == node_start:
+                for index in start_indices:
+                    self.routing.NextVar(index).SetValues(
+                        sorted(set(next_indices + end_indices)))
+            else:
+                index = self.manager.NodeToIndex(node_idx)
+                self.routing.NextVar(index).SetValues(
+                    sorted(set(next_indices + [index])))
+            num_arcs += len(next_indices)
+
+        self.logger.info(f"Restricted successors to {num_arcs} arcs")
+
+    def read_initial_routes(self, routes):
+        """Return an assignment for the given node routes or None if the routes are infeasible"""
+        G_node2idx = {n: i for i, n in enumerate(self.graph.nodes)}
+        start, end = 0, len(self.graph) - 1
+
+        index_routes = [[self.manager.NodeToIndex(G_node2idx[n]) for n in route
+                         if G_node2idx[n] not in (start, end)]
+                        for route in routes]
+
+        assignment = self.routing.ReadAssignmentFromRoutes(index_routes, True)
+
+        if assignment is None:
+            self.logger.warning("Initial routes are not feasible, ignoring")
+
+        return assignment
+
     def extract_values(self, solution, dim, index, prev_index, vehicle_id):
         results = {}
 
@@ -352,93 +526,42 @@ class ORTaskOptimizer():
         # print(plan_output)
         # plan_output += 'Route distance: {}miles\n'.format(route_distance)
 
-    def extract_solution(self, num_routes, manager, routing, solution):
-        """Print solution on console."""
-        # print(f'Objective: {solution.ObjectiveValue()}')
+    def extract_columns(self, num_routes, manager, routing, solution):
+        """Return one structured array per route with cumul, transit and slack of every dimension and capacity.
 
-        time_dim = routing.GetDimensionOrDie(self.penalty_dimension)
-        water_dim = routing.GetDimensionOrDie("water")
-        total_time = 0
+        See :func:`mamoge.taskplanner.optimize.route.route_dtype` for the
+        layout, the node column contains the graph node ids.
+        """
+        G_idx2node = list(self.graph.nodes)
+        names = list(self.dimensions) + list(self.capacities)
+        dimensions = [routing.GetDimensionOrDie(name) for name in names]
 
         results = []
-        results_meta = []
-
-        # max_route_distance = 0
         for vehicle_id in range(num_routes):
-            print("Vehicle ID", vehicle_id)
-            route = []
-            route_meta = {}  # []
-            index = routing.Start(vehicle_id)
-            prev_index = -1
-            # plan_output = 'Route for vehicle {}:\n'.format(vehicle_id)
-            # print("Transits", time_dim.CumulVar(index))
-            # route_distance = 0
-            while not routing.IsEnd(index):
-                node = manager.IndexToNode(index)
-                route.append(node)
-                # plan_output += ' {} -> '.format(manager.IndexToNode(index))
-                time_var = time_dim.CumulVar(index)
-                #slack_var = time_dim.SlackVar(index)
-                # transit_var = time_dim.TransitVar(index)
-
-                # print(f"time_var ", time_var)
-                # print(f"index ", index)
-                # print(f"prev_index ", prev_index)
-                # print(f"vehicle_id ", vehicle_id)
-                # print(f"{solution}, {time_dim}, {index}, {prev_index}, {vehicle_id}")
-                values = {}
-                values["time"] = self.extract_values(
-                    solution, time_dim, index, prev_index, vehicle_id)
-                values["water"] = self.extract_values(
-                    solution, water_dim, index, prev_index, vehicle_id)
-
-                route_meta[node] = values
-                # route_meta[node]["time"] = solution.Min(time_var), solution.Max(time_var)
-                #  print("Transit var", transit_var, solution.Value(transit_var))
-                # route_meta[node]["slack"] = slack_var.Min(), slack_var.Max()
-                # route_meta[node]["transit"] = transit_var.Min(), transit_var.Max()
-                # route_meta[node]["transit"] = solution.Min(transit_var), solution.Max(transit_var)
-
-                # (solution.Min(time_var), solution.Max(time_var), time_dim.SlackVar(index))
-                # plan_output += '{0} Time({1},{2}) -> '.format(
-                # manager.IndexToNode(index), solution.Min(time_var),
-                # solution.Max(time_var))
-
-                # print(f"plan output {plan_output}")
-                prev_index = index
-                index = solution.Value(routing.NextVar(index))
-
-                # print(f"next index {index}")
-                # route_distance += routing.GetArcCostForVehicle(
-                # previous_index, index, vehicle_id)
-
-            node = manager.IndexToNode(index)
-            time_var = time_dim.CumulVar(index)
-            # slack_var = time_dim.SlackVar(index)
-            # transit_var = time_dim.TransitVar(index)
-
-            # plan_output += '{0} Step({1},{2})\n'.format(node,
-            #                                         solution.Min(time_var),
-            #                                         solution.Max(time_var))
-            # plan_output += 'Time of the route: {}sec\n'.format(
-            #     solution.Min(time_var))
-            # print(plan_output)
-            total_time += solution.Min(time_var)
-
-            values = {}
-            values["time"] = self.extract_values(
-                solution, time_dim, index, prev_index, vehicle_id)
-            values["water"] = self.extract_values(
-                solution, water_dim, index, prev_index, vehicle_id)
-            route_meta[node] = values
-
-            route.append(manager.IndexToNode(index))
-
-            results.append(route)
-            results_meta.append(route_meta)
-            # plan_output += '{}\n'.format(manager.IndexToNode(index))
-            # plan_output += 'Distance of the route: {}m\n'.format(route_distance)
-            # print(plan_output)
-            # max_route_distance = max(route_distance, max_route_distance)
-        # print('Maximum of the route distances: {}m'.format(max_route_distance))
+            indices = [routing.Start(vehicle_id)]
+            while not routing.IsEnd(indices[-1]):
+                indices.append(solution.Value(routing.NextVar(indices[-1])))
+
+            arcs = list(zip(indices[:-1], indices[1:]))
+            cumuls = {}
+            transits = {}
+            for name, dimension in zip(names, dimensions):
+                cumuls[name] = [solution.Min(dimension.CumulVar(index))
+                                for index in indices]
+                transits[name] = [dimension.GetTransitValue(i, j, vehicle_id)
+                                  for i, j in arcs]
+
+            nodes = [G_idx2node[manager.IndexToNode(index)]
+                     for index in indices]
+            results.append(route_array(nodes, cumuls, transits))
+
+        return results
+
+    def extract_solution(self, num_routes, manager, routing, solution):
+        """Return the node routes and the route meta data dicts node -> dimension -> values"""
+        columns = self.extract_columns(num_routes, manager, routing, solution)
+
+        results = [array["node"].tolist() for array in columns]
+        results_meta = [route_array_to_meta(array) for array in columns]
+
         return results, results_meta
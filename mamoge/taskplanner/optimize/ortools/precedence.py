@@ -0,0 +1,142 @@
+import logging
+from typing import Any, List
+
+import networkx as nx
+
+from mamoge.taskplanner.nx import TaskConstraint
+
+
+def reduce_constraints(constraints: List[TaskConstraint]) -> List[TaskConstraint]:
+    """Return the transitive reduction of the constraints.
+
+    Constraints are grouped by dimension and arguments. Groups with a max
+    argument are kept as they are, for the other groups a constraint (u, w)
+    is implied by (u, v) and (v, w) since the min offsets are not negative.
+    """
+    groups = {}
+    for constraint in constraints:
+        key = (constraint.dimension,
+               tuple(sorted(constraint.kw_args.items())))
+        groups.setdefault(key, []).append(constraint)
+
+    reduced = []
+    for (dimension, kw_args), group in groups.items():
+        kw_args = dict(kw_args)
+        if "max" in kw_args or kw_args.get("min", 0) < 0:
+            reduced.extend(group)
+            continue
+
+        G_group = nx.DiGraph()
+        G_group.add_edges_from((c.u, c.v) for c in group)
+        reduced.extend(TaskConstraint(u, v, dimension, **kw_args)
+                       for u, v in G_transitive_reduction_edges(G_group))
+
+    return reduced
+
+
+def G_transitive_reduction_edges(G: nx.DiGraph) -> List[Any]:
+    """Return the edges of the transitive reduction of the dag G.
+
+    Reachability is kept as integer bitsets along the reverse topological
+    order, a successor is redundant if it is reachable from an earlier one.
+    """
+    topological = list(nx.topological_sort(G))
+    position = {n: i for i, n in enumerate(topological)}
+
+    reach = {}
+    edges = []
+    for u in reversed(topological):
+        covered = 0
+        for v in sorted(G.successors(u), key=position.get):
+            if not (covered >> position[v]) & 1:
+                edges.append((u, v))
+            covered |= reach[v] | (1 << position[v])
+        reach[u] = covered
+
+    return edges
+
+
+class PrecedenceModel():
+    """Add task constraints to a routing model.
+
+    Orderings with a min offset become native node precedences of the
+    dimension, max offsets stay solver constraints. A node precedence only
+    binds if both nodes are visited, so the precedences are reduced to their
+    transitive reduction only if tasks can not be dropped. For more than one
+    route constrained tasks are kept on the same vehicle along the reduced
+    edges. On a single route tasks are dropped independently, the
+    precedences hold between the visited tasks.
+    """
+
+    def __init__(self, constraints: List[TaskConstraint], native=True,
+                 droppable=True):
+        self.logger = logging.getLogger(__name__)
+        self.constraints = constraints
+        self.native = native
+        # tasks may be dropped, e.g. by disjunctions
+        self.droppable = droppable
+
+    def apply(self, routing, manager, num_routes=1) -> int:
+        """Add the constraints to the routing model, return the number of added constraints"""
+        if not self.native:
+            for constraint in self.constraints:
+                self.add_solver_constraint(routing, manager, constraint)
+            return len(self.constraints)
+
+        reduced = reduce_constraints(self.constraints)
+        self.logger.info(f"Reduced {len(self.constraints)} constraints to "
+                         f"{len(reduced)}")
+
+        if num_routes > 1:
+            # equality is transitive, the reduced edges connect the same tasks
+            for u, v in dict.fromkeys((c.u, c.v) for c in reduced):
+                routing.solver().Add(
+                    routing.VehicleVar(manager.NodeToIndex(u)) ==
+                    routing.VehicleVar(manager.NodeToIndex(v)))
+
+        constraints = self.constraints if self.droppable else reduced
+        for constraint in constraints:
+            if constraint.dimension is None:
+                continue
+
+            first_index = manager.NodeToIndex(constraint.u)
+            second_index = manager.NodeToIndex(constraint.v)
+            dimension = routing.GetDimensionOrDie(constraint.dimension)
+            kw_args = constraint.kw_args
+
+            if "min" in kw_args:
+                dimension.AddNodePrecedence(first_index, second_index,
+                                            int(kw_args["min"]))
+
+            if "max" in kw_args:
+                max_value = kw_args["max"]
+                routing.solver().Add(
+                    (dimension.CumulVar(first_index) + max_value) >
+                    dimension.CumulVar(second_index))
+
+        return len(constraints)
+
+    def add_solver_constraint(self, routing, manager, constraint):
+        """Add a constraint as same vehicle and cumul inequalities (per pair encoding)"""
+        u = constraint.u
+        v = constraint.v
+        first_index = manager.NodeToIndex(u)
+        second_index = manager.NodeToIndex(v)
+        # same vehicle for every node in the sequence
+        routing.solver().Add(routing.VehicleVar(first_index) == routing.VehicleVar(second_index))
+
+        kw_args = constraint.kw_args
+
+        dimension = routing.GetDimensionOrDie(constraint.dimension)
+
+        if "min" in kw_args:
+            min_value = kw_args["min"]
+            constrain_arg = (dimension.CumulVar(first_index) +
+                             min_value) <= dimension.CumulVar(second_index)
+            routing.solver().Add(constrain_arg)
+
+        if "max" in kw_args:
+            max_value = kw_args["max"]
+            constrain_arg = (dimension.CumulVar(first_index) +
+                             max_value) > dimension.CumulVar(second_index)
+            routing.solver().Add(constrain_arg)
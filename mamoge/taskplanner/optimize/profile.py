@@ -0,0 +1,65 @@
+from typing import List
+
+import numpy as np
+
+
+class VehicleProfile():
+    '''structure to save the speed and service time factor of a vehicle type.
+    Vehicles with the same profile share its transit matrices'''
+
+    def __init__(self, name: str = "default", velocity=1.0, service_factor=1.0):
+        self.name = name
+        self.velocity = velocity
+        self.service_factor = service_factor
+
+    @property
+    def key(self) -> tuple:
+        """Return the parameters that determine the transit matrices"""
+        return (float(self.velocity), float(self.service_factor))
+
+    def transit(self, distance, service=0) -> int:
+        """Return the time of an arc with the given distance leaving a node
+        with the given service time"""
+        return int(np.rint(distance / self.velocity + self.service_factor * service))
+
+    def __repr__(self):
+        return (f"VehicleProfile({self.name}, velocity:{self.velocity}, "
+                f"service_factor:{self.service_factor})")
+
+
+def profile_cost_callback(profile: VehicleProfile, distance_callback,
+                          service_callback=None):
+    """Return the cost callback of a profile dimension for one profile"""
+    def cost_callback(G, u, v):
+        service = service_callback(G, u) if service_callback else 0
+        return profile.transit(distance_callback(G, u, v), service)
+    return cost_callback
+
+
+def unique_profiles(profiles: List[VehicleProfile]) -> List[VehicleProfile]:
+    """Return the first profile of each :attr:`VehicleProfile.key` in order
+    of first use, profiles with the same parameters share a matrix"""
+    unique = {}
+    for profile in profiles:
+        unique.setdefault(profile.key, profile)
+    return list(unique.values())
+
+
+def profile_time_matrices(distance_matrix: np.ndarray, service_vector: np.ndarray,
+                          profiles: List[VehicleProfile]) -> np.ndarray:
+    """Return the time matrices of all profiles in one step.
+
+    time[p, i, j] = distance[i, j] / velocity[p] + service_factor[p] * service[i]
+    rounded like :meth:`VehicleProfile.transit`. Negative distances (failed
+    callbacks) stay -1.
+    """
+    velocity = np.array([p.velocity for p in profiles], dtype=float)
+    factor = np.array([p.service_factor for p in profiles], dtype=float)
+    distance = np.asarray(distance_matrix, dtype=float)
+    service = np.asarray(service_vector, dtype=float)
+
+    times = (distance[None, :, :] / velocity[:, None, None]
+             + factor[:, None, None] * service[None, :, None])
+    times = np.rint(times).astype(np.int64)
+    times[:, distance < 0] = -1
+    return times
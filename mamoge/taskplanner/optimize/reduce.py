@@ -0,0 +1,259 @@
+import logging
+import time
+from typing import Any, Callable, List
+
+import networkx as nx
+
+from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.optimize.cache import canonical_location
+from mamoge.taskplanner.optimize.dimensions import DimensionMixin
+from mamoge.taskplanner.optimize.route import route_dimension_values
+
+
+def location_key(G: nx.Graph, node: Any):
+    """Return the canonical location of a node, None if it has none.
+
+    All :class:`ZeroDistanceLocation` tasks share one key.
+    """
+    location = G.nodes[node].get("location")
+    if location is None:
+        return None
+    return canonical_location(location)
+
+
+def G_task_groups(G: nx.Graph, key: Callable[[nx.Graph, Any], Any] = location_key,
+                  separate=(), strict=True) -> List[List[Any]]:
+    """Return groups of tasks of a problem graph with the same key.
+
+    A task joins a group only if contracting the group keeps the task dag
+    acyclic, i.e. no task outside the group lies on a dag path between two
+    group tasks (including paths through other groups). If strict, all tasks
+    of a group must also have the same ancestors outside the group. Then any
+    route can visit the group at once where it visits its first task, so for
+    co-located tasks (and costs with the triangle inequality) nothing is
+    lost. Pairs in separate are never grouped. Groups are in topological
+    order, single tasks are groups of their own.
+    """
+    dag = mamogenx.G_dag_from_problem(G)
+    nodes = list(G.nodes)
+    tasks = [n for n in nx.topological_sort(dag) if n not in (nodes[0], nodes[-1])]
+    separate = {frozenset(pair) for pair in separate}
+    ancestors = {n: nx.ancestors(dag, n) for n in tasks} if strict else {}
+
+    def same_ancestors(members):
+        outside = [ancestors[m] - members for m in members]
+        return all(a == outside[0] for a in outside[1:])
+
+    # quotient dag, groups are represented by their first task
+    quotient = dag.copy()
+    group_of = {}
+    groups = {}
+    first_of_key = {}
+
+    def reachable(sources, skip):
+        found = set()
+        stack = [w for s in sources for w in quotient.successors(s) if w != skip]
+        while stack:
+            w = stack.pop()
+            if w not in found:
+                found.add(w)
+                stack.extend(quotient.successors(w))
+        return found
+
+    for n in tasks:
+        k = key(G, n)
+        candidates = first_of_key.setdefault(k, []) if k is not None else []
+        for r in candidates:
+            if any(frozenset((n, m)) in separate for m in groups[r]):
+                continue
+            if strict and not same_ancestors(set(groups[r]) | {n}):
+                continue
+            # no path r -> ... -> n or n -> ... -> r through another node
+            if n in reachable([r], n) or r in reachable([n], r):
+                continue
+            nx.contracted_nodes(quotient, r, n, self_loops=False, copy=False)
+            groups[r].append(n)
+            group_of[n] = r
+            break
+        else:
+            groups[n] = [n]
+            group_of[n] = n
+            candidates.append(n)
+
+    order = [n for n in nx.topological_sort(quotient) if n in groups]
+    return [groups[r] for r in order]
+
+
+class ProblemReduction():
+    """Problem graph with groups of tasks collapsed into single nodes.
+
+    The reduced problem graph has the arcs :func:`mamogenx.G_problem_from_dag`
+    builds from the contracted task dag, nodes are relabeled to 0..m+1. A
+    group is visited in the given task order, the transits within a group are
+    added to the arcs leaving it and the capacity demands are summed, so the
+    dimension values of an expanded route match the reduced route. Dropping
+    a group drops all its tasks.
+    """
+
+    def __init__(self, G: nx.Graph, groups: List[List[Any]],
+                 dimensions: dict, capacities: dict) -> None:
+        nodes = list(G.nodes)
+        start, end = nodes[0], nodes[-1]
+        self.G = G
+        self.members = [[start]] + [list(g) for g in groups] + [[end]]
+        index = {n: i for i, members in enumerate(self.members)
+                 for n in members}
+
+        dag = mamogenx.G_dag_from_problem(G)
+        reduced_dag = nx.DiGraph()
+        for i, members in enumerate(self.members):
+            reduced_dag.add_node(i, **G.nodes[members[0]])
+        reduced_dag.add_edges_from((index[u], index[v]) for u, v in dag.edges
+                                   if index[u] != index[v])
+
+        # same arcs as G_problem_from_dag, which would rebind the locations
+        closure = nx.transitive_closure_dag(reduced_dag)
+        self.graph = reduced_dag.copy()
+        self.graph.add_edges_from(
+            (i, j) for i in closure.nodes for j in closure.nodes
+            if i != j and not closure.has_edge(i, j)
+            and not closure.has_edge(j, i))
+
+        self.dimensions = {name: {**args, "cost_callback":
+                                  self.reduce_cost_callback(args["cost_callback"])}
+                           for name, args in dimensions.items()}
+        self.capacities = {name: {**args, "capacity_callback":
+                                  self.reduce_capacity_callback(
+                                      args["capacity_callback"])}
+                           for name, args in capacities.items()}
+        self.offsets = {name: self.group_offsets(args["cost_callback"])
+                        for name, args in dimensions.items()}
+
+    def group_offsets(self, cost_callback) -> dict:
+        """Return task -> transit from the first task of its group"""
+        offsets = {}
+        for members in self.members:
+            offset = 0
+            offsets[members[0]] = 0
+            for u, v in zip(members[:-1], members[1:]):
+                offset += int(cost_callback(self.G, u, v))
+                offsets[v] = offset
+        return offsets
+
+    def reduce_cost_callback(self, cost_callback):
+        G = self.G
+        members = self.members
+        internal = [sum(int(cost_callback(G, u, v))
+                        for u, v in zip(m[:-1], m[1:])) for m in members]
+
+        def reduced_cost_callback(G_reduced, i, j):
+            return internal[i] + cost_callback(G, members[i][-1], members[j][0])
+        return reduced_cost_callback
+
+    def reduce_capacity_callback(self, capacity_callback):
+        G = self.G
+        demand = [sum(int(capacity_callback(G, n)) for n in m)
+                  for m in self.members]
+
+        def reduced_capacity_callback(G_reduced, i):
+            return demand[i]
+        return reduced_capacity_callback
+
+    def reduce_constraints(self, constraints) -> list:
+        """Return the constraints between the group nodes.
+
+        The min/max bounds are shifted by the offsets of the tasks within
+        their groups, constraints within a group are dropped.
+        """
+        index = {n: i for i, members in enumerate(self.members)
+                 for n in members}
+        reduced = []
+        for c in constraints:
+            if c.u not in index or c.v not in index or index[c.u] == index[c.v]:
+                continue
+            kw_args = dict(c.kw_args)
+            if c.dimension in self.offsets:
+                offsets = self.offsets[c.dimension]
+                shift = offsets[c.v] - offsets[c.u]
+                for bound in ("min", "max"):
+                    if bound in kw_args:
+                        kw_args[bound] = kw_args[bound] - shift
+            reduced.append(mamogenx.TaskConstraint(index[c.u], index[c.v],
+                                                   c.dimension, **kw_args))
+        return reduced
+
+    def expand(self, route: List[int]) -> List[Any]:
+        """Return the task route of a route of group nodes"""
+        return [n for i in route for n in self.members[i]]
+
+
+class ReductionTaskOptimizer(DimensionMixin):
+    """Solve problems with co-located tasks on a reduced problem graph.
+
+    Tasks with the same location key (see :func:`G_task_groups`) are merged
+    into one routing node, the reduced problem is solved with
+    :class:`ORTaskOptimizer` (exactly if small enough) and the groups are
+    expanded back into the task route.
+    """
+
+    def __init__(self, key=location_key, strict=True,
+                 exact_threshold=16) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.graph = None
+        self.key = key
+        self.strict = strict
+        # reduced problems with up to this many groups are solved exactly
+        self.exact_threshold = exact_threshold
+        #
+        self.dimensions = {}
+        self.capacities = {}
+        self.penalty_dimension = "time"
+        self.stats = {}
+
+    def create_optimizer(self, reduction: ProblemReduction) -> "ORTaskOptimizer":
+        """Return a monolithic optimizer for the reduced problem"""
+        from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+
+        optimizer = ORTaskOptimizer()
+        optimizer.graph = reduction.graph
+        optimizer.penalty_dimension = self.penalty_dimension
+        for dim_name, dim_args in reduction.dimensions.items():
+            optimizer.add_dimension(dim_name, **dim_args)
+        for cap_name, cap_args in reduction.capacities.items():
+            optimizer.add_capacity(cap_name, **cap_args)
+        return optimizer
+
+    def solve(self, max_time=30, num_routes=1, constraints=[]):
+        """Solve the reduced optimization problem"""
+        from mamoge.taskplanner.optimize import TaskOptimizer
+
+        t_start = time.perf_counter()
+        separate = [(c.u, c.v) for c in constraints]
+        groups = G_task_groups(self.graph, self.key, separate, self.strict)
+        reduction = ProblemReduction(self.graph, groups, self.dimensions,
+                                     self.capacities)
+        t_reduced = time.perf_counter()
+        self.logger.info(f"Reduced {len(self.graph) - 2} tasks to "
+                         f"{len(groups)} groups")
+
+        optimizer = self.create_optimizer(reduction)
+        reduced_constraints = reduction.reduce_constraints(constraints)
+        if num_routes == 1:
+            optimizer = TaskOptimizer(optimizer,
+                                      exact_threshold=self.exact_threshold)
+            result, _ = optimizer.solve_impl(max_time, reduced_constraints)
+        else:
+            result, _ = optimizer.solve(max_time, num_routes,
+                                        reduced_constraints)
+        t_solved = time.perf_counter()
+
+        routes = [reduction.expand(route) for route in result]
+        meta = [route_dimension_values(self.graph, route, self.dimensions,
+                                       self.capacities) for route in routes]
+
+        self.stats = dict(num_tasks=len(self.graph) - 2,
+                          num_groups=len(groups),
+                          reduce_time=t_reduced - t_start,
+                          solve_time=t_solved - t_reduced)
+        self.logger.info(f"Reduction stats {self.stats}")
+        return routes, meta
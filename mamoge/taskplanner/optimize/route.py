@@ -0,0 +1,130 @@
+from typing import Any, List
+
+import networkx as nx
+import numpy as np
+
+ROUTE_VALUE_FIELDS = ("cumul", "transit", "slack")
+
+
+def route_dtype(names: List[str], node_dtype=np.int64) -> np.dtype:
+    """Return the structured dtype of a route with the given dimension names.
+
+    Each row is one visited node, each dimension has a (cumul, transit,
+    slack) sub record. transit and slack refer to the arc into the node.
+    """
+    value_dtype = np.dtype([(field, np.int64) for field in ROUTE_VALUE_FIELDS])
+    return np.dtype([("node", node_dtype)] +
+                    [(name, value_dtype) for name in names])
+
+
+def route_array(nodes: List[Any], cumuls: dict, transits: dict) -> np.ndarray:
+    """Return the structured array of a route.
+
+    cumuls contains the cumul value per node, transits the transit value per
+    arc (one value less) for each dimension name. The slack is the part of
+    the cumul difference not explained by the transit.
+    """
+    node_dtype = (np.int64 if all(isinstance(n, (int, np.integer)) for n in nodes)
+                  else object)
+    array = np.zeros(len(nodes), dtype=route_dtype(list(cumuls), node_dtype))
+    array["node"] = nodes
+
+    for name, cumul in cumuls.items():
+        cumul = np.asarray(cumul, dtype=np.int64)
+        transit = np.asarray(transits[name], dtype=np.int64)
+        array[name]["cumul"] = cumul
+        array[name]["transit"][1:] = transit
+        array[name]["slack"][1:] = np.diff(cumul) - transit
+
+    return array
+
+
+def route_array_to_meta(array: np.ndarray) -> dict:
+    """Return the route meta data dict node -> dimension -> {cumul, demand, slack, transit}"""
+    names = [name for name in array.dtype.names if name != "node"]
+
+    columns = {}
+    for name in names:
+        cumul = array[name]["cumul"]
+        demand = np.zeros_like(cumul)
+        demand[1:] = np.diff(cumul)
+        columns[name] = (cumul.tolist(), demand.tolist(),
+                         array[name]["slack"].tolist(),
+                         array[name]["transit"].tolist())
+
+    route_meta = {}
+    for i, node in enumerate(array["node"].tolist()):
+        route_meta[node] = {name: dict(cumul=cumul[i], demand=demand[i],
+                                       slack=slack[i], transit=transit[i])
+                            for name, (cumul, demand, slack, transit)
+                            in columns.items()}
+    return route_meta
+
+
+def route_dimension_array(G: nx.Graph, route: List[Any], dimensions: dict,
+                          capacities: dict) -> np.ndarray:
+    """Return the structured array of the dimension values along a route.
+
+    Dimensions use the cost callback of the arc into the node, capacities
+    the capacity callback of the previous node, there is no slack.
+    """
+    cumuls = {}
+    transits = {}
+
+    for dim_name, dim_args in dimensions.items():
+        cost_callback = dim_args["cost_callback"]
+        transits[dim_name] = [int(cost_callback(G, u, v))
+                              for u, v in zip(route[:-1], route[1:])]
+
+    for cap_name, cap_args in capacities.items():
+        capacity_callback = cap_args["capacity_callback"]
+        transits[cap_name] = [int(capacity_callback(G, u)) for u in route[:-1]]
+
+    for name, transit in transits.items():
+        cumuls[name] = np.concatenate(([0], np.cumsum(transit, dtype=np.int64)))
+
+    return route_array(route, cumuls, transits)
+
+
+def route_dimension_values(G: nx.Graph, route: List[Any], dimensions: dict,
+                           capacities: dict) -> dict:
+    """Return the dimension values along a route.
+
+    The result has the same format as the route meta data of
+    :meth:`ORTaskOptimizer.extract_solution`, i.e. a dict
+    node -> dimension -> {cumul, demand, slack, transit}.
+    """
+    return route_array_to_meta(
+        route_dimension_array(G, route, dimensions, capacities))
+
+
+def route_cost(G: nx.Graph, route: List[Any], cost_callback) -> float:
+    """Return the summed arc cost of the route"""
+    return sum(cost_callback(G, u, v) for u, v in zip(route[:-1], route[1:]))
+
+
+def route_feasible(array: np.ndarray, limits: dict, constraints) -> bool:
+    """Return if the route values respect capacities and constraints.
+
+    limits maps the dimension and capacity names to their arguments (with a
+    capacity entry), constraints are min/max differences of the cumuls.
+    """
+    names = [name for name in array.dtype.names if name != "node"]
+    for name in names:
+        capacity = limits[name]["capacity"]
+        if capacity is not None and array[name]["cumul"].max() > capacity:
+            return False
+
+    position = {node: i for i, node in enumerate(array["node"].tolist())}
+    for c in constraints:
+        if c.dimension is None or c.dimension not in names:
+            continue
+        if c.u not in position or c.v not in position:
+            continue
+        cumul = array[c.dimension]["cumul"]
+        difference = cumul[position[c.v]] - cumul[position[c.u]]
+        if difference < c.kw_args.get("min", -np.inf):
+            return False
+        if difference > c.kw_args.get("max", np.inf):
+            return False
+    return True
@@ -0,0 +1,296 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import gc
+import logging
+import multiprocessing
+import os
+import threading
+import time as timer
+import traceback
+from typing import Callable
+
+import networkx as nx
+
+from mamoge.taskplanner.location import LocationContext
+
+
+class SolveResult():
+    '''structure to save the result and timing of a solved problem'''
+
+    def __init__(self, job_id: int, plan=None, meta=None, submitted=None,
+                 started=None, finished=None, worker=None, error=None):
+        self.job_id = job_id
+        self.plan = plan
+        self.meta = meta
+        self.submitted = submitted
+        self.started = started
+        self.finished = finished
+        self.worker = worker
+        self.error = error
+
+    @property
+    def queue_latency(self) -> float:
+        """Return the time the problem waited in the queue in seconds"""
+        return self.started - self.submitted
+
+    @property
+    def solve_time(self) -> float:
+        return self.finished - self.started
+
+    def __repr__(self):
+        return (f"SolveResult({self.job_id}, worker:{self.worker}, "
+                f"latency:{self.queue_latency:.3f}s, "
+                f"solve_time:{self.solve_time:.3f}s, error:{self.error})")
+
+
+def _worker_main(worker_id, optimizer_factory, initializer, initargs,
+                 task_queue, result_queue):
+    """Solve problems from the task queue until a None job is received.
+
+    The optimizer is created once, so OR-Tools and graphs loaded by the
+    initializer stay loaded between jobs. The locations of each job are
+    bound to a :class:`LocationContext` of their own, as cached distances
+    depend on the problem graph.
+    """
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+        optimizer = optimizer_factory()
+    except Exception:
+        result_queue.put(("failed", (worker_id, traceback.format_exc())))
+        return
+    result_queue.put(("ready", worker_id))
+
+    while True:
+        job = task_queue.get()
+        if job is None:
+            break
+
+        job_id, G, max_time, num_routes, constraints, submitted = job
+        result = SolveResult(job_id, submitted=submitted, started=timer.time(),
+                             worker=worker_id)
+        try:
+            context = LocationContext()
+            for node in G.nodes:
+                location = G.nodes[node].get("location")
+                if location is not None:
+                    location.context = context
+            optimizer.graph = G
+            result.plan, result.meta = optimizer.solve(max_time, num_routes,
+                                                       constraints)
+        except Exception:
+            result.error = traceback.format_exc()
+        result.finished = timer.time()
+        result_queue.put(("result", result))
+
+
+class SolverService():
+    """Pool of pre-warmed solver worker processes fed from a local queue.
+
+    Each worker calls the optional initializer (e.g. to load the base route
+    map) and creates its optimizer with optimizer_factory once, problems are
+    then taken from a multiprocessing queue and solved concurrently.
+
+    usage:
+        with SolverService(create_optimizer, num_workers=4) as service:
+            job_id = service.submit(G_problem, time=10)
+            result = service.result(job_id)
+    """
+
+    def __init__(self, optimizer_factory: Callable, num_workers=None,
+                 initializer: Callable = None, initargs=(), context=None):
+        self.logger = logging.getLogger(__name__)
+        self.optimizer_factory = optimizer_factory
+        self.num_workers = num_workers if num_workers else os.cpu_count()
+        self.initializer = initializer
+        self.initargs = initargs
+        self.context = multiprocessing.get_context(context)
+
+        self.workers = []
+        self.task_queue = None
+        self.result_queue = None
+        self.collector = None
+
+        self.next_job_id = 0
+        self.results = {}
+        self.solved = []
+        self.pending = set()
+        self.ready = set()
+        self.failed_workers = {}
+        self.condition = threading.Condition()
+
+    def start(self, wait=True) -> "SolverService":
+        """Start the worker processes, optionally wait until all are warmed up"""
+        self.task_queue = self.context.Queue()
+        self.result_queue = self.context.Queue()
+
+        for worker_id in range(self.num_workers):
+            worker = self.context.Process(
+                target=_worker_main,
+                args=(worker_id, self.optimizer_factory, self.initializer,
+                      self.initargs, self.task_queue, self.result_queue),
+                daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+
+        if wait:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: (len(self.ready) + len(self.failed_workers)
+                             == self.num_workers))
+            if len(self.failed_workers) > 0:
+                self.shutdown()
+                raise RuntimeError(("Could not start solver workers: "
+                                    f"{self.failed_workers}"))
+        self.logger.info(f"Started {self.num_workers} solver workers")
+        return self
+
+    def _collect(self):
+        while True:
+            message = self.result_queue.get()
+            if message is None:
+                break
+            kind, value = message
+            with self.condition:
+                if kind == "ready":
+                    self.ready.add(value)
+                elif kind == "failed":
+                    self.failed_workers[value[0]] = value[1]
+                else:
+                    self.results[value.job_id] = value
+                    self.solved.append(value)
+                    self.pending.discard(value.job_id)
+                self.condition.notify_all()
+
+    def submit(self, G: nx.Graph, time=30, constraints=None, num_routes=1) -> int:
+        """Put a problem graph into the queue, return its job id"""
+        if constraints is None:
+            constraints = []
+
+        with self.condition:
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            self.pending.add(job_id)
+
+        self.task_queue.put((job_id, G, time, num_routes, constraints,
+                             timer.time()))
+        return job_id
+
+    def result(self, job_id: int, timeout=None) -> SolveResult:
+        """Wait for and return the result of the given job"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: job_id in self.results,
+                                           timeout=timeout):
+                raise TimeoutError(f"Job {job_id} not solved in time")
+            return self.results.pop(job_id)
+
+    def join(self, timeout=None) -> bool:
+        """Wait until all submitted jobs are solved"""
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.pending) == 0,
+                                           timeout=timeout)
+
+    def stats(self) -> dict:
+        """Return queue latency and throughput of the solved jobs"""
+        with self.condition:
+            solved = list(self.solved)
+
+        if len(solved) == 0:
+            return dict(solved=0)
+
+        latencies = [r.queue_latency for r in solved]
+        duration = (max(r.finished for r in solved) -
+                    min(r.submitted for r in solved))
+        return dict(solved=len(solved),
+                    failed=sum(1 for r in solved if r.error is not None),
+                    queue_latency_mean=sum(latencies) / len(latencies),
+                    queue_latency_max=max(latencies),
+                    solve_time_mean=sum(r.solve_time for r in solved) / len(solved),
+                    throughput=len(solved) / duration if duration > 0 else None)
+
+    def shutdown(self):
+        """Stop the workers after the queued jobs are done"""
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.result_queue.put(None)
+        self.collector.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+# problems of solve_many, inherited by the forked pool workers
+_inherited_problems = None
+_inherit_lock = threading.Lock()
+
+
+def _set_problems(problems):
+    global _inherited_problems
+    _inherited_problems = problems
+
+
+def _solve_inherited(index, time, submitted, kw_args) -> SolveResult:
+    result = SolveResult(index, submitted=submitted, started=timer.time(),
+                         worker=os.getpid())
+    try:
+        result.plan, result.meta = _inherited_problems[index].solve(time,
+                                                                    **kw_args)
+    except Exception:
+        result.error = traceback.format_exc()
+    result.finished = timer.time()
+    return result
+
+
+def solve_many(problems, time=30, num_workers=None, context=None, **kw_args):
+    """Solve independent problems in a process pool.
+
+    problems have a solve(time, **kw_args) method returning (plan, meta),
+    e.g. :class:`problem.ProblemSnapshot`. A :class:`SolveResult` with the
+    problem index as job id is yielded per problem in completion order.
+
+    With the fork start method (default where available) the workers
+    inherit the problems with their base route maps and distance caches
+    copy-on-write, only indices and results are pickled. The inherited
+    objects are kept out of the garbage collector (gc.freeze) while the
+    workers start, so their memory pages stay shared. With other start
+    methods the problems are sent once per worker.
+    """
+    problems = list(problems)
+    if context is None and "fork" in multiprocessing.get_all_start_methods():
+        context = "fork"
+    context = multiprocessing.get_context(context)
+    fork = context.get_start_method() == "fork"
+    num_workers = min(num_workers or os.cpu_count(), max(len(problems), 1))
+
+    with _inherit_lock:
+        if fork:
+            _set_problems(problems)
+            gc.freeze()
+            pool = ProcessPoolExecutor(num_workers, mp_context=context)
+        else:
+            pool = ProcessPoolExecutor(num_workers, mp_context=context,
+                                       initializer=_set_problems,
+                                       initargs=(problems,))
+        try:
+            # forked workers are started on the first submit
+            futures = [pool.submit(_solve_inherited, index, time, timer.time(),
+                                   kw_args)
+                       for index in range(len(problems))]
+        finally:
+            if fork:
+                gc.unfreeze()
+                _set_problems(None)
+
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
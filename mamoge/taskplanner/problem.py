@@ -0,0 +1,551 @@
+import copy
+import logging
+from typing import Any, Callable
+
+import networkx as nx
+import numpy as np
+
+from mamoge.taskplanner import nx as mamogenx
+from mamoge.taskplanner.location import LocationContext
+from mamoge.taskplanner.optimize.dimensions import DimensionMixin
+
+
+def evaluate_transit(callback, G: nx.Graph, *nodes) -> int:
+    """Return the integer value of a cost or capacity callback, -1 if it fails"""
+    try:
+        return int(callback(G, *nodes))
+    except Exception as e:
+        logging.getLogger(__name__).error(f"callback error {nodes}, {e}")
+        return -1
+
+
+class TaskProblem(DimensionMixin):
+    """Task dag with its problem graph kept up to date under edits.
+
+    The problem graph has the arcs of :func:`mamogenx.G_problem_from_dag`,
+    the constraints are the ones of :func:`mamogenx.G_descendent_constrains`.
+    The dimension matrices and capacity vectors are indexed by the position
+    of the nodes in the problem graph, the end node stays last. An edit only
+    updates the node pairs whose order changes and the rows and columns of
+    added or changed tasks.
+    """
+
+    def __init__(self, dag: nx.DiGraph, kw_args_callback=None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.dag = dag.copy()
+        self.graph = mamogenx.G_problem_from_dag(self.dag)
+        self.kw_args_callback = kw_args_callback
+        nodes = list(self.graph.nodes)
+        self.start, self.end = nodes[0], nodes[-1]
+
+        self.descendants = {n: nx.descendants(self.dag, n) for n in self.dag}
+        self.ancestors = {n: nx.ancestors(self.dag, n) for n in self.dag}
+        self._constraints = {}
+        for u in self.tasks():
+            for v in self.descendants[u]:
+                self.add_constraint(u, v)
+
+        self.dimensions = {}
+        self.capacities = {}
+        self.matrices = {}
+        self.index = {n: i for i, n in enumerate(self.graph.nodes)}
+
+    @property
+    def constraints(self) -> list:
+        """Return the :class:`mamogenx.TaskConstraint` of all ordered task pairs"""
+        return list(self._constraints.values())
+
+    def tasks(self) -> list:
+        """Return the nodes without start and end"""
+        return list(self.graph.nodes)[1:-1]
+
+    def add_dimension(self, name: str,
+                      cost_callback: Callable[[nx.Graph, int, int], int],
+                      capacity=None,
+                      slack=0,
+                      demand_callback=None):
+        DimensionMixin.add_dimension(self, name, cost_callback, capacity,
+                                     slack, demand_callback)
+        nodes = list(self.graph.nodes)
+        self.matrices[name] = np.array(
+            [[evaluate_transit(cost_callback, self.graph, u, v) for v in nodes]
+             for u in nodes], dtype=np.int64).reshape(len(nodes), len(nodes))
+
+    def add_capacity(self, name: str,
+                     capacity_callback: Callable[[nx.Graph, int], int],
+                     capacity=None,
+                     slack=0):
+        DimensionMixin.add_capacity(self, name, capacity_callback, capacity,
+                                    slack)
+        self.matrices[name] = np.array(
+            [evaluate_transit(capacity_callback, self.graph, u)
+             for u in self.graph.nodes], dtype=np.int64)
+
+    def create_optimizer(self):
+        """Return an :class:`ORTaskOptimizer` using the maintained matrices"""
+        from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+
+        optimizer = ORTaskOptimizer()
+        optimizer.graph = self.graph
+        for dim_name, dim_args in self.dimensions.items():
+            optimizer.add_dimension(dim_name, **dim_args)
+        for cap_name, cap_args in self.capacities.items():
+            optimizer.add_capacity(cap_name, **cap_args)
+        optimizer.matrices = dict(self.matrices)
+        return optimizer
+
+    def snapshot(self) -> "ProblemSnapshot":
+        """Return an immutable copy of the current problem"""
+        return ProblemSnapshot(self.dag, self.dimensions, self.capacities,
+                               self.constraints)
+
+    def add_constraint(self, u: Any, v: Any) -> None:
+        if u in (self.start, self.end) or v in (self.start, self.end):
+            return
+        if self.kw_args_callback is None:
+            self._constraints[u, v] = mamogenx.TaskConstraint(u, v)
+            return
+        kw_args = self.kw_args_callback(u, v)
+        if kw_args is not None:
+            self._constraints[u, v] = mamogenx.TaskConstraint(u, v, **kw_args)
+
+    def update_arcs(self, u: Any, v: Any) -> None:
+        """Set the problem graph arcs between u and v from their order"""
+        ordered = v in self.descendants[u] or u in self.descendants[v]
+        for a, b in ((u, v), (v, u)):
+            if self.dag.has_edge(a, b):
+                self.graph.add_edge(a, b, **self.dag.edges[a, b])
+            elif not ordered:
+                self.graph.add_edge(a, b)
+            elif self.graph.has_edge(a, b):
+                self.graph.remove_edge(a, b)
+
+    def add_precedence(self, u: Any, v: Any, **edge_args) -> None:
+        """Add the dag edge u -> v, raises ValueError if it closes a cycle"""
+        if u == v or u in self.descendants[v]:
+            raise ValueError(f"Precedence {u} -> {v} closes a cycle")
+        self.dag.add_edge(u, v, **edge_args)
+
+        before = self.ancestors[u] | {u}
+        after = self.descendants[v] | {v}
+        ordered = [(a, d) for a in before for d in after
+                   if d not in self.descendants[a]]
+        for a in before:
+            self.descendants[a] |= after
+        for d in after:
+            self.ancestors[d] |= before
+
+        for a, d in ordered:
+            self.update_arcs(a, d)
+            self.add_constraint(a, d)
+        self.update_arcs(u, v)
+
+    def remove_precedence(self, u: Any, v: Any) -> None:
+        """Remove the dag edge u -> v"""
+        self.dag.remove_edge(u, v)
+
+        before = self.ancestors[u] | {u}
+        after = self.descendants[v] | {v}
+        # successors outside of before and predecessors outside of after
+        # keep their reachability, update in topological order from there
+        for a in reversed(list(nx.topological_sort(self.dag.subgraph(before)))):
+            self.descendants[a] = set().union(
+                *({w} | self.descendants[w] for w in self.dag.successors(a)))
+        for d in nx.topological_sort(self.dag.subgraph(after)):
+            self.ancestors[d] = set().union(
+                *({p} | self.ancestors[p] for p in self.dag.predecessors(d)))
+
+        for a in before:
+            for d in after - self.descendants[a]:
+                self.update_arcs(a, d)
+                self._constraints.pop((a, d), None)
+        self.update_arcs(u, v)
+
+    def insert_before_end(self, G: nx.DiGraph, node: Any, **node_args) -> None:
+        """Add node to G with the end node moved behind it"""
+        end = self.end
+        end_args = G.nodes[end]
+        in_edges = list(G.in_edges(end, data=True))
+        out_edges = list(G.out_edges(end, data=True))
+        G.remove_node(end)
+        G.add_node(node, **node_args)
+        G.add_node(end, **end_args)
+        G.add_edges_from(in_edges + out_edges)
+
+    def add_task(self, node: Any, predecessors=(), successors=(), **node_args) -> None:
+        """Add a task after its predecessors and before its successors.
+
+        Start and end are used if empty, see :func:`mamogenx.G_add_task`.
+        """
+        predecessors = list(predecessors) or [self.start]
+        successors = list(successors) or [self.end]
+        if "location" in node_args:
+            node_args["location"].G = self.graph
+
+        self.insert_before_end(self.dag, node, **node_args)
+        self.insert_before_end(self.graph, node, **node_args)
+        self.descendants[node] = set()
+        self.ancestors[node] = set()
+        for n in self.graph.nodes:
+            if n != node:
+                self.update_arcs(node, n)
+
+        self.index = {n: i for i, n in enumerate(self.graph.nodes)}
+        position = self.index[node]
+        for name, matrix in self.matrices.items():
+            if name in self.capacities:
+                self.matrices[name] = np.insert(matrix, position, 0)
+            else:
+                matrix = np.insert(matrix, position, 0, axis=0)
+                self.matrices[name] = np.insert(matrix, position, 0, axis=1)
+        self.update_transits(node)
+
+        for u in predecessors:
+            self.add_precedence(u, node)
+        for v in successors:
+            self.add_precedence(node, v)
+
+    def remove_task(self, node: Any, keep_order=True) -> None:
+        """Remove a task from the problem.
+
+        If keep_order, its predecessors are connected to its successors
+        unless they are ordered by another path, so the order of the other
+        tasks does not change.
+        """
+        predecessors = list(self.dag.predecessors(node))
+        successors = list(self.dag.successors(node))
+        if keep_order:
+            for u in predecessors:
+                for v in successors:
+                    others = (w for w in self.dag.successors(u) if w != node)
+                    if not any(w == v or v in self.descendants[w]
+                               for w in others):
+                        self.add_precedence(u, v)
+        else:
+            for u in predecessors:
+                self.remove_precedence(u, node)
+            for v in successors:
+                self.remove_precedence(node, v)
+
+        for a in self.ancestors.pop(node):
+            self.descendants[a].discard(node)
+            self._constraints.pop((a, node), None)
+        for d in self.descendants.pop(node):
+            self.ancestors[d].discard(node)
+            self._constraints.pop((node, d), None)
+        self.dag.remove_node(node)
+        self.graph.remove_node(node)
+
+        position = self.index[node]
+        for name, matrix in self.matrices.items():
+            if name in self.capacities:
+                self.matrices[name] = np.delete(matrix, position)
+            else:
+                matrix = np.delete(matrix, position, axis=0)
+                self.matrices[name] = np.delete(matrix, position, axis=1)
+        self.index = {n: i for i, n in enumerate(self.graph.nodes)}
+
+    def set_task(self, node: Any, **node_args) -> None:
+        """Change the attributes of a task, e.g. its location"""
+        if "location" in node_args:
+            node_args["location"].G = self.graph
+        self.dag.nodes[node].update(node_args)
+        self.graph.nodes[node].update(node_args)
+        self.update_transits(node)
+
+    def update_transits(self, node: Any) -> None:
+        """Evaluate the matrix row and column and the vector entry of node"""
+        nodes = list(self.graph.nodes)
+        i = self.index[node]
+        for name, dim_args in self.dimensions.items():
+            cost_callback = dim_args["cost_callback"]
+            matrix = self.matrices[name]
+            matrix[i, :] = [evaluate_transit(cost_callback, self.graph, node, v)
+                            for v in nodes]
+            matrix[:, i] = [evaluate_transit(cost_callback, self.graph, u, node)
+                            for u in nodes]
+        for name, cap_args in self.capacities.items():
+            self.matrices[name][i] = evaluate_transit(
+                cap_args["capacity_callback"], self.graph, node)
+
+
+_MISSING = object()
+
+
+def node_bits(indices: np.ndarray, width: int) -> np.ndarray:
+    """Return the packed bitset of the given node indices"""
+    bits = np.zeros(width, dtype=np.uint8)
+    np.bitwise_or.at(bits, indices >> 3,
+                     np.left_shift(1, indices & 7).astype(np.uint8))
+    return bits
+
+
+class CompactNodeView():
+    """Nodes of a :class:`CompactProblem`, like the networkx NodeView"""
+
+    def __init__(self, problem: "CompactProblem") -> None:
+        self.problem = problem
+
+    def __iter__(self):
+        return iter(self.problem.node_ids)
+
+    def __len__(self):
+        return len(self.problem.node_ids)
+
+    def __contains__(self, node):
+        return node in self.problem.index
+
+    def __getitem__(self, node) -> dict:
+        i = self.problem.index[node]
+        data = {}
+        for name, values in self.problem.attributes.items():
+            value = values[i]
+            if value is not _MISSING:
+                data[name] = value.item() if isinstance(value, np.generic) else value
+        return data
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self)
+        return ((n, self[n]) for n in self)
+
+
+class CompactEdgeView():
+    """Allowed arcs of a :class:`CompactProblem`, like the networkx OutEdgeView"""
+
+    def __init__(self, problem: "CompactProblem") -> None:
+        self.problem = problem
+
+    def __iter__(self):
+        node_ids = self.problem.node_ids
+        for i in range(len(node_ids)):
+            for j in self.problem.successor_indices(i):
+                yield node_ids[i], node_ids[j]
+
+    def __len__(self):
+        return self.problem.num_arcs()
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self)
+        return ((u, v, {}) for u, v in self)
+
+
+class CompactProblem():
+    """Problem graph of a task dag in arrays instead of a networkx graph.
+
+    Row i of the descendant (ancestor) bitsets has bit j set if node j is a
+    descendant (ancestor) of node i, the dag edges are CSR arrays in both
+    directions. The allowed arcs of :func:`mamogenx.G_problem_from_dag`, the
+    dag edges and both directions between unordered nodes, are derived from
+    them on demand, so the problem takes O(N^2/8 + E) bytes instead of a dict
+    per arc. Node attributes are one array per attribute, numbers in numeric
+    arrays. Edge attributes are not kept.
+
+    The part of the networkx DiGraph interface used by the optimizers and
+    the node and edge callbacks is implemented, :meth:`to_networkx` returns
+    the problem graph.
+    """
+
+    def __init__(self, dag: nx.DiGraph) -> None:
+        self.node_ids = list(dag.nodes)
+        self.index = {n: i for i, n in enumerate(self.node_ids)}
+        num_nodes = len(self.node_ids)
+        self.width = (num_nodes + 7) // 8
+
+        self.attributes = {}
+        names = dict.fromkeys(name for _, data in dag.nodes(data=True)
+                              for name in data)
+        for name in names:
+            values = [data.get(name, _MISSING) for _, data in dag.nodes(data=True)]
+            if all(isinstance(v, (int, float, np.number)) for v in values):
+                array = np.asarray(values)
+            else:
+                array = np.empty(num_nodes, dtype=object)
+                array[:] = values
+            self.attributes[name] = array
+        for location in self.attributes.get("location", []):
+            if location is not _MISSING and location is not None:
+                location.G = self
+
+        edges = np.array([(self.index[u], self.index[v]) for u, v in dag.edges],
+                         dtype=np.int64).reshape(-1, 2)
+        self.indptr, self.indices = self.csr(edges[:, 0], edges[:, 1])
+        self.pred_indptr, self.pred_indices = self.csr(edges[:, 1], edges[:, 0])
+
+        order = [self.index[n] for n in nx.topological_sort(dag)]
+        self.descendant_bits = self.closure_bits(
+            reversed(order), self.indptr, self.indices)
+        self.ancestor_bits = self.closure_bits(
+            order, self.pred_indptr, self.pred_indices)
+
+    def csr(self, tails: np.ndarray, heads: np.ndarray):
+        """Return the CSR arrays (indptr, indices) of the arcs tails -> heads"""
+        order = np.lexsort((heads, tails))
+        indptr = np.zeros(len(self.node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=len(self.node_ids)),
+                  out=indptr[1:])
+        return indptr, heads[order]
+
+    def closure_bits(self, order, indptr: np.ndarray, indices: np.ndarray):
+        """Return the bitsets of the nodes reachable along the CSR arcs.
+
+        The nodes are visited in order, so the neighbours come first.
+        """
+        bits = np.zeros((len(self.node_ids), self.width), dtype=np.uint8)
+        for i in order:
+            neighbours = indices[indptr[i]:indptr[i + 1]]
+            if len(neighbours) > 0:
+                bits[i] = (np.bitwise_or.reduce(bits[neighbours], axis=0)
+                           | node_bits(neighbours, self.width))
+        return bits
+
+    @property
+    def nodes(self) -> CompactNodeView:
+        return CompactNodeView(self)
+
+    @property
+    def edges(self) -> CompactEdgeView:
+        return CompactEdgeView(self)
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return iter(self.node_ids)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def __getitem__(self, node) -> dict:
+        return {v: {} for v in self.successors(node)}
+
+    def is_directed(self) -> bool:
+        return True
+
+    def is_ordered(self, i: int, j: int) -> bool:
+        """Return if node index j is a descendant of node index i"""
+        return bool(self.descendant_bits[i, j >> 3] >> (j & 7) & 1)
+
+    def unordered_mask(self, i: int) -> np.ndarray:
+        """Return the mask of the nodes neither before nor after node index i"""
+        bits = ~(self.descendant_bits[i] | self.ancestor_bits[i])
+        mask = np.unpackbits(bits, count=len(self.node_ids),
+                             bitorder="little").astype(bool)
+        mask[i] = False
+        return mask
+
+    def successor_indices(self, i: int) -> np.ndarray:
+        mask = self.unordered_mask(i)
+        mask[self.indices[self.indptr[i]:self.indptr[i + 1]]] = True
+        return np.flatnonzero(mask)
+
+    def predecessor_indices(self, i: int) -> np.ndarray:
+        mask = self.unordered_mask(i)
+        mask[self.pred_indices[self.pred_indptr[i]:self.pred_indptr[i + 1]]] = True
+        return np.flatnonzero(mask)
+
+    def successors(self, node):
+        return iter([self.node_ids[j]
+                     for j in self.successor_indices(self.index[node])])
+
+    def predecessors(self, node):
+        return iter([self.node_ids[j]
+                     for j in self.predecessor_indices(self.index[node])])
+
+    def has_edge(self, u, v) -> bool:
+        if u not in self.index or v not in self.index:
+            return False
+        i, j = self.index[u], self.index[v]
+        if i == j:
+            return False
+        if not (self.is_ordered(i, j) or self.is_ordered(j, i)):
+            return True
+        return bool(np.any(self.indices[self.indptr[i]:self.indptr[i + 1]] == j))
+
+    def num_arcs(self) -> int:
+        """Return the number of allowed arcs"""
+        ordered = np.unpackbits(self.descendant_bits | self.ancestor_bits,
+                                axis=1, count=len(self.node_ids),
+                                bitorder="little").sum()
+        num_nodes = len(self.node_ids)
+        return int(num_nodes * (num_nodes - 1) - ordered + len(self.indices))
+
+    def descendants(self, node) -> set:
+        """Return the dag descendants of node"""
+        mask = np.unpackbits(self.descendant_bits[self.index[node]],
+                             count=len(self.node_ids), bitorder="little")
+        return {self.node_ids[j] for j in np.flatnonzero(mask)}
+
+    def ancestors(self, node) -> set:
+        """Return the dag ancestors of node"""
+        mask = np.unpackbits(self.ancestor_bits[self.index[node]],
+                             count=len(self.node_ids), bitorder="little")
+        return {self.node_ids[j] for j in np.flatnonzero(mask)}
+
+    def nbytes(self) -> int:
+        """Return the size of the arrays in bytes (references for objects)"""
+        arrays = [self.indptr, self.indices, self.pred_indptr,
+                  self.pred_indices, self.descendant_bits, self.ancestor_bits]
+        arrays += list(self.attributes.values())
+        return sum(a.nbytes for a in arrays)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Return the problem graph as networkx DiGraph.
+
+        Same nodes and arcs as :func:`mamogenx.G_problem_from_dag`, the
+        locations stay bound to the compact problem.
+        """
+        G = nx.DiGraph()
+        G.add_nodes_from(self.nodes(data=True))
+        G.add_edges_from(self.edges)
+        return G
+
+
+class ProblemSnapshot():
+    """Immutable, self-contained problem of a task dag.
+
+    The task dag is copied with a copy of every location, the copies are
+    bound to the problem graph of the snapshot and to a
+    :class:`LocationContext` of their own, so distances are cached per
+    snapshot. Base graphs of graph locations are shared read-only. The
+    caller's dag and locations are not touched and the frozen graphs can't
+    be changed, so snapshots can be built and solved concurrently.
+    """
+
+    def __init__(self, dag: nx.DiGraph, dimensions: dict = None,
+                 capacities: dict = None, constraints=()) -> None:
+        self.context = LocationContext()
+        self.dag = nx.DiGraph()
+        for node, node_args in dag.nodes(data=True):
+            node_args = dict(node_args)
+            if node_args.get("location") is not None:
+                location = copy.copy(node_args["location"])
+                location.context = self.context
+                node_args["location"] = location
+            self.dag.add_node(node, **node_args)
+        self.dag.add_edges_from((u, v, dict(d)) for u, v, d in dag.edges(data=True))
+
+        # binds the location copies to the problem graph
+        self.graph = nx.freeze(mamogenx.G_problem_from_dag(self.dag))
+        nx.freeze(self.dag)
+
+        self.dimensions = dict(dimensions or {})
+        self.capacities = dict(capacities or {})
+        self.constraints = tuple(constraints)
+
+    def create_optimizer(self, impl=None, **kw_args):
+        """Return a new :class:`TaskOptimizer` for the snapshot"""
+        from mamoge.taskplanner.optimize import TaskOptimizer
+
+        optimizer = TaskOptimizer(impl, **kw_args)
+        optimizer.set_graph(self.graph)
+        for dim_name, dim_args in self.dimensions.items():
+            optimizer.add_dimension(dim_name, **dim_args)
+        for cap_name, cap_args in self.capacities.items():
+            optimizer.add_capacity(cap_name, **cap_args)
+        return optimizer
+
+    def solve(self, time=30, **kw_args):
+        """Solve the snapshot with a new optimizer, see :meth:`create_optimizer`"""
+        return self.create_optimizer(**kw_args).solve(time, list(self.constraints))
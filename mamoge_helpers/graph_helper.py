@@ -1,5 +1,7 @@
 import networkx as nx
+import numpy as np
 import mamoge.taskplanner.nx as mamogenx
+from mamoge.taskplanner.location import CartesianLocation, NXLayerLocation
 
 
 def example_graph_1():
@@ -44,3 +46,120 @@ def example_graph_2():
     G.add_edge(8, 13, distance=mamogenx.G_distance_manhatten(G, 8, 13))
 
     return G
+
+
+def example_graph_cartesian(num_tasks=20, seed=0, size=1000, precedence=0.3):
+    '''task dag with cartesian locations, start node 0, end node num_tasks+1
+    and random precedences between the tasks'''
+    rng = np.random.default_rng(seed)
+
+    G = nx.DiGraph()
+    G.add_node(0, name="start", layer=0, location=CartesianLocation(0, 0))
+
+    for i in range(1, num_tasks + 1):
+        x, y = rng.integers(0, size, 2)
+        G.add_node(i, name=f"task_{i}", layer=1,
+                   location=CartesianLocation(int(x), int(y)))
+        G.add_edge(0, i)
+
+    for i in range(1, num_tasks + 1):
+        if i > 5 and rng.random() < precedence:
+            u = int(rng.integers(1, i - 3))
+            G.add_edge(u, i)
+            G.nodes[i]["layer"] = G.nodes[u]["layer"] + 1
+
+    end = num_tasks + 1
+    G.add_node(end, name="end",
+               layer=max(l for _, l in G.nodes(data="layer")) + 1,
+               location=CartesianLocation(0, 0))
+    [G.add_edge(i, end) for i in range(1, num_tasks + 1)
+     if G.out_degree(i) == 0]
+
+    return G
+
+
+def example_graph_colocated(num_tasks=60, num_sites=12, seed=0, size=100,
+                            precedence=0.3):
+    '''example_graph_cartesian with the tasks spread over num_sites shared
+    locations'''
+    G = example_graph_cartesian(num_tasks, seed, size, precedence)
+    rng = np.random.default_rng(seed + 1)
+    sites = rng.integers(0, size, (num_sites, 2))
+    for i in range(1, num_tasks + 1):
+        x, y = sites[rng.integers(num_sites)]
+        G.nodes[i]["location"] = CartesianLocation(int(x), int(y))
+    return G
+
+
+def example_graph_layered(num_layers=10, width=8, seed=0, size=100):
+    '''task dag with cartesian locations and `width` tasks per layer, each
+    task depends on one or two tasks of the previous layer. Start node 0,
+    end node num_layers*width+1 behind the last layer, the layers move along
+    the x axis'''
+    rng = np.random.default_rng(seed)
+
+    G = nx.DiGraph()
+    G.add_node(0, name="start", layer=0, location=CartesianLocation(0, 0))
+
+    previous = [0]
+    for layer in range(1, num_layers + 1):
+        current = list(range(len(G), len(G) + width))
+        for i in current:
+            x = (layer - 1) * size + int(rng.integers(0, size))
+            y = int(rng.integers(0, size))
+            G.add_node(i, name=f"task_{i}", layer=layer,
+                       location=CartesianLocation(x, y))
+            num_pred = min(len(previous), int(rng.integers(1, 3)))
+            for u in rng.choice(previous, num_pred, replace=False):
+                G.add_edge(int(u), i)
+        previous = current
+
+    end = len(G)
+    G.add_node(end, name="end", layer=num_layers + 1,
+               location=CartesianLocation(num_layers * size, size // 2))
+    [G.add_edge(i, end) for i in range(1, end) if G.out_degree(i) == 0]
+
+    return G
+
+
+def example_road_graph(grid=5, spacing=100):
+    '''grid road map with grid x grid crossings named by their node id and
+    cartesian locations, the edges have a length'''
+    G = nx.grid_2d_graph(grid, grid)
+    G = nx.convert_node_labels_to_integers(G, label_attribute="xy")
+    for n, (x, y) in G.nodes(data="xy"):
+        G.nodes[n]["name"] = f"{n}"
+        G.nodes[n]["location"] = CartesianLocation(x * spacing, y * spacing)
+    for u, v in G.edges:
+        G.edges[u, v]["length"] = spacing
+    return G
+
+
+def example_graph_road(G_base, num_tasks=10, seed=0, precedence=0.3):
+    '''task dag with NXLayerLocation at random crossings of a road map
+    (see example_road_graph), start and end at crossing 0'''
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+
+    def add_task(i, base_id, **node_args):
+        G.add_node(i, location=NXLayerLocation(layer_id=i, base_id=base_id,
+                                               G_layer=G, G_base=G_base,
+                                               name=f"{base_id}"),
+                   **node_args)
+
+    add_task(0, 0, name="start", layer=0)
+    for i in range(1, num_tasks + 1):
+        add_task(i, int(rng.integers(len(G_base))), name=f"task_{i}", layer=1)
+        G.add_edge(0, i)
+    for i in range(1, num_tasks + 1):
+        if i > 3 and rng.random() < precedence:
+            u = int(rng.integers(1, i - 1))
+            G.add_edge(u, i)
+            G.nodes[i]["layer"] = G.nodes[u]["layer"] + 1
+
+    end = num_tasks + 1
+    add_task(end, 0, name="end",
+             layer=max(l for _, l in G.nodes(data="layer")) + 1)
+    [G.add_edge(i, end) for i in range(1, num_tasks + 1)
+     if G.out_degree(i) == 0]
+    return G
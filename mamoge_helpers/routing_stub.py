@@ -0,0 +1,106 @@
+'''local stand-in for the table service of an OSRM style routing server'''
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class TableRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.num_requests += 1
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+        try:
+            if stub.delay:
+                time.sleep(stub.delay)
+            status, response = stub.table_response(self.path)
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.stub.lock:
+            self.server.stub.num_connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RoutingStubServer():
+    '''serve /table/v1/<profile>/<coordinates> with euclidean distances
+    (durations at speed 1) on a free local port, counting requests,
+    connections and concurrent requests. Pairs in unreachable give null.
+
+    with RoutingStubServer() as server:
+        provider = OSRMDistanceProvider(server.url)
+    '''
+
+    def __init__(self, profiles=("driving",), delay=0, unreachable=()):
+        self.profiles = profiles
+        self.delay = delay
+        self.unreachable = {tuple(map(tuple, pair)) for pair in unreachable}
+        self.lock = threading.Lock()
+        self.num_requests = 0
+        self.num_connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.httpd = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def table_response(self, path):
+        parts = urlsplit(path)
+        segments = parts.path.strip("/").split("/")
+        if len(segments) != 4 or segments[:2] != ["table", "v1"]:
+            return 400, dict(code="InvalidUrl", message=parts.path)
+        if segments[2] not in self.profiles:
+            return 400, dict(code="InvalidOptions",
+                             message=f"unknown profile {segments[2]}")
+
+        coordinates = [tuple(float(v) for v in c.split(","))
+                       for c in segments[3].split(";")]
+        query = parse_qs(parts.query)
+        all_indices = ";".join(str(i) for i in range(len(coordinates)))
+        sources = [coordinates[int(i)] for i in
+                   query.get("sources", [all_indices])[0].split(";")]
+        destinations = [coordinates[int(i)] for i in
+                        query.get("destinations", [all_indices])[0].split(";")]
+
+        table = [[None if (s, d) in self.unreachable else math.dist(s, d)
+                  for d in destinations] for s in sources]
+        annotations = query.get("annotations", ["duration"])[0].split(",")
+        return 200, dict(code="Ok", **{f"{a}s": table for a in annotations})
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), TableRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,216 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.aco_numpy import (ACOEngine, ACOWorkerPool,
+                                                  NumpyACOTaskOptimizer,
+                                                  candidate_lists,
+                                                  construct_tours,
+                                                  pheromone_update)
+from mamoge.taskplanner.problem import CompactProblem
+# %%
+
+
+def test_aco_engine_line():
+    # nodes on a line, the shortest open path visits them in order
+    positions = np.array([0, 3, 1, 4, 2, 5], dtype=float)
+    cost_matrix = np.abs(positions[:, None] - positions[None, :])
+
+    engine = ACOEngine(cost_matrix, start=0, end=5, seed=0)
+    tour, cost = engine.run(time=5, num_ants=50, limit=30)
+
+    assert list(tour) == [0, 2, 4, 1, 3, 5]
+    assert cost == 5
+    assert engine.iterations == 30
+
+
+def test_aco_engine_limit():
+    cost_matrix = np.random.default_rng(0).random((6, 6))
+    engine = ACOEngine(cost_matrix, start=0, end=5, seed=0)
+
+    with pytest.raises(ValueError):
+        engine.run(time=1, num_ants=10, limit=0)
+
+
+def test_aco_engine_batch():
+    cost_matrix = np.random.default_rng(0).random((12, 12))
+    engine = ACOEngine(cost_matrix, seed=0)
+
+    tours, costs = engine.construct(64)
+
+    assert tours.shape == (64, 12)
+    assert all(sorted(tour) == list(range(12)) for tour in tours)
+    assert np.all(tours[:, 0] == 0) and np.all(tours[:, -1] == 11)
+    assert np.allclose(costs, [cost_matrix[t[:-1], t[1:]].sum() for t in tours])
+
+
+def test_numpy_aco_optimizer():
+    G = graph_helper.example_graph_cartesian(20, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = NumpyACOTaskOptimizer(num_ants=50, limit=20, seed=0)
+    optimizer.set_graph(Gn)
+    path = optimizer.solve(time=5)[0][0]
+
+    assert sorted(path) == list(range(22))
+    assert path[0] == 0 and path[-1] == 21
+    assert all(Gn.has_edge(u, v) for u, v in zip(path[:-1], path[1:]))
+    assert optimizer.stats["iterations"] == 20
+
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+
+
+def test_numpy_aco_relabeled_graph():
+    G = graph_helper.example_graph_cartesian(10, size=100)
+    results = []
+    for graph in (G, nx.relabel_nodes(G, {n: n + 100 for n in G.nodes})):
+        optimizer = NumpyACOTaskOptimizer(num_ants=50, limit=20, seed=0)
+        optimizer.set_graph(mamogenx.G_problem_from_dag(graph))
+        results.append(optimizer.solve(time=5))
+
+    (path,), (meta,) = results[1]
+    assert path == [n + 100 for n in results[0][0][0]]
+    assert path[0] == 100 and path[-1] == 111
+    assert list(meta) == path
+    # distances are rounded per arc
+    assert meta[111]["distance"]["cumul"] == pytest.approx(
+        optimizer.stats["cost"], abs=len(path))
+
+
+def test_construct_tours_precedence():
+    G = graph_helper.example_graph_cartesian(30, precedence=0.5)
+    Gn = mamogenx.G_problem_from_dag(G)
+    nodes = list(range(len(Gn)))
+    cost_matrix = mamogenx.G_distance_matrix(Gn)
+    allowed = nx.to_numpy_array(Gn, nodelist=nodes, weight=None) > 0
+    successors = nx.to_numpy_array(G, nodelist=nodes, weight=None) > 0
+
+    for candidates in [None, candidate_lists(cost_matrix, 5)]:
+        tours, costs = construct_tours(np.where(allowed, 1.0, 0), cost_matrix,
+                                       allowed, 0, 31, 100,
+                                       np.random.default_rng(0),
+                                       successors=successors,
+                                       candidates=candidates)
+
+        assert np.all(np.isfinite(costs))
+        for tour in tours:
+            assert sorted(tour) == nodes
+            position = {n: i for i, n in enumerate(tour)}
+            assert all(position[u] < position[v] for u, v in G.edges)
+
+
+def test_candidate_lists():
+    cost_matrix = np.random.default_rng(0).random((30, 30))
+    cost_matrix[:, 3] = np.inf
+
+    candidates = candidate_lists(cost_matrix, 5)
+
+    assert candidates.shape == (30, 5)
+    for i, row in enumerate(candidates):
+        expected = [j for j in np.argsort(cost_matrix[i]) if j != i][:5]
+        assert list(row) == expected
+
+
+def test_aco_engine_candidates():
+    positions = np.arange(40, dtype=float)
+    cost_matrix = np.abs(positions[:, None] - positions[None, :])
+
+    engine = ACOEngine(cost_matrix, start=0, end=39, seed=0, num_candidates=4)
+    tour, cost = engine.run(time=5, num_ants=20, limit=20)
+
+    assert engine.candidates.shape == (40, 4)
+    assert list(tour) == list(range(40))
+
+
+def test_aco_worker_pool():
+    cost_matrix = np.random.default_rng(0).random((12, 12))
+    weights = 1 / cost_matrix
+
+    with ACOWorkerPool(12, num_processes=2) as pool:
+        pool.set_matrix("cost_matrix", cost_matrix)
+        pool.set_matrix("allowed", np.ones((12, 12), dtype=bool))
+        pool.set_matrix("weights", weights)
+        tours, costs = pool.construct(30, 0, 11, np.random.default_rng(0))
+
+    assert tours.shape == (30, 12)
+    assert all(sorted(tour) == list(range(12)) for tour in tours)
+    assert np.allclose(costs, [cost_matrix[t[:-1], t[1:]].sum() for t in tours])
+
+
+def test_aco_engine_processes():
+    positions = np.array([0, 3, 1, 4, 2, 5], dtype=float)
+    cost_matrix = np.abs(positions[:, None] - positions[None, :])
+
+    engine = ACOEngine(cost_matrix, start=0, end=5, seed=0, num_processes=2,
+                       num_candidates=3)
+    tour, cost = engine.run(time=5, num_ants=50, limit=30)
+
+    assert list(tour) == [0, 2, 4, 1, 3, 5]
+    assert engine.pool is None
+
+
+def test_pheromone_update():
+    rng = np.random.default_rng(0)
+    pheromone = rng.random((8, 8))
+    tours = [rng.permutation(8) for _ in range(4)]
+    costs = rng.random(4) + 1
+
+    expected = 0.7 * pheromone
+    for tour, cost in zip(tours, costs):
+        for u, v in zip(tour[:-1], tour[1:]):
+            expected[u, v] += 2 / cost
+
+    result = pheromone_update(pheromone.copy(), np.array(tours), costs, 0.3, 2)
+    assert np.allclose(result, expected)
+
+    result = pheromone_update(pheromone.copy(), [t[:5] for t in tours], costs,
+                              0.3, 2)
+    assert result.sum() < expected.sum()
+
+    bounded = pheromone_update(pheromone.copy(), tours, costs, 0.3, 2,
+                               tau_min=0.2, tau_max=1)
+    assert bounded.min() >= 0.2 and bounded.max() <= 1
+
+
+def test_aco_engine_mmas():
+    cost_matrix = np.random.default_rng(0).random((15, 15)) + 0.1
+    engine = ACOEngine(cost_matrix, seed=0, mmas=True)
+    engine.run(time=5, num_ants=20, limit=20)
+
+    tau_min, tau_max = engine.pheromone_bounds()
+    assert engine.pheromone.min() >= tau_min
+    assert engine.pheromone.max() <= tau_max + 1e-12
+
+
+def test_aco_task_optimizer_pool():
+    pytest.importorskip("acopy")
+    from mamoge.taskplanner.optimize.aco import ACOTaskOptimizer
+
+    G = graph_helper.example_graph_cartesian(8, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    # the ant tours are built in the ACOWorkerPool of VebasMPSolver
+    optimizer = ACOTaskOptimizer()
+    optimizer.set_graph(Gn)
+    result = optimizer.solve(time=5)
+    tour = list(result[0])
+
+    assert tour[0] == 0
+    assert sorted(tour) == list(range(len(Gn)))
+
+
+def test_numpy_aco_compact_problem():
+    G = graph_helper.example_graph_cartesian(20, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = NumpyACOTaskOptimizer(num_ants=50, limit=20, seed=0)
+    optimizer.set_graph(CompactProblem(G))
+    path = optimizer.solve(time=5)[0][0]
+
+    assert sorted(path) == list(range(22))
+    assert path[0] == 0 and path[-1] == 21
+    assert all(Gn.has_edge(u, v) for u, v in zip(path[:-1], path[1:]))
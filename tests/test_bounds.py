@@ -0,0 +1,63 @@
+import numpy as np
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.bounds import (assignment_bound,
+                                                lower_bound, min_arc_bound,
+                                                one_tree_bound)
+from mamoge.taskplanner.optimize.exact import DPTaskOptimizer, held_karp
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def test_bounds_below_optimum():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = rng.integers(4, 10)
+        points = rng.random((n, 2)) * 100
+        cost_matrix = np.linalg.norm(points[:, None] - points[None], axis=2)
+        cost_matrix[rng.random((n, n)) < 0.2] = np.inf
+        np.fill_diagonal(cost_matrix, np.inf)
+
+        _, optimum = held_karp(cost_matrix)
+        for bound in [min_arc_bound(cost_matrix),
+                      assignment_bound(cost_matrix),
+                      one_tree_bound(cost_matrix)]:
+            assert bound is None or bound <= optimum + 1e-6
+
+
+def test_lower_bound_penalty():
+    cost_matrix = np.full((5, 5), 1000.0)
+    # dropping all tasks is cheaper than any path visiting them
+    assert lower_bound(cost_matrix, penalty=10) <= 1000 + 3 * 10 + 1e-6
+    assert lower_bound(cost_matrix) >= 4000 - 1e-6
+
+
+def test_gap_limit():
+    G = graph_helper.example_graph_cartesian(12, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    exact = DPTaskOptimizer()
+    exact.graph = Gn
+    exact.add_dimension("time", time_callback)
+    exact.solve()
+
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+    optimizer.gap_limit = 0.2
+    results, _ = optimizer.solve(30)
+
+    stats = optimizer.stats
+    assert len(results) == 1
+    assert stats["stopped_early"]
+    assert stats["solve_time"] < 10
+    assert stats["lower_bound"] <= exact.stats["cost"] + 1e-6
+    assert stats["gap"] <= 0.2
+    assert np.isclose(stats["gap"], (stats["objective"] - stats["lower_bound"])
+                      / stats["objective"])
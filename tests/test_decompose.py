@@ -0,0 +1,197 @@
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.decompose import DecompositionTaskOptimizer
+from mamoge.taskplanner.problem import CompactProblem
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def test_dag_from_problem():
+    G = graph_helper.example_graph_cartesian(15)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    dag = mamogenx.G_dag_from_problem(Gn)
+
+    assert set(dag.edges) == set(G.edges)
+
+
+def test_spatial_clusters_respect_precedence():
+    G = graph_helper.example_graph_cartesian(60)
+    tasks = list(G.nodes)[1:-1]
+
+    clusters = mamogenx.G_spatial_clusters(G, tasks, 4)
+
+    assert sorted(n for c in clusters for n in c) == sorted(tasks)
+
+    cluster_of = {n: i for i, c in enumerate(clusters) for n in c}
+    position = {n: i for i, n in enumerate(n for c in clusters for n in c)}
+    for u, v in G.subgraph(tasks).edges:
+        assert cluster_of[u] <= cluster_of[v]
+        assert position[u] < position[v]
+
+
+def test_decomposition_solver():
+    G = graph_helper.example_graph_cartesian(30, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = DecompositionTaskOptimizer(cluster_size=10)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+
+    result, meta = optimizer.solve(max_time=1)
+    path = result[0]
+
+    assert optimizer.stats["num_clusters"] == 3
+    assert path[0] == 0 and path[-1] == 31
+    assert sorted(path) == list(range(32))
+
+    clusters = mamogenx.G_spatial_clusters(G, list(G.nodes)[1:-1], 3)
+    cluster_of = {n: i for i, c in enumerate(clusters) for n in c}
+    position = {n: i for i, n in enumerate(path)}
+    for u, v in G.subgraph(cluster_of).edges:
+        if cluster_of[u] < cluster_of[v]:
+            assert position[u] < position[v]
+    assert meta[0][31]["time"]["cumul"] == optimizer.stats["cost"]
+
+
+def test_decomposition_stitched_capacity():
+    G = graph_helper.example_graph_cartesian(30, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = DecompositionTaskOptimizer(cluster_size=10, max_workers=1,
+                                           exact_threshold=0)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+    # each cluster fits, the stitched route does not
+    optimizer.add_capacity(
+        "tasks", lambda G, u: int(G.nodes[u]["name"].startswith("task")),
+        capacity=20)
+
+    result, meta = optimizer.solve(max_time=2)
+    path = result[0]
+
+    assert optimizer.stats["num_clusters"] == 3
+    assert optimizer.stats["stitched_feasible"] is False
+    assert path[0] == 0 and path[-1] == 31
+    assert len(path) - 2 <= 20
+    assert max(m["tasks"]["cumul"] for m in meta[0].values()) <= 20
+
+
+def test_decomposition_time_budget():
+    G = graph_helper.example_graph_cartesian(40, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = DecompositionTaskOptimizer(cluster_size=10, max_workers=1,
+                                           exact_threshold=0)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+
+    result, meta = optimizer.solve(max_time=2)
+
+    assert optimizer.stats["num_clusters"] == 4
+    assert sorted(result[0]) == list(range(42))
+    assert optimizer.stats["total_time"] < 3
+
+
+def test_layer_windows():
+    G = graph_helper.example_graph_layered(6, 4)
+    tasks = list(G.nodes)[1:-1]
+
+    windows = mamogenx.G_layer_windows(G, tasks, 2, look_ahead=1)
+
+    assert len(windows) == 3
+    assert sorted(n for w, _ in windows for n in w) == sorted(tasks)
+    window_of = {n: i for i, (w, _) in enumerate(windows) for n in w}
+    for u, v in G.subgraph(tasks).edges:
+        assert window_of[u] <= window_of[v]
+    for i, (window, look_ahead) in enumerate(windows):
+        assert {G.nodes[n]["layer"] for n in window} == {2 * i + 1, 2 * i + 2}
+        if i < len(windows) - 1:
+            assert look_ahead == windows[i + 1][0][:len(look_ahead)]
+            assert {G.nodes[n]["layer"] for n in look_ahead} == {2 * i + 3}
+        else:
+            assert look_ahead == []
+
+
+def test_layer_decomposition_solver():
+    G = graph_helper.example_graph_layered(8, 5, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+    end = len(G) - 1
+
+    for chain in [True, False]:
+        optimizer = DecompositionTaskOptimizer(mode="layer", layer_window=1,
+                                               look_ahead=1, chain=chain)
+        optimizer.graph = Gn
+        optimizer.add_dimension("time", time_callback)
+
+        result, meta = optimizer.solve(max_time=1)
+        path = result[0]
+
+        assert optimizer.stats["num_clusters"] == 8
+        assert path[0] == 0 and path[-1] == end
+        assert sorted(path) == list(range(end + 1))
+        position = {n: i for i, n in enumerate(path)}
+        for u, v in G.edges:
+            assert position[u] < position[v]
+        assert meta[0][end]["time"]["cumul"] == optimizer.stats["cost"]
+
+
+def test_chained_time_budget():
+    G = graph_helper.example_graph_layered(6, 20, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+    end = len(G) - 1
+
+    optimizer = DecompositionTaskOptimizer(mode="layer", layer_window=1,
+                                           look_ahead=1, chain=True)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+    constraints = mamogenx.G_descendent_constrains(
+        G, lambda u, v: dict(dimension="time", min=0))
+
+    result, meta = optimizer.solve(max_time=2, constraints=constraints)
+    path = result[0]
+
+    assert optimizer.stats["num_clusters"] == 6
+    assert sorted(path) == list(range(end + 1))
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+    assert optimizer.stats["total_time"] < 3
+
+
+def test_decomposition_improve():
+    G = graph_helper.example_graph_cartesian(30, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+    constraints = mamogenx.G_descendent_constrains(
+        G, lambda u, v: dict(dimension="time", min=0))
+
+    optimizer = DecompositionTaskOptimizer(cluster_size=10, improve_time=0.5)
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+
+    result, meta = optimizer.solve(max_time=2, constraints=constraints)
+    path = result[0]
+
+    assert optimizer.stats["improve_time"] > 0.3
+    assert sorted(path) == list(range(32))
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+    assert meta[0][31]["time"]["cumul"] == optimizer.stats["cost"]
+
+
+def test_decomposition_compact_problem():
+    G = graph_helper.example_graph_cartesian(30, size=100)
+
+    results = []
+    for graph in (mamogenx.G_problem_from_dag(G), CompactProblem(G)):
+        optimizer = DecompositionTaskOptimizer(cluster_size=10)
+        optimizer.graph = graph
+        optimizer.add_dimension("time", time_callback)
+        results.append(optimizer.solve(max_time=1)[0][0])
+        assert optimizer.stats["num_clusters"] == 3
+
+    assert results[0] == results[1]
+    assert sorted(results[1]) == list(range(32))
@@ -0,0 +1,78 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from mamoge_helpers import graph_helper
+from mamoge_helpers.routing_stub import RoutingStubServer
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.distance import (OSRMDistanceProvider,
+                                                  add_distance_dimension)
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+# %%
+
+
+def euclidean_matrix(G):
+    return np.array([[G.nodes[u]["location"].distance_to(G.nodes[v]["location"])
+                      for v in G.nodes] for u in G.nodes])
+
+
+def test_batched_table():
+    G = graph_helper.example_graph_cartesian(24, size=100)
+
+    with RoutingStubServer(delay=0.01) as server:
+        provider = OSRMDistanceProvider(server.url, batch_size=10,
+                                        max_connections=3)
+        matrix = provider.matrix(G)
+        num_requests = server.num_requests
+
+        # all pairs are cached
+        assert np.array_equal(provider.matrix(G), matrix)
+        assert server.num_requests == num_requests
+
+    np.testing.assert_allclose(matrix, euclidean_matrix(G))
+    # start and end share one coordinate, 25 distinct ones in 3x3 batches
+    assert num_requests == 9
+    assert provider.stats["requests"] == 9
+    assert server.num_connections <= 3
+    assert server.max_active <= 3
+
+
+def test_table_in_event_loop():
+    sources = [(0.0, 0.0), (3.0, 4.0)]
+    destinations = [(6.0, 8.0)]
+
+    with RoutingStubServer(unreachable=[((3.0, 4.0), (6.0, 8.0))]) as server:
+        provider = OSRMDistanceProvider(server.url)
+        table = asyncio.run(provider.table_async(sources, destinations))
+
+    assert table[0, 0] == pytest.approx(10)
+    assert np.isnan(table[1, 0])
+
+
+def test_table_error():
+    with RoutingStubServer() as server:
+        provider = OSRMDistanceProvider(server.url, profile="boat")
+        with pytest.raises(RuntimeError, match="InvalidOptions"):
+            provider.table([(0.0, 0.0)], [(1.0, 1.0)])
+
+
+def test_distance_dimension():
+    G = mamogenx.G_problem_from_dag(
+        graph_helper.example_graph_cartesian(10, size=100, precedence=0))
+
+    with RoutingStubServer() as server:
+        provider = OSRMDistanceProvider(server.url, batch_size=4)
+        optimizer = ORTaskOptimizer()
+        optimizer.graph = G
+        matrix = add_distance_dimension(optimizer, "time", provider, velocity=2)
+        num_requests = server.num_requests
+
+        result, meta = optimizer.solve(1)
+        assert server.num_requests == num_requests
+
+    assert optimizer.matrices["time"] is matrix
+    assert matrix[1, 2] == int(np.rint(
+        G.nodes[1]["location"].distance_to(G.nodes[2]["location"]) / 2))
+    assert sorted(result[0]) == list(range(len(G)))
@@ -0,0 +1,113 @@
+import itertools
+import time
+
+import numpy as np
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.exact import DPTaskOptimizer, held_karp
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.route import route_cost
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def brute_force(cost_matrix, predecessors):
+    n = len(cost_matrix)
+    best = np.inf
+    for order in itertools.permutations(range(1, n - 1)):
+        position = {node - 1: i for i, node in enumerate(order)}
+        if any((predecessors[v] >> u) & 1 and position[u] > position[v]
+               for u in range(n - 2) for v in range(n - 2)):
+            continue
+        path = [0, *order, n - 1]
+        best = min(best, cost_matrix[path[:-1], path[1:]].sum())
+    return best
+
+
+def test_held_karp():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = rng.integers(3, 9)
+        cost_matrix = rng.random((n, n))
+        cost_matrix[rng.random((n, n)) < 0.1] = np.inf
+        predecessors = np.zeros(n - 2, dtype=np.int64)
+        for _ in range(3):
+            if n > 3:
+                u, v = sorted(rng.choice(n - 2, 2, replace=False))
+                predecessors[v] |= 1 << u
+
+        path, cost = held_karp(cost_matrix, predecessors)
+        expected = brute_force(cost_matrix, predecessors)
+
+        if np.isinf(expected):
+            assert path is None
+        else:
+            assert np.isclose(cost, expected)
+            assert np.isclose(cost_matrix[path[:-1], path[1:]].sum(), cost)
+
+
+def test_exact_solver():
+    G = graph_helper.example_graph_cartesian(12, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = DPTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+    optimizer.add_capacity("load", lambda G, u: 1)
+
+    results, meta = optimizer.solve()
+    path = results[0]
+
+    assert sorted(path) == list(range(14))
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+    assert meta[0][path[-1]]["load"]["cumul"] == 13
+    assert meta[0][path[-1]]["time"]["cumul"] == route_cost(Gn, path,
+                                                            time_callback)
+
+    ortools = ORTaskOptimizer()
+    ortools.graph = Gn
+    ortools.add_dimension("time", time_callback)
+    or_path = ortools.solve(1)[0][0]
+    if len(or_path) == len(path):
+        assert (route_cost(Gn, path, time_callback) <=
+                route_cost(Gn, or_path, time_callback))
+
+
+def test_exact_solver_constraints():
+    G = graph_helper.example_graph_cartesian(8, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = DPTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+
+    path = optimizer.solve()[0][0]
+    u, v = path[2], path[1]
+    constraint = mamogenx.TaskConstraint(u, v, dimension="time", min=0)
+    path = optimizer.solve(constraints=[constraint])[0][0]
+    assert path.index(u) < path.index(v)
+
+    constraint = mamogenx.TaskConstraint(u, v, dimension="time", max=-10**9)
+    assert optimizer.solve(constraints=[constraint]) == ([], [])
+
+
+def test_task_optimizer_selects_exact():
+    G = graph_helper.example_graph_cartesian(10, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    taskoptimizer = TaskOptimizer()
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.add_dimension("time", time_callback)
+
+    t_start = time.perf_counter()
+    results, meta = taskoptimizer.solve(time=30)
+
+    assert time.perf_counter() - t_start < 5
+    assert sorted(results[0]) == list(range(12))
@@ -60,3 +60,22 @@ def test_extended_graph_solver():
 
     assert len(set(path).difference(
         set([0, 3, 2, 1, 4, 5, 6, 9, 8, 7, 11, 10, 12]))) == 0
+
+# %%
+
+
+def test_sparse_arc_solver():
+    G = graph_helper.example_graph_cartesian(12, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    taskoptimizer = TaskOptimizer()
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.impl.add_dimension(
+        "time", lambda G, u, v: int(mamogenx.G_time_callback(G, u, v, 1)))
+
+    results, meta = taskoptimizer.solve(time=1)
+
+    path = results[0]
+
+    assert sorted(path) == list(range(14))
+    assert all(Gn.has_edge(u, v) for u, v in zip(path[:-1], path[1:]))
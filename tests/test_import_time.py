@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+# %%
+
+HEAVY_MODULES = ["matplotlib", "ortools", "geopy", "folium", "osmnx", "acopy"]
+
+
+@pytest.mark.parametrize("module", ["mamoge.taskplanner.location",
+                                    "mamoge.taskplanner.nx",
+                                    "mamoge.taskplanner.dag",
+                                    "mamoge.taskplanner.optimize"])
+def test_core_import_is_light(module):
+    code = (f"import sys, {module}\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True).stdout.strip()
+
+    assert output == ""
+
+
+def test_optimizer_backend_import():
+    from mamoge.taskplanner.optimize import ORTaskOptimizer, TaskOptimizer
+
+    assert isinstance(TaskOptimizer().impl, ORTaskOptimizer)
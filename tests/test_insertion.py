@@ -0,0 +1,144 @@
+import networkx as nx
+import numpy as np
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+from mamoge.taskplanner.location import CartesianLocation
+
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.insertion import (cheapest_insertion,
+                                                   insertion_window)
+from mamoge.taskplanner.optimize.matrix import TransitCache
+from mamoge.taskplanner.optimize.route import (route_cost,
+                                               route_dimension_array)
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def test_add_task_matches_rebuild():
+    G = graph_helper.example_graph_cartesian(12, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+    mamogenx.G_add_task(Gn, 100, [3], [7], location=CartesianLocation(5, 5))
+
+    end = list(G.nodes)[-1]
+    H = nx.DiGraph()
+    H.add_nodes_from(n for n in G.nodes(data=True) if n[0] != end)
+    H.add_node(100, location=CartesianLocation(5, 5))
+    H.add_node(end, **G.nodes[end])
+    H.add_edges_from(G.edges)
+    H.add_edges_from([(3, 100), (100, 7)])
+    Hn = mamogenx.G_problem_from_dag(H)
+
+    assert list(Gn.nodes) == list(Hn.nodes)
+    assert set(Gn.edges) == set(Hn.edges)
+
+
+def test_insertion_window():
+    route = [0, 4, 2, 5, 3, 9]
+    assert insertion_window(route) == (0, 4)
+    assert insertion_window(route, [2], [3]) == (2, 3)
+    assert insertion_window(route, [3], [2]) == (4, 1)
+    assert insertion_window(route, [8], [7]) == (0, 4)
+
+
+def test_cheapest_insertion():
+    G = graph_helper.example_graph_cartesian(10, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    route = list(Gn.nodes)
+    mamogenx.G_add_task(Gn, 100, location=CartesianLocation(50, 50))
+
+    dimensions = dict(time=dict(cost_callback=time_callback, capacity=None))
+    transits = TransitCache(Gn, dimensions, {})
+    new_route, array = cheapest_insertion(route, 100, transits)
+
+    costs = [route_cost(Gn, route[:i + 1] + [100] + route[i + 1:],
+                        time_callback) for i in range(len(route) - 1)]
+    assert route_cost(Gn, new_route, time_callback) == min(costs)
+    expected = route_dimension_array(Gn, new_route, dimensions, {})
+    assert np.array_equal(array, expected)
+
+    # a second insertion only evaluates the arcs of the new task
+    num_evaluations = transits.num_evaluations
+    mamogenx.G_add_task(Gn, 101, location=CartesianLocation(20, 80))
+    cheapest_insertion(new_route, 101, transits)
+    num_evaluations = transits.num_evaluations - num_evaluations
+    assert num_evaluations == 2 * (len(new_route) - 1)
+
+
+def test_insertion_capacity():
+    G = graph_helper.example_graph_cartesian(10, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    route = list(Gn.nodes)
+    mamogenx.G_add_task(Gn, 100, location=CartesianLocation(50, 50))
+
+    length = route_cost(Gn, route, time_callback)
+    dimensions = dict(time=dict(cost_callback=time_callback, capacity=length))
+    transits = TransitCache(Gn, dimensions, {})
+    assert cheapest_insertion(route, 100, transits) == (None, None)
+
+    dimensions["time"]["capacity"] = None
+    transits = TransitCache(Gn, dimensions, {"load": dict(
+        capacity_callback=lambda G, u: 1, capacity=len(route) - 1)})
+    assert cheapest_insertion(route, 100, transits) == (None, None)
+
+
+def test_insert_task():
+    G = graph_helper.example_graph_cartesian(10, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    taskoptimizer = TaskOptimizer()
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.add_dimension("time", time_callback)
+    plan, _ = taskoptimizer.solve(1)
+
+    plan, meta = taskoptimizer.insert_task(plan[0], 100, [2], [],
+                                           location=CartesianLocation(50, 50))
+    route = plan[0]
+    assert sorted(route) == sorted(Gn.nodes)
+    assert route.index(2) < route.index(100)
+    assert meta[0][route[-1]]["time"]["cumul"] == route_cost(Gn, route,
+                                                             time_callback)
+
+
+def test_insert_task_capacity_ids():
+    G = graph_helper.example_graph_cartesian(10, size=100, precedence=0)
+    for n in G.nodes:
+        G.nodes[n]["load"] = int(n not in (0, 11))
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    taskoptimizer = TaskOptimizer(exact_threshold=0)
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.add_dimension("time", time_callback)
+    taskoptimizer.add_capacity("load", lambda G, u: G.nodes[u]["load"])
+    plan, _ = taskoptimizer.solve(1)
+
+    # non-contiguous id, the end node is moved behind the new task
+    plan, meta = taskoptimizer.insert_task(plan[0], 1000, load=5,
+                                           location=CartesianLocation(50, 50))
+    route = plan[0]
+    assert meta[0][route[-1]]["load"]["cumul"] == 15
+
+    plan, meta = taskoptimizer.solve(1)
+    route = plan[0]
+    assert sorted(route) == sorted(Gn.nodes)
+    assert meta[0][route[-1]]["load"]["cumul"] == 15
+
+
+def test_solve_constraints_ids():
+    G = graph_helper.example_graph_cartesian(10, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    mamogenx.G_add_task(Gn, 1000, [3], location=CartesianLocation(50, 50))
+    constraints = [mamogenx.TaskConstraint(3, 1000, "time", min=0)]
+
+    taskoptimizer = TaskOptimizer(exact_threshold=0)
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.add_dimension("time", time_callback)
+    plan, meta = taskoptimizer.solve(1, constraints)
+    route = plan[0]
+
+    assert sorted(route) == sorted(Gn.nodes)
+    assert route.index(3) < route.index(1000)
+    assert meta[0][1000]["time"]["cumul"] >= meta[0][3]["time"]["cumul"]
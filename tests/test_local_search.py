@@ -0,0 +1,138 @@
+import numpy as np
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.aco_numpy import (NumpyACOTaskOptimizer,
+                                                  candidate_lists,
+                                                  construct_tours)
+from mamoge.taskplanner.optimize.local_search import LocalSearch, RangeQuery
+# %%
+
+
+def example_problem(n=20, seed=0):
+    rng = np.random.default_rng(seed)
+    points = rng.random((n, 2))
+    cost_matrix = (np.linalg.norm(points[:, None] - points[None], axis=2)
+                   + 0.1 * rng.random((n, n)))
+    successors = np.zeros((n, n), dtype=bool)
+    for _ in range(n):
+        u, v = sorted(rng.choice(np.arange(1, n - 1), 2, replace=False))
+        successors[u, v] = True
+    allowed = ~successors.T & ~np.eye(n, dtype=bool)
+    tours, _ = construct_tours(allowed.astype(float), cost_matrix, allowed, 0,
+                               n - 1, 3, rng, successors=successors)
+    return cost_matrix, allowed, successors, tours
+
+
+def is_valid(tour, allowed, successors):
+    position = np.empty(len(tour), dtype=int)
+    position[tour] = np.arange(len(tour))
+    us, vs = np.nonzero(successors)
+    return (np.all(position[us] < position[vs]) and
+            np.all(allowed[tour[:-1], tour[1:]]))
+
+
+def test_range_query():
+    values = np.random.default_rng(0).integers(100, size=37)
+    first, last = np.triu_indices(37)
+
+    assert np.all(RangeQuery(values, np.maximum).query(first, last) ==
+                  [values[i:j + 1].max() for i, j in zip(first, last)])
+    assert np.all(RangeQuery(values, np.minimum).query(first, last) ==
+                  [values[i:j + 1].min() for i, j in zip(first, last)])
+
+
+def test_two_opt_moves():
+    cost_matrix, allowed, successors, tours = example_problem()
+    local_search = LocalSearch(cost_matrix, allowed, successors)
+    n = len(cost_matrix)
+
+    for tour in tours:
+        position = np.empty(n, dtype=int)
+        position[tour] = np.arange(n)
+        last_pred, _ = local_search.precedence_positions(tour, position)
+        delta, first, last = local_search.two_opt_moves(
+            tour, position, RangeQuery(last_pred[0]))
+
+        expected = set()
+        for i in range(1, n - 1):
+            for j in range(i + 1, n - 1):
+                moved = tour.copy()
+                moved[i:j + 1] = moved[i:j + 1][::-1]
+                if is_valid(moved, allowed, successors):
+                    expected.add((i, j))
+                    index = np.nonzero((first == i) & (last == j))[0][0]
+                    assert np.isclose(delta[index], local_search.cost(moved) -
+                                      local_search.cost(tour))
+        assert set(zip(first.tolist(), last.tolist())) == expected
+
+
+def test_or_opt_moves():
+    cost_matrix, allowed, successors, tours = example_problem()
+    local_search = LocalSearch(cost_matrix, allowed, successors)
+    n = len(cost_matrix)
+
+    for tour in tours:
+        position = np.empty(n, dtype=int)
+        position[tour] = np.arange(n)
+        last_pred, first_succ = local_search.precedence_positions(tour, position)
+        delta, first, last, after = local_search.or_opt_moves(
+            tour, position, last_pred, first_succ)
+        moves = dict(zip(zip(first.tolist(), last.tolist(), after.tolist()),
+                         delta))
+
+        expected = set()
+        for length in (1, 2, 3):
+            for i in range(1, n - length):
+                e = i + length - 1
+                for p in range(n - 1):
+                    if i - 1 <= p <= e:
+                        continue
+                    if p > e:
+                        moved = np.concatenate([tour[:i], tour[e + 1:p + 1],
+                                                tour[i:e + 1], tour[p + 1:]])
+                    else:
+                        moved = np.concatenate([tour[:p + 1], tour[i:e + 1],
+                                                tour[p + 1:i], tour[e + 1:]])
+                    if is_valid(moved, allowed, successors):
+                        expected.add((i, e, p))
+                        assert np.isclose(moves[(i, e, p)],
+                                          local_search.cost(moved) -
+                                          local_search.cost(tour))
+        assert set(moves) == expected
+
+
+def test_local_search_improve():
+    cost_matrix, allowed, successors, tours = example_problem(40)
+
+    for candidates in [None, candidate_lists(cost_matrix, 8)]:
+        local_search = LocalSearch(cost_matrix, allowed, successors, candidates)
+        for tour in tours:
+            improved, cost = local_search.improve(tour)
+
+            assert is_valid(improved, allowed, successors)
+            assert sorted(improved) == list(range(40))
+            assert improved[0] == 0 and improved[-1] == 39
+            assert np.isclose(cost, local_search.cost(improved))
+            assert cost < local_search.cost(tour)
+        assert local_search.improvement_per_second > 0
+
+
+def test_aco_optimizer_local_search():
+    G = graph_helper.example_graph_cartesian(30, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = NumpyACOTaskOptimizer(num_ants=20, limit=5, seed=0,
+                                      local_search=True)
+    optimizer.set_graph(Gn)
+    path = optimizer.solve(time=10)[0][0]
+
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+    assert optimizer.stats["local_search_moves"] > 0
+
+    improved = optimizer.improve(list(range(32)))[0][0]
+    position = {n: i for i, n in enumerate(improved)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+    assert optimizer.stats["improvement"] > 0
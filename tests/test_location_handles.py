@@ -0,0 +1,92 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pickle
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.location import (GraphHandle, NXLayerLocation,
+                                         graph_registry, register_graph)
+# %%
+
+
+def road_problem():
+    G_base = graph_helper.example_road_graph(10)
+    G = graph_helper.example_graph_road(G_base, 8)
+    return G_base, G
+
+
+def distance(location_pair):
+    l1, l2 = location_pair
+    return l1.distance_to(l2)
+
+
+def test_location_pickles_as_handle():
+    G_base, G = road_problem()
+    location = G.nodes[3]["location"]
+    full_size = len(pickle.dumps(location))
+
+    base_id = register_graph(G_base)
+    layer_id = register_graph(G)
+    try:
+        payload = pickle.dumps(location)
+        copy = pickle.loads(payload)
+        assert copy.G_base is G_base and copy.G is G
+    finally:
+        graph_registry.unregister(base_id)
+        graph_registry.unregister(layer_id)
+
+    assert len(payload) < 1000 < full_size
+    assert copy.distance_to(G.nodes[4]["location"]) == location.distance_to(
+        G.nodes[4]["location"])
+
+
+def test_unregistered_handle():
+    location = NXLayerLocation.__new__(NXLayerLocation)
+    location.__setstate__({"G_base": GraphHandle("missing")})
+
+    try:
+        location.G_base
+        assert False
+    except KeyError:
+        pass
+
+
+def test_location_handles_in_spawned_worker():
+    G_base, G = road_problem()
+    register_graph(G_base, "roads")
+    register_graph(G, "tasks")
+    pairs = [(G.nodes[u]["location"], G.nodes[v]["location"])
+             for u, v in [(1, 2), (3, 4), (5, 6)]]
+    try:
+        with ProcessPoolExecutor(
+                1, mp_context=multiprocessing.get_context("spawn"),
+                initializer=register_graphs, initargs=(G_base, G)) as pool:
+            distances = list(pool.map(distance, pairs))
+    finally:
+        graph_registry.unregister("roads")
+        graph_registry.unregister("tasks")
+
+    assert distances == [distance(pair) for pair in pairs]
+
+
+def register_graphs(*graphs):
+    # the graphs keep their registry id when pickled
+    for G in graphs:
+        register_graph(G)
+
+
+def test_cost_matrix_processes():
+    G_base, G = road_problem()
+    Gn = mamogenx.G_problem_from_dag(G)
+    register_graph(G_base, "roads")
+    try:
+        matrix = mamogenx.G_cost_matrix(Gn, time_callback, processes=2)
+    finally:
+        graph_registry.unregister("roads")
+
+    assert (matrix == mamogenx.G_cost_matrix(Gn, time_callback)).all()
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.location import CartesianLocation
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.cache import (DiskPlanCache, PlanCache,
+                                               canonical_callback, problem_hash)
+# %%
+
+
+def velocity_callback(velocity):
+    return lambda G, u, v: mamogenx.G_time_callback(G, u, v, velocity)
+
+
+def dimensions(velocity=1):
+    return {"time": dict(cost_callback=velocity_callback(velocity),
+                         capacity=None, slack=0, demand_callback=None)}
+
+
+class CountingOptimizer():
+
+    def __init__(self):
+        self.graph = None
+        self.dimensions = dimensions()
+        self.capacities = {}
+        self.calls = 0
+
+    def solve(self, max_time=30, num_routes=1, constraints=[]):
+        self.calls += 1
+        return [list(self.graph.nodes)], [{}]
+
+
+def test_problem_hash_canonical():
+    G1 = mamogenx.G_problem_from_dag(graph_helper.example_graph_cartesian(10))
+    G2 = mamogenx.G_problem_from_dag(graph_helper.example_graph_cartesian(10))
+    constraints = mamogenx.G_descendent_constrains(G1)
+
+    key = problem_hash(G1, dimensions(), {}, constraints, 30)
+
+    assert key == problem_hash(G2, dimensions(), {}, constraints[::-1], 30)
+    assert key != problem_hash(G2, dimensions(), {}, constraints, 10)
+    assert key != problem_hash(G2, dimensions(velocity=2), {}, constraints, 30)
+    assert key != problem_hash(G2, dimensions(), {}, constraints[1:], 30)
+
+    G2.nodes[3]["location"] = CartesianLocation(-1, -1)
+    assert key != problem_hash(G2, dimensions(), {}, constraints, 30)
+
+
+def test_canonical_callback_constants():
+    def nested(velocity):
+        return lambda G, u, v: (lambda d: d / 2)(velocity)
+
+    def nested_edited(velocity):
+        return lambda G, u, v: (lambda d: d / 3)(velocity)
+
+    assert (canonical_callback(lambda G, u, v: 1) !=
+            canonical_callback(lambda G, u, v: 1000))
+    assert (canonical_callback(lambda G, u, v: u.velocity) !=
+            canonical_callback(lambda G, u, v: u.speed))
+    assert canonical_callback(nested(1)) != canonical_callback(nested_edited(1))
+    assert (canonical_callback(lambda G, u, v: 1) ==
+            canonical_callback(lambda G, u, v: 1))
+
+
+def test_plan_cache_lru_and_max_age():
+    cache = PlanCache(maxsize=2)
+
+    cache.put("a", [[0, 1]], [{}])
+    cache.put("b", [[0, 2]], [{}])
+    assert cache.get("a").plan == [[0, 1]]
+
+    cache.put("c", [[0, 3]], [{}])
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+
+    cache.entries["a"].created = time.time() - 100
+    assert cache.get("a", max_age=10) is None
+    assert cache.get("a", max_age=1000) is not None
+
+
+def test_plan_cache_disk_backend(tmp_path):
+    PlanCache(backend=DiskPlanCache(tmp_path)).put("a", [[0, 1]], [{}])
+
+    entry = PlanCache(backend=DiskPlanCache(tmp_path)).get("a")
+
+    assert entry.plan == [[0, 1]]
+    assert entry.key == "a"
+
+
+def test_task_optimizer_cache():
+    impl = CountingOptimizer()
+    taskoptimizer = TaskOptimizer(impl=impl, cache=PlanCache())
+
+    for _ in range(3):
+        G = graph_helper.example_graph_cartesian(10)
+        taskoptimizer.set_graph(mamogenx.G_problem_from_dag(G))
+        plan, meta = taskoptimizer.solve(time=1)
+
+    assert impl.calls == 1
+    assert plan == [list(range(12))]
+
+    taskoptimizer.cache_entry.created -= 60
+    taskoptimizer.solve(time=1, max_age=30)
+
+    assert impl.calls == 2
+
+
+def test_task_optimizer_cache_without_canonical_form():
+    class Provider():
+        def __init__(self, velocity):
+            self.velocity = velocity
+
+    def provider_dimensions(provider):
+        return {"time": dict(cost_callback=lambda G, u, v: provider.velocity,
+                             capacity=None, slack=0, demand_callback=None)}
+
+    G = mamogenx.G_problem_from_dag(graph_helper.example_graph_cartesian(5))
+    with pytest.raises(TypeError):
+        problem_hash(G, provider_dimensions(Provider(1)), {}, [], 30)
+
+    impl = CountingOptimizer()
+    impl.dimensions = provider_dimensions(Provider(1))
+    cache = PlanCache()
+    taskoptimizer = TaskOptimizer(impl=impl, cache=cache)
+    taskoptimizer.set_graph(G)
+    for _ in range(2):
+        taskoptimizer.solve(time=1)
+
+    assert impl.calls == 2
+    assert len(cache) == 0 and cache.hits == 0
@@ -0,0 +1,82 @@
+import networkx as nx
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.location import CartesianLocation
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.ortools.precedence import reduce_constraints
+# %%
+
+
+def test_reduce_constraints():
+    G = graph_helper.example_graph_cartesian(40)
+    tasks = list(G.nodes)[1:-1]
+
+    constraints = mamogenx.G_descendent_constrains(
+        G, lambda u, v: dict(dimension="time", min=1))
+    reduced = reduce_constraints(constraints)
+
+    assert len(reduced) < len(constraints)
+    assert {(c.u, c.v) for c in reduced} == set(G.subgraph(tasks).edges)
+    assert all(c.dimension == "time" and c.kw_args == {"min": 1}
+               for c in reduced)
+
+
+def test_reduce_constraints_keeps_max():
+    G = graph_helper.example_graph_cartesian(40)
+
+    constraints = mamogenx.G_descendent_constrains(
+        G, lambda u, v: dict(dimension="time", max=100))
+
+    assert len(reduce_constraints(constraints)) == len(constraints)
+
+
+def test_native_precedence_solver():
+    G = graph_helper.example_graph_cartesian(20, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    taskoptimizer = TaskOptimizer()
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.impl.add_dimension(
+        "time", lambda G, u, v: int(mamogenx.G_time_callback(G, u, v, 1)))
+
+    constraints = mamogenx.G_descendent_constrains(
+        G, lambda u, v: dict(dimension="time", min=0))
+
+    results, meta = taskoptimizer.solve(time=1, constraints=constraints)
+    path = results[0]
+
+    assert sorted(path) == list(range(22))
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[u] < position[v] for u, v in G.edges)
+
+
+def test_native_precedence_dropped_task():
+    # the middle task 2 of 1 -> 2 -> 3 exceeds the capacity and is dropped
+    G = nx.DiGraph()
+    positions = [0, 90, 50, 10, 30, 60, 70, 100]
+    for n, x in enumerate(positions):
+        G.add_node(n, location=CartesianLocation(x, 0),
+                   demand=10 if n == 2 else 1)
+    G.add_edges_from([(1, 2), (2, 3)] + [(0, n) for n in (1, 4, 5, 6)]
+                     + [(n, 7) for n in (3, 4, 5, 6)])
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_dimension(
+        "time", lambda G, u, v: int(mamogenx.G_time_callback(G, u, v, 1)))
+    optimizer.add_capacity("demand", lambda G, u: G.nodes[u]["demand"],
+                           capacity=6)
+    constraints = mamogenx.G_descendent_constrains(
+        G, lambda u, v: dict(dimension="time", min=0))
+
+    results, meta = optimizer.solve(1, constraints=constraints)
+    path = results[0]
+
+    assert 2 not in path
+    position = {n: i for i, n in enumerate(path)}
+    assert all(position[c.u] < position[c.v] for c in constraints
+               if c.u in position and c.v in position)
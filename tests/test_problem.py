@@ -0,0 +1,223 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import numpy as np
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.location import CartesianLocation
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.problem import (CompactProblem, ProblemSnapshot,
+                                        TaskProblem)
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def load_callback(G, u):
+    return u % 3
+
+
+def create_problem(dag):
+    problem = TaskProblem(dag, kw_args_callback=lambda u, v: dict(min=u + v))
+    problem.add_dimension("time", time_callback)
+    problem.add_capacity("load", load_callback)
+    return problem
+
+
+def assert_rebuild_equal(problem):
+    rebuild = create_problem(copy.deepcopy(problem.dag))
+
+    assert list(problem.graph.nodes) == list(rebuild.graph.nodes)
+    assert set(problem.graph.edges) == set(rebuild.graph.edges)
+    assert problem.descendants == rebuild.descendants
+    assert problem.ancestors == rebuild.ancestors
+    assert ({(c.u, c.v, c.kw_args["min"]) for c in problem.constraints}
+            == {(c.u, c.v, c.kw_args["min"]) for c in rebuild.constraints})
+    for name in ("time", "load"):
+        np.testing.assert_array_equal(problem.matrices[name],
+                                      rebuild.matrices[name])
+
+
+def test_problem_matches_build():
+    G = graph_helper.example_graph_cartesian(15)
+    problem = create_problem(G)
+
+    assert set(problem.graph.edges) == set(
+        mamogenx.G_problem_from_dag(G).edges)
+    assert len(problem.constraints) == len(
+        mamogenx.G_descendent_constrains(G))
+    assert_rebuild_equal(problem)
+
+
+def test_problem_edits():
+    G = graph_helper.example_graph_cartesian(15)
+    problem = create_problem(G)
+    rng = np.random.default_rng(3)
+
+    for k in range(5):
+        x, y = rng.integers(0, 1000, 2)
+        problem.add_task(100 + k, predecessors=[1 + k], successors=[10 + k],
+                         location=CartesianLocation(int(x), int(y)))
+        assert_rebuild_equal(problem)
+
+    problem.add_task(200, location=CartesianLocation(5, 5))
+    assert_rebuild_equal(problem)
+
+    problem.add_precedence(200, 101)
+    assert_rebuild_equal(problem)
+    problem.remove_precedence(3, 102)
+    assert_rebuild_equal(problem)
+
+    problem.remove_task(101)
+    assert_rebuild_equal(problem)
+    problem.remove_task(104, keep_order=False)
+    assert_rebuild_equal(problem)
+
+    problem.set_task(7, location=CartesianLocation(100, 100))
+    assert_rebuild_equal(problem)
+    assert list(problem.graph.nodes)[-1] == 16
+
+
+def test_problem_keeps_order_on_remove():
+    G = graph_helper.example_graph_cartesian(15)
+    problem = create_problem(G)
+    problem.add_task(100, predecessors=[2], successors=[3])
+
+    problem.remove_task(100)
+
+    assert 3 in problem.descendants[2]
+    assert problem.dag.has_edge(2, 3)
+
+
+def test_problem_rejects_cycle():
+    G = graph_helper.example_graph_cartesian(15)
+    problem = create_problem(G)
+    problem.add_task(100, predecessors=[2], successors=[3])
+
+    try:
+        problem.add_precedence(3, 2)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_problem_optimizer_uses_matrices():
+    G = graph_helper.example_graph_cartesian(12, size=100)
+    problem = create_problem(G)
+    problem.add_task(100, location=CartesianLocation(50, 50))
+
+    optimizer = problem.create_optimizer()
+    result, _ = optimizer.solve(max_time=1)
+
+    assert sorted(result[0], key=str) == sorted(problem.graph.nodes, key=str)
+
+
+def test_compact_problem_matches_build():
+    G = graph_helper.example_graph_cartesian(20)
+    G.nodes[5].pop("layer")
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    problem = CompactProblem(G)
+
+    assert list(problem.nodes) == list(Gn.nodes)
+    assert set(problem.edges) == set(Gn.edges)
+    assert len(problem.edges) == Gn.number_of_edges()
+    assert set(problem.to_networkx().edges) == set(Gn.edges)
+    for n in Gn.nodes:
+        assert problem.nodes[n] == Gn.nodes[n]
+        assert set(problem.successors(n)) == set(Gn.successors(n))
+        assert set(problem.predecessors(n)) == set(Gn.predecessors(n))
+        assert problem.descendants(n) == nx.descendants(G, n)
+    assert problem.has_edge(0, 1) and not problem.has_edge(1, 0)
+
+    assert ({(c.u, c.v) for c in mamogenx.G_descendent_constrains(problem)}
+            == {(c.u, c.v) for c in mamogenx.G_descendent_constrains(G)})
+
+
+def test_compact_problem_solvers():
+    G = graph_helper.example_graph_cartesian(20, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+    problem = CompactProblem(G)
+
+    results = []
+    for graph in (Gn, problem):
+        optimizer = ORTaskOptimizer()
+        optimizer.graph = graph
+        optimizer.add_dimension("time", time_callback)
+        results.append(optimizer.solve(max_time=1)[0])
+    assert results[0] == results[1]
+
+    G = graph_helper.example_graph_cartesian(10, size=100)
+    optimizer = TaskOptimizer()
+    optimizer.set_graph(CompactProblem(G))
+    optimizer.add_dimension("time", time_callback)
+    result, _ = optimizer.solve(1)
+    assert sorted(result[0]) == list(range(12))
+
+
+def road_problems():
+    G_base = graph_helper.example_road_graph()
+    G1 = graph_helper.example_graph_road(G_base, 8, precedence=0)
+    # same location objects, different order
+    G2 = G1.copy()
+    G2.add_edge(1, 2)
+    return G1, G2
+
+
+def test_snapshot_is_self_contained():
+    G1, G2 = road_problems()
+    location = G1.nodes[2]["location"]
+
+    snapshot1 = ProblemSnapshot(G1)
+    snapshot2 = ProblemSnapshot(G2)
+
+    assert location.G is G1
+    assert snapshot1.graph.nodes[2]["location"] is not location
+    assert snapshot1.context is not snapshot2.context
+    # the arc 2 -> 1 only exists in the first problem
+    assert time_callback(snapshot1.graph, 2, 1) < 24*60*60*360
+    assert time_callback(snapshot2.graph, 2, 1) == 24*60*60*360
+
+    try:
+        snapshot1.graph.add_edge(1, 2)
+        assert False
+    except nx.NetworkXError:
+        pass
+
+
+def test_snapshots_solve_concurrently():
+    problems = list(road_problems()) * 2
+    dimensions = {"time": dict(cost_callback=time_callback)}
+
+    def solve(G):
+        snapshot = ProblemSnapshot(G, dimensions)
+        return snapshot.solve(1, exact_threshold=0)[0]
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(solve, problems))
+
+    assert results[0] == results[2] and results[1] == results[3]
+    for G, result in zip(problems, results):
+        position = {n: i for i, n in enumerate(result[0])}
+        assert all(position[u] < position[v] for u, v in G.edges)
+
+
+def test_task_problem_snapshot():
+    G = graph_helper.example_graph_cartesian(10, size=100)
+    problem = create_problem(G)
+    problem.add_task(100, predecessors=[2], location=CartesianLocation(5, 5))
+
+    snapshot = problem.snapshot()
+    problem.add_task(101, predecessors=[100],
+                     location=CartesianLocation(7, 7))
+
+    assert 101 not in snapshot.graph and 100 in snapshot.graph
+    assert len(snapshot.constraints) < len(problem.constraints)
+    result, _ = snapshot.solve(1)
+    assert sorted(result[0], key=str) == sorted(snapshot.graph, key=str)
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.profile import (VehicleProfile,
+                                                 profile_time_matrices,
+                                                 unique_profiles)
+# %%
+
+
+def distance_callback(G, u, v):
+    return mamogenx.G_distance_location(G, u, v)
+
+
+def service_callback(G, u):
+    return 0 if u in (0, len(G) - 1) else 10
+
+
+def test_profile_time_matrices():
+    profiles = [VehicleProfile("slow", 1, 2), VehicleProfile("fast", 4, 0.5)]
+    distance = np.array([[0, 10, 7], [10, 0, -1], [7, 3, 0]])
+    service = np.array([0, 10, 5])
+
+    times = profile_time_matrices(distance, service, profiles)
+
+    assert times.shape == (2, 3, 3)
+    for p, profile in enumerate(profiles):
+        for i in range(3):
+            for j in range(3):
+                expected = (-1 if distance[i, j] < 0 else
+                            profile.transit(distance[i, j], service[i]))
+                assert times[p, i, j] == expected
+
+
+def test_vehicle_profiles_share_matrices():
+    G = graph_helper.example_graph_cartesian(12, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    slow = VehicleProfile("slow", velocity=1, service_factor=2)
+    fast = VehicleProfile("fast", velocity=3, service_factor=1)
+
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_profile_dimension("time", distance_callback, service_callback)
+    optimizer.vehicle_profiles = [slow, fast, fast, slow]
+
+    result, meta = optimizer.solve(max_time=1, num_routes=4)
+
+    assert optimizer.stats["transit_callbacks"] == 2
+    assert sorted(n for route in result for n in route[1:-1]) == list(range(1, 13))
+    for route, values, profile in zip(result, meta,
+                                      optimizer.vehicle_profiles):
+        time = sum(profile.transit(distance_callback(Gn, u, v),
+                                   service_callback(Gn, u))
+                   for u, v in zip(route, route[1:]))
+        assert values[route[-1]]["time"]["cumul"] == time
+
+
+def test_unique_profiles_by_parameters():
+    slow, fast = VehicleProfile(velocity=1), VehicleProfile(velocity=4)
+    renamed = VehicleProfile("renamed", velocity=1)
+
+    assert unique_profiles([slow, fast, renamed]) == [slow, fast]
+
+    G = graph_helper.example_graph_cartesian(8, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_profile_dimension("time", distance_callback)
+    optimizer.vehicle_profiles = [slow, fast]
+
+    result, meta = optimizer.solve(max_time=1, num_routes=2)
+
+    assert optimizer.stats["transit_callbacks"] == 2
+    for route, values, profile in zip(result, meta, [slow, fast]):
+        time = sum(profile.transit(distance_callback(Gn, u, v))
+                   for u, v in zip(route, route[1:]))
+        assert values[route[-1]]["time"]["cumul"] == time
+
+
+def test_vehicle_profiles_count():
+    G = graph_helper.example_graph_cartesian(5, size=100)
+    optimizer = ORTaskOptimizer()
+    optimizer.graph = mamogenx.G_problem_from_dag(G)
+    optimizer.add_profile_dimension("time", distance_callback)
+    optimizer.vehicle_profiles = [VehicleProfile()]
+
+    with pytest.raises(ValueError):
+        optimizer.solve(max_time=1, num_routes=2)
+
+
+def test_vehicle_profiles_plan_cache():
+    from mamoge.taskplanner.optimize import TaskOptimizer
+    from mamoge.taskplanner.optimize.cache import PlanCache
+
+    G = graph_helper.example_graph_cartesian(8, size=100, precedence=0)
+    Gn = mamogenx.G_problem_from_dag(G)
+    impl = ORTaskOptimizer()
+    impl.graph = Gn
+    impl.add_profile_dimension("time", distance_callback)
+    cache = PlanCache()
+    taskoptimizer = TaskOptimizer(impl, cache=cache, exact_threshold=0)
+
+    cumuls = []
+    for velocity in [10, 1, 10]:
+        impl.vehicle_profiles = [VehicleProfile(velocity=velocity)]
+        plan, meta = taskoptimizer.solve(1)
+        cumuls.append(meta[0][plan[0][-1]]["time"]["cumul"])
+
+    assert cache.misses == 2 and cache.hits == 1
+    assert cumuls[0] == cumuls[2] and cumuls[1] > 5 * cumuls[0]
+
+    # a new optimizer with the same problem and settings hits the cache
+    impl = ORTaskOptimizer()
+    impl.graph = Gn
+    impl.add_profile_dimension("time", distance_callback)
+    impl.vehicle_profiles = [VehicleProfile(velocity=1)]
+    TaskOptimizer(impl, cache=cache, exact_threshold=0).solve(1)
+    assert cache.hits == 2
@@ -0,0 +1,94 @@
+import networkx as nx
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.location import ZeroDistanceLocation
+from mamoge.taskplanner.optimize.reduce import (G_task_groups,
+                                                ProblemReduction,
+                                                ReductionTaskOptimizer)
+from mamoge.taskplanner.optimize.route import route_cost
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def test_task_groups_keep_dag_acyclic():
+    G = graph_helper.example_graph_colocated(60, num_sites=8)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    groups = G_task_groups(Gn, strict=False)
+
+    assert sorted(n for g in groups for n in g) == list(range(1, 61))
+    assert len(groups) < 60
+
+    group_of = {n: i for i, g in enumerate(groups) for n in g}
+    position = {n: i for i, n in enumerate(n for g in groups for n in g)}
+    for u, v in G.subgraph(group_of).edges:
+        assert group_of[u] <= group_of[v]
+        assert position[u] < position[v]
+
+
+def test_task_groups_zero_distance():
+    G = graph_helper.example_graph_cartesian(10, precedence=0)
+    for i in (2, 4, 6):
+        G.nodes[i]["location"] = ZeroDistanceLocation()
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    groups = G_task_groups(Gn)
+
+    assert [2, 4, 6] in groups
+    assert len(groups) == 8
+
+
+def test_task_groups_separate():
+    G = graph_helper.example_graph_cartesian(10, precedence=0)
+    for i in (2, 4, 6):
+        G.nodes[i]["location"] = ZeroDistanceLocation()
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    groups = G_task_groups(Gn, separate=[(2, 4)])
+
+    assert [2, 6] in groups and [4] in groups
+
+
+def test_reduction_transits():
+    G = graph_helper.example_graph_colocated(30, num_sites=6)
+    Gn = mamogenx.G_problem_from_dag(G)
+    groups = G_task_groups(Gn)
+    reduction = ProblemReduction(Gn, groups,
+                                 {"time": dict(cost_callback=time_callback)},
+                                 {"load": dict(capacity_callback=lambda G, u: 1)})
+
+    assert nx.is_directed_acyclic_graph(mamogenx.G_dag_from_problem(
+        reduction.graph))
+
+    route = list(range(len(reduction.members)))
+    cost = reduction.dimensions["time"]["cost_callback"]
+    load = reduction.capacities["load"]["capacity_callback"]
+    assert (sum(cost(reduction.graph, i, j) for i, j in zip(route, route[1:]))
+            == route_cost(Gn, reduction.expand(route), time_callback))
+    assert sum(load(reduction.graph, i) for i in route) == len(Gn)
+
+
+def test_reduction_solver():
+    G = graph_helper.example_graph_colocated(40, num_sites=8)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    optimizer = ReductionTaskOptimizer()
+    optimizer.graph = Gn
+    optimizer.add_dimension("time", time_callback)
+
+    result, meta = optimizer.solve(max_time=1)
+    path = result[0]
+
+    assert optimizer.stats["num_groups"] < 40
+    assert path[0] == 0 and path[-1] == 41
+    assert sorted(path) == list(range(42))
+
+    # like the problem graph arcs, no step goes back to an ancestor
+    for u, v in zip(path, path[1:]):
+        assert u not in nx.descendants(G, v)
+    assert meta[0][41]["time"]["cumul"] == route_cost(Gn, path, time_callback)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize import TaskOptimizer
+from mamoge.taskplanner.optimize.route import route_array, route_array_to_meta
+# %%
+
+
+def test_route_array_to_meta():
+    array = route_array([0, 3, 1, 4],
+                        cumuls={"time": [0, 5, 9, 12], "water": [0, 1, 2, 3]},
+                        transits={"time": [5, 3, 3], "water": [1, 1, 1]})
+
+    assert array["time"]["slack"].tolist() == [0, 0, 1, 0]
+    assert array["node"].tolist() == [0, 3, 1, 4]
+
+    meta = route_array_to_meta(array)
+
+    assert meta[1]["time"] == dict(cumul=9, demand=4, slack=1, transit=3)
+    assert meta[0]["water"] == dict(cumul=0, demand=0, slack=0, transit=0)
+
+
+def test_columnar_solution():
+    G = graph_helper.example_graph_cartesian(10, size=100)
+    Gn = mamogenx.G_problem_from_dag(G)
+
+    taskoptimizer = TaskOptimizer()
+    taskoptimizer.set_graph(Gn)
+    taskoptimizer.impl.add_dimension(
+        "time", lambda G, u, v: int(mamogenx.G_time_callback(G, u, v, 1)))
+    taskoptimizer.impl.add_capacity("load", lambda G, u: 2)
+
+    results, columns = taskoptimizer.impl.solve(1, columnar=True)
+    array = columns[0]
+
+    assert array.dtype.names == ("node", "time", "load")
+    assert array["node"].tolist() == results[0]
+    assert np.all(np.diff(array["load"]["cumul"]) == 2)
+    assert np.all(array["time"]["cumul"][1:] >= array["time"]["transit"][1:])
+
+    meta = route_array_to_meta(array)
+    assert meta[results[0][-1]]["load"]["cumul"] == 2 * (len(results[0]) - 1)
@@ -0,0 +1,93 @@
+import pytest
+
+from mamoge_helpers import graph_helper
+import mamoge.taskplanner.nx as mamogenx
+
+from mamoge.taskplanner.optimize.ortools import ORTaskOptimizer
+from mamoge.taskplanner.optimize.service import SolverService, solve_many
+from mamoge.taskplanner.problem import ProblemSnapshot
+# %%
+
+
+def time_callback(G, u, v):
+    return int(mamogenx.G_time_callback(G, u, v, velocity=1))
+
+
+def create_optimizer():
+    optimizer = ORTaskOptimizer()
+    optimizer.add_dimension("time", time_callback)
+    return optimizer
+
+
+def create_broken_optimizer():
+    raise ValueError("no optimizer")
+
+
+class DistanceOptimizer():
+    """returns the time of the arc 2 -> 1 as plan"""
+
+    def __init__(self):
+        self.graph = None
+
+    def solve(self, max_time, num_routes=1, constraints=[]):
+        return [[time_callback(self.graph, 2, 1)]], [{}]
+
+
+def test_solver_service():
+    problems = [mamogenx.G_problem_from_dag(
+        graph_helper.example_graph_cartesian(8, seed=seed, size=100))
+        for seed in range(4)]
+
+    with SolverService(create_optimizer, num_workers=2) as service:
+        job_ids = [service.submit(G, time=1) for G in problems]
+        results = [service.result(job_id, timeout=60) for job_id in job_ids]
+        stats = service.stats()
+
+    assert [r.job_id for r in results] == job_ids
+    assert all(r.error is None for r in results)
+    assert all(sorted(r.plan[0]) == list(range(10)) for r in results)
+    assert {r.worker for r in results} == {0, 1}
+
+    assert stats["solved"] == 4
+    assert stats["queue_latency_max"] >= stats["queue_latency_mean"] >= 0
+    assert stats["throughput"] > 0
+
+
+def test_solver_service_worker_failure():
+    with pytest.raises(RuntimeError):
+        SolverService(create_broken_optimizer, num_workers=1).start()
+
+
+def test_solver_service_location_cache():
+    G_base = graph_helper.example_road_graph()
+    problems = []
+    for precedence in ([], [(1, 2)]):
+        G = graph_helper.example_graph_road(G_base, 8, precedence=0)
+        G.add_edges_from(precedence)
+        problems.append(mamogenx.G_problem_from_dag(G))
+
+    # both jobs on one worker, distances are cached per job
+    with SolverService(DistanceOptimizer, num_workers=1) as service:
+        results = [service.result(service.submit(G, time=1), timeout=60)
+                   for G in problems]
+
+    # the arc 2 -> 1 only exists in the first problem
+    assert results[0].plan[0][0] < 24*60*60*360
+    assert results[1].plan[0][0] == 24*60*60*360
+
+
+def test_solve_many():
+    G_base = graph_helper.example_road_graph()
+    dimensions = {"time": dict(cost_callback=lambda G, u, v:
+                               time_callback(G, u, v))}
+    problems = [ProblemSnapshot(graph_helper.example_graph_road(
+        G_base, 8, seed=seed), dimensions) for seed in range(6)]
+
+    results = list(solve_many(problems, time=1, num_workers=3))
+
+    assert sorted(r.job_id for r in results) == list(range(6))
+    assert all(r.error is None for r in results)
+    assert len({r.worker for r in results}) <= 3
+    assert all(r.solve_time >= 0 and r.queue_latency >= 0 for r in results)
+    for r in results:
+        assert r.plan == problems[r.job_id].solve(1)[0]